@@ -0,0 +1,212 @@
+"""
+批量处理论文的命令行入口
+
+输入文件每行一篇论文: `PDF链接 [Git链接]`，以 # 开头的行为注释。
+每篇论文的进度保存在 <output>/checkpoints/ 下，中断后重新运行会从未完成的步骤继续，
+全部结束后生成 <output>/batch_report.json 和 batch_report.md。
+
+用法:
+    python batch_app.py papers.txt --workers 4 --access-key <key> --client-name <name>
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.core.pipeline import pipeline
+from src.core.project_state import ProjectState
+from src.utils.artifact_cache import digest
+from src.utils.workspace import workspace
+from config import Config
+
+config = Config()
+logger = logging.getLogger("batch")
+
+
+def parse_paper_list(path: str) -> List[Tuple[str, str]]:
+    """读取论文列表，返回 [(pdf_url, git_url)]"""
+    papers = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.replace(",", " ").split()
+            papers.append((parts[0], parts[1] if len(parts) > 1 else ""))
+    return papers
+
+
+class BatchRunner:
+    """使用有界线程池批量运行PipelineProcessor的全部步骤，并按步骤保存检查点"""
+
+    def __init__(self, output_dir: str, access_key: str, client_name: str,
+                 workers: int = 2, search_knowledge: bool = True):
+        self.output_dir = output_dir
+        self.checkpoint_dir = os.path.join(output_dir, "checkpoints")
+        self.access_key = access_key
+        self.client_name = client_name
+        self.workers = workers
+        self.search_knowledge = search_knowledge
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+    def _checkpoint_path(self, pdf_url: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{digest(pdf_url)[:16]}.json")
+
+    def _load_checkpoint(self, pdf_url: str) -> Optional[Dict]:
+        path = self._checkpoint_path(pdf_url)
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, pdf_url: str, record: Dict):
+        path = self._checkpoint_path(pdf_url)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def _steps(self) -> List[Tuple[str, Callable[[ProjectState], Tuple[ProjectState, str]], Callable[[ProjectState], bool], bool]]:
+        """(步骤名, 处理函数, 是否需要执行, 失败时是否终止该论文)"""
+        return [
+            ("download_pdf", pipeline.download_pdf_step, lambda s: True, True),
+            ("clone_git", pipeline.clone_git_step, lambda s: bool(s.git_url), False),
+            ("pdf_to_tex", pipeline.pdf_to_tex_step, lambda s: True, True),
+            # PDF中提取到Git链接时补充克隆
+            ("clone_extracted_git", pipeline.clone_git_step, lambda s: bool(s.git_url) and not s.git_path, False),
+            ("search_knowledge", pipeline.search_knowledge_step, lambda s: self.search_knowledge, False),
+            ("analyze_code", pipeline.analyze_code_step, lambda s: s.can_execute_step(5), False),
+            ("understand_paper", pipeline.understand_paper_step, lambda s: True, True),
+            ("generate_blog", pipeline.generate_blog_step, lambda s: True, True),
+            ("render_blog", pipeline.render_blog_step, lambda s: True, True),
+        ]
+
+    def _create_state(self, pdf_url: str, git_url: str) -> ProjectState:
+        """创建项目(计费)"""
+        state, message = pipeline.create_project(pdf_url, self.access_key, self.client_name, git_url)
+        if state.step_status.get(1) != "completed":
+            raise RuntimeError(message)
+        return state
+
+    def process_paper(self, pdf_url: str, git_url: str) -> Dict:
+        """处理单篇论文，已完成的步骤直接跳过"""
+        record = self._load_checkpoint(pdf_url) or {
+            "pdf_url": pdf_url, "git_url": git_url, "done": [], "warnings": [], "status": "pending",
+            "state": None, "error": None, "elapsed": 0.0,
+        }
+        if record["status"] == "completed":
+            return record
+
+        start = time.monotonic()
+        record["status"], record["error"] = "running", None
+        try:
+            if record["state"] is None:
+                record["state"] = self._create_state(pdf_url, git_url).to_dict()
+                self._save_checkpoint(pdf_url, record)
+            state = ProjectState.from_dict(record["state"])
+
+            # 复用全局索引中已有结果的项目无需再执行各步骤
+            steps = [] if state.reused_from else self._steps()
+            for name, step, should_run, required in steps:
+                if name in record["done"] or not should_run(state):
+                    continue
+                logger.info(f"[{state.project_id[:8]}] {name}")
+                state, message = step(state)
+                record["state"] = state.to_dict()
+                if message.startswith("❌"):
+                    if required:
+                        raise RuntimeError(f"{name}: {message}")
+                    record["warnings"].append(f"{name}: {message}")
+                record["done"].append(name)
+                self._save_checkpoint(pdf_url, record)
+
+            record["status"] = "completed"
+            # 项目工作目录会被定期清理，生成的HTML复制到输出目录保存
+            html_dir = os.path.join(self.output_dir, "html")
+            os.makedirs(html_dir, exist_ok=True)
+            record["html_output"] = shutil.copy2(state.html_output, html_dir)
+            assets_dir = os.path.join(os.path.dirname(state.html_output), "assets")
+            if os.path.isdir(assets_dir):
+                # 图片文件名包含内容哈希，多篇论文共用同一个assets目录
+                shutil.copytree(assets_dir, os.path.join(html_dir, "assets"), dirs_exist_ok=True)
+        except Exception as e:
+            record["status"] = "failed"
+            record["error"] = str(e)
+            logger.error(f"Batch processing failed for {pdf_url}: {e}")
+        record["elapsed"] = round(record.get("elapsed", 0.0) + time.monotonic() - start, 2)
+        self._save_checkpoint(pdf_url, record)
+        return record
+
+    def run(self, papers: List[Tuple[str, str]]) -> List[Dict]:
+        results: Dict[str, Dict] = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.process_paper, pdf_url, git_url): pdf_url for pdf_url, git_url in papers}
+            for future in as_completed(futures):
+                record = future.result()
+                results[futures[future]] = record
+                emoji = "✅" if record["status"] == "completed" else "❌"
+                print(f"{emoji} {record['pdf_url']} ({record['elapsed']}s)")
+        ordered = [results[pdf_url] for pdf_url, _ in papers]
+        self.write_report(ordered)
+        return ordered
+
+    def write_report(self, records: List[Dict]):
+        """写出JSON与markdown格式的汇总报告"""
+        summary = {
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "total": len(records),
+            "completed": sum(1 for r in records if r["status"] == "completed"),
+            "failed": sum(1 for r in records if r["status"] == "failed"),
+            "papers": [
+                {k: r.get(k) for k in ("pdf_url", "git_url", "status", "done", "warnings", "error", "elapsed", "html_output")}
+                for r in records
+            ],
+        }
+        with open(os.path.join(self.output_dir, "batch_report.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+        lines = [
+            "# 批量处理报告", "",
+            f"- 完成时间: {summary['finished_at']}",
+            f"- 成功: {summary['completed']}/{summary['total']}，失败: {summary['failed']}", "",
+            "| 论文 | 状态 | 已完成步骤 | 耗时(s) | HTML / 错误 |",
+            "|---|---|---|---|---|",
+        ]
+        for paper in summary["papers"]:
+            result = paper["html_output"] if paper["status"] == "completed" else (paper["error"] or "")
+            result = str(result).replace("|", "\\|").replace("\n", " ")
+            lines.append(f"| {paper['pdf_url']} | {paper['status']} | {len(paper['done'])} | {paper['elapsed']} | {result} |")
+        with open(os.path.join(self.output_dir, "batch_report.md"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量处理论文，生成Blog HTML")
+    parser.add_argument("paper_list", help="论文列表文件，每行: PDF链接 [Git链接]")
+    parser.add_argument("--output", default=os.path.join(config.OUTPUT_DIR, "batch"), help="检查点与报告目录")
+    parser.add_argument("--workers", type=int, default=2, help="同时处理的论文数")
+    parser.add_argument("--access-key", default=os.getenv("APP_ACCESS_KEY", ""), help="计费accessKey")
+    parser.add_argument("--client-name", default=os.getenv("CLIENT_NAME", ""), help="计费x-app-key")
+    parser.add_argument("--skip-search", action="store_true", help="跳过知识库自动搜索")
+    args = parser.parse_args()
+
+    config.ensure_directories()
+    if config.WORKSPACE_SWEEP_INTERVAL:
+        workspace.start_sweeper()
+    papers = parse_paper_list(args.paper_list)
+    print(f"🚀 批量处理 {len(papers)} 篇论文，并发数 {args.workers}")
+    runner = BatchRunner(args.output, args.access_key, args.client_name,
+                         workers=args.workers, search_knowledge=not args.skip_search)
+    records = runner.run(papers)
+    completed = sum(1 for r in records if r["status"] == "completed")
+    print(f"🎉 完成 {completed}/{len(records)}，报告: {os.path.join(args.output, 'batch_report.md')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import os
-from typing import Optional
+from typing import List, Optional
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -8,21 +8,93 @@ load_dotenv(encoding="utf-8")
 class Config:
     # API配置
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
+    # 直接调用LLM分析论文(PaperProcessor)时使用的OpenAI兼容接口
+    OPENAI_BASE_URL: Optional[str] = os.getenv("OPENAI_BASE_URL") or None
+    OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o")
+    OPENAI_TIMEOUT: float = float(os.getenv("OPENAI_TIMEOUT", "300"))  # 单次请求超时(秒)
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "3"))  # 失败后指数退避重试的次数
+    OPENAI_MAX_INPUT_CHARS: int = int(os.getenv("OPENAI_MAX_INPUT_CHARS", "200000"))  # 超过时按章节分段分析再合并
+    OPENAI_CONCURRENCY: int = int(os.getenv("OPENAI_CONCURRENCY", "4"))  # 分段分析的并发数
     PDFDEAL_API_KEY: Optional[str] = os.getenv("PDFDEAL_API_KEY")
     
     # 应用配置
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
     DEBUG: bool = os.getenv("DEBUG", "true").lower() == "true"
+    # 每个Gradio事件同时处理的请求数，超出的请求在队列中等待
+    GRADIO_CONCURRENCY_LIMIT: int = int(os.getenv("GRADIO_CONCURRENCY_LIMIT", "1"))
+    # Prometheus指标端口(/metrics)，0表示不启动
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "9464"))
     
     # 文件配置
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
     OUTPUT_DIR: str = os.getenv("OUTPUT_DIR", "output")
     TEMP_DIR: str = os.getenv("TEMP_DIR", "temp")
+    CACHE_DIR: str = os.getenv("CACHE_DIR", os.path.join(TEMP_DIR, "cache"))
+    # 项目工作目录: 每个项目的PDF、TEX、代码仓库和中间文件放在 WORKSPACE_DIR/<项目ID> 下
+    WORKSPACE_DIR: str = os.getenv("WORKSPACE_DIR", os.path.join(TEMP_DIR, "projects"))
+    # 磁盘配额，包括项目目录、CACHE_DIR、PAPER_INDEX_DIR 和 SINGLE_FLIGHT_DIR，超出时按最近使用时间淘汰
+    WORKSPACE_QUOTA_MB: int = int(os.getenv("WORKSPACE_QUOTA_MB", "10240"))
+    WORKSPACE_MAX_AGE_HOURS: float = float(os.getenv("WORKSPACE_MAX_AGE_HOURS", "72"))  # 超过该时长未使用的项目目录被删除
+    WORKSPACE_SWEEP_INTERVAL: int = int(os.getenv("WORKSPACE_SWEEP_INTERVAL", "600"))  # 后台清理间隔(秒)，0表示不启动
+    # 相同论文的相同步骤同时执行时只执行一次，跨进程合并使用的文件锁目录
+    SINGLE_FLIGHT_DIR: str = os.getenv("SINGLE_FLIGHT_DIR", os.path.join(TEMP_DIR, "inflight"))
+    # 已完成论文的全局索引，新项目命中时直接提供之前生成的结果
+    PAPER_INDEX_DIR: str = os.getenv("PAPER_INDEX_DIR", os.path.join(CACHE_DIR, "papers"))
+    # 不带版本号的arXiv链接可能已有新版本，按论文标识缓存的PDF和索引记录超过该时长(小时)后重新获取
+    PAPER_CACHE_TTL_HOURS: float = float(os.getenv("PAPER_CACHE_TTL_HOURS", "24"))
+    # 按论文缓存的PDF和Doc2X压缩包的大小上限(MB)，超出时淘汰最久未命中的文件；超过保留时长(小时)的直接删除，0表示不限。
+    # 后台清理同样删除缓存目录、论文索引和单飞目录中超过保留时长未使用的条目
+    PDF_CACHE_MB: int = int(os.getenv("PDF_CACHE_MB", "2048"))
+    DOC2X_CACHE_MB: int = int(os.getenv("DOC2X_CACHE_MB", "2048"))
+    CACHE_MAX_AGE_HOURS: float = float(os.getenv("CACHE_MAX_AGE_HOURS", "720"))
+    
+    # arXiv论文优先使用作者上传的LaTeX源码，没有源码时再用Doc2X转换PDF
+    ARXIV_SOURCE_ENABLED: bool = os.getenv("ARXIV_SOURCE_ENABLED", "true").lower() == "true"
+    ARXIV_EPRINT_URL: str = os.getenv("ARXIV_EPRINT_URL", "https://arxiv.org/e-print/{id}")
+    
+    # 预取热门论文(prefetch_app.py): 论文来源(RSS/Atom/JSON链接或列表文件)、执行时段、并发数和每日处理篇数上限
+    PREFETCH_FEED: str = os.getenv("PREFETCH_FEED", "")
+    PREFETCH_WINDOW: str = os.getenv("PREFETCH_WINDOW", "01:00-07:00")  # 本地时间，可跨零点，如 22:00-06:00
+    PREFETCH_WORKERS: int = int(os.getenv("PREFETCH_WORKERS", "1"))
+    PREFETCH_DAILY_LIMIT: int = int(os.getenv("PREFETCH_DAILY_LIMIT", "20"))
+    PREFETCH_INTERVAL: int = int(os.getenv("PREFETCH_INTERVAL", "1800"))  # 常驻运行时检查来源的间隔(秒)
     
     # Claude Code 配置
     CLAUDE_CODE_COMMAND: str = os.getenv("CLAUDE_CODE_COMMAND", "claude -p")
+    CLAUDE_TIMEOUT: int = int(os.getenv("CLAUDE_TIMEOUT", "1800"))  # 单次调用超时(秒)
+    CLAUDE_MAX_CONCURRENCY: int = int(os.getenv("CLAUDE_MAX_CONCURRENCY", "2"))  # 全局并发上限
+    # 外部AI后端的自适应限流: "后端=每秒请求数:最大并发"，每秒请求数为0表示只限并发；mcp 对5个MCP服务分别生效
+    RATE_LIMITS: str = os.getenv("RATE_LIMITS", f"doc2x=1:4,mcp=5:8,openai=3:8,claude=0:{CLAUDE_MAX_CONCURRENCY}")
+    RATE_LIMIT_MAX_QUEUE: int = int(os.getenv("RATE_LIMIT_MAX_QUEUE", "50"))  # 每个后端最多排队的请求数，0表示不限
+    RATE_LIMIT_MAX_WAIT: float = float(os.getenv("RATE_LIMIT_MAX_WAIT", "600"))  # 排队超过该时长(秒)时放弃，0表示不限
+    # MCP调用的截止时间: "服务=秒"，服务名为 keyword/link/summary/knowledge/blog/blog_section，未列出的使用 MCP_TIMEOUT
+    MCP_TIMEOUT: float = float(os.getenv("MCP_TIMEOUT", "600"))
+    MCP_TIMEOUTS: str = os.getenv("MCP_TIMEOUTS", "keyword=120,link=120,summary=600,knowledge=600,blog=900,blog_section=600")
+    # 对冲请求: 调用超过最近耗时的p95仍未返回时再发一个相同请求，取先返回的结果
+    MCP_HEDGE_ENABLED: bool = os.getenv("MCP_HEDGE_ENABLED", "false").lower() == "true"
+    MCP_HEDGE_QUANTILE: float = float(os.getenv("MCP_HEDGE_QUANTILE", "0.95"))
+    MCP_HEDGE_MIN_SAMPLES: int = int(os.getenv("MCP_HEDGE_MIN_SAMPLES", "20"))  # 样本不足时不对冲
+    # 熔断: 连续失败次数达到阈值后在冷却时间内直接拒绝调用
+    MCP_BREAKER_FAILURES: int = int(os.getenv("MCP_BREAKER_FAILURES", "5"))
+    MCP_BREAKER_COOLDOWN: float = float(os.getenv("MCP_BREAKER_COOLDOWN", "60"))
+    # Blog生成配置: 是否按模块并行生成，以及模块生成的并发数
+    # 单个模块的生成依赖 MCP/Blog整合.json 中的 blog_section 变量，开启前需在工作流平台导入新版工作流
+    BLOG_PARALLEL_SECTIONS: bool = os.getenv("BLOG_PARALLEL_SECTIONS", "false").lower() == "true"
+    BLOG_SECTION_CONCURRENCY: int = int(os.getenv("BLOG_SECTION_CONCURRENCY", "7"))
+    
+    # HTML渲染配置: mermaid图表无法解析时是否调用Claude修复
+    RENDER_LLM_REPAIR: bool = os.getenv("RENDER_LLM_REPAIR", "false").lower() == "true"
+    TEMPLATE_CACHE_DIR: str = os.getenv("TEMPLATE_CACHE_DIR", os.path.join(CACHE_DIR, "jinja"))
+    TEMPLATE_AUTO_RELOAD: bool = os.getenv("TEMPLATE_AUTO_RELOAD", "false").lower() == "true"
+    # Blog图片: 生成的WebP宽度、质量，以及转换图片的进程数
+    FIGURE_WIDTHS: List[int] = [int(w) for w in os.getenv("FIGURE_WIDTHS", "480,960,1600").split(",") if w.strip()]
+    FIGURE_QUALITY: int = int(os.getenv("FIGURE_QUALITY", "80"))
+    FIGURE_WORKERS: int = int(os.getenv("FIGURE_WORKERS", "2"))
+    BILLING_URL: str = os.getenv("BILLING_URL", "https://openapi.dp.tech/openapi/v1/api/integral/consume")
+    # 旧版追加扣费记录的CSV；计费账本默认与它放在同一目录(持久化挂载的 /data)，首次创建账本时导入其中的记录
     BILL_CSV_PATH: str = os.getenv("BILL_CSV_PATH", "/data/bill.csv")
+    BILL_LEDGER_PATH: str = os.getenv("BILL_LEDGER_PATH", os.path.join(os.path.dirname(BILL_CSV_PATH), "bill_ledger.db"))  # 计费账本(SQLite)
     EVENTVALUE: int = int(os.getenv("EVENTVALUE", "1"))
     
     @classmethod
@@ -1,9 +1,17 @@
 import gradio as gr
 import os
+import re
+import threading
+import uuid
+import zipfile
 from typing import List, Tuple, Optional
+from urllib.parse import quote
 
 from src.core.pipeline import pipeline
 from src.core.project_state import ProjectState
+from src.utils.metrics import start_metrics_server
+from src.utils.rate_limiter import rate_limits
+from src.utils.workspace import workspace
 from config import Config
 
 # 配置
@@ -27,13 +35,19 @@ def update_ui_state(state: ProjectState) -> Tuple:
         gr.update(interactive=state.can_execute_step(8)),   # render_blog_btn
         
         # 状态显示
-        state.to_status_text(),                             # status_display
+        get_status_text(state),                             # status_display
         state.get_processing_log(),                         # log_display
         "\n".join(state.knowledge_base),                    # knowledge_list
         get_result_files(state),                            # result_files
         get_html_preview(state)                             # html_preview
     )
 
+def get_status_text(state: ProjectState) -> str:
+    """项目状态，外部服务排队或被限流时附加提示"""
+    pressure = rate_limits.pressure_text()
+    return state.to_status_text() + (f"\n{pressure}" if pressure else "")
+
+
 def get_result_files(state: ProjectState) -> List[str]:
     """获取结果文件列表"""
     files = []
@@ -43,15 +57,49 @@ def get_result_files(state: ProjectState) -> List[str]:
         files.append(state.tex_path)
     if state.html_output and os.path.exists(state.html_output):
         files.append(state.html_output)
+        bundle = get_html_bundle(state.html_output)
+        if bundle:
+            files.append(bundle)
     return files
 
 
+def get_html_bundle(html_path: str) -> Optional[str]:
+    """HTML引用的图片在同目录的assets/下，单独下载HTML时图片无法显示，另外打包成 HTML+assets 的zip"""
+    assets_dir = os.path.join(os.path.dirname(html_path), "assets")
+    if not os.path.isdir(assets_dir):
+        return None
+    bundle = os.path.splitext(html_path)[0] + ".zip"
+    if os.path.exists(bundle) and os.path.getmtime(bundle) >= os.path.getmtime(html_path):
+        return bundle
+    tmp_path = f"{bundle}.{uuid.uuid4().hex}.tmp"
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.write(html_path, os.path.basename(html_path))
+        for name in sorted(os.listdir(assets_dir)):
+            archive.write(os.path.join(assets_dir, name), f"assets/{name}", compress_type=zipfile.ZIP_STORED)
+    os.replace(tmp_path, bundle)
+    return bundle
+
+
+_ASSET_ATTR = re.compile(r'\b(src|srcset)="([^"]*)"')
+
+
+def with_file_route(html_text: str, html_dir: str) -> str:
+    """gr.HTML 直接插入页面，相对路径 assets/ 无法访问，改为Gradio的文件路由(需在 allowed_paths 中)"""
+    prefix = f"/gradio_api/file={quote(os.path.abspath(os.path.join(html_dir, 'assets')))}/"
+
+    def replace(match):
+        value = re.sub(r'(^|,\s*)assets/', lambda m: m.group(1) + prefix, match.group(2))
+        return f'{match.group(1)}="{value}"'
+
+    return _ASSET_ATTR.sub(replace, html_text)
+
+
 def get_html_preview(state: ProjectState) -> str:
     """获取HTML预览内容"""
     if state.html_output and os.path.exists(state.html_output):
         try:
             with open(state.html_output, 'r', encoding='utf-8') as f:
-                return f.read()
+                return with_file_route(f.read(), os.path.dirname(state.html_output))
         except Exception:
             return "<p>HTML文件读取失败</p>"
     elif state.blog_content:
@@ -74,6 +122,12 @@ def on_create_project(pdf_url: str, git_url: str, current_state: ProjectState, f
     return new_state, message, *update_ui_state(new_state)
 
 
+def on_regenerate(current_state: ProjectState):
+    """放弃复用的结果回调"""
+    new_state, message = pipeline.regenerate(current_state)
+    return new_state, message, *update_ui_state(new_state)
+
+
 def on_download_pdf(current_state: ProjectState):
     """下载PDF回调"""
     new_state, message = pipeline.download_pdf_step(current_state)
@@ -158,6 +212,8 @@ with gr.Blocks(title="论文阅读与代码分析系统", theme="soft") as app:
                     interactive=True
                 )
                 init_btn = gr.Button(f"🚀 创建项目(消耗{config.EVENTVALUE}光子)", variant="primary", size="lg")
+                # 创建项目时复用了其他用户已生成的结果，可在同一项目中重新生成
+                regenerate_btn = gr.Button("🔁 重新生成(不复用已有结果)", size="sm")
                 confirm_result = gr.Text(visible=False)
             
             # 步骤2: 资源下载
@@ -278,6 +334,17 @@ with gr.Blocks(title="论文阅读与代码分析系统", theme="soft") as app:
         ]
     )
     
+    regenerate_btn.click(
+        fn=on_regenerate,
+        inputs=[project_state],
+        outputs=[
+            project_state, message_output,
+            download_pdf_btn, clone_git_btn, pdf_to_tex_btn, search_knowledge_btn,
+            analyze_code_btn, understand_paper_btn, generate_blog_btn, render_blog_btn,
+            status_display, log_display, knowledge_list, result_files, html_preview
+        ]
+    )
+    
     download_pdf_btn.click(
         fn=on_download_pdf,
         inputs=[project_state],
@@ -382,11 +449,20 @@ if __name__ == "__main__":
     print("🚀 启动论文阅读与代码分析系统...")
     print(f"📁 临时文件目录: {config.TEMP_DIR}")
     print("🌐 Gradio界面将在浏览器中打开...")
+    threading.Thread(target=pipeline.warmup, name="pipeline-warmup", daemon=True).start()
+    if config.WORKSPACE_SWEEP_INTERVAL:
+        workspace.start_sweeper()
+        print(f"🧹 项目目录 {config.WORKSPACE_DIR} 配额 {config.WORKSPACE_QUOTA_MB}MB，保留 {config.WORKSPACE_MAX_AGE_HOURS:g} 小时")
+    if config.METRICS_PORT:
+        start_metrics_server(config.METRICS_PORT)
+        print(f"📈 指标: http://127.0.0.1:{config.METRICS_PORT}/metrics")
     
-    app.launch(
+    app.queue(default_concurrency_limit=config.GRADIO_CONCURRENCY_LIMIT).launch(
         server_name="0.0.0.0",
         server_port=7860,
         share=False,
         debug=True,
-        show_error=True
+        show_error=True,
+        # Blog预览中的图片通过文件路由从项目目录读取
+        allowed_paths=[config.WORKSPACE_DIR]
     )
@@ -0,0 +1,219 @@
+"""
+预取热门论文的后台调度入口
+
+从RSS/Atom/JSON来源(如 arXiv 分类的RSS)或论文列表文件读取论文，在低峰时段内按并发数和每日篇数上限
+预先执行下载、PDF转TEX、代码克隆与分析、论文理解和Blog生成。各步骤的结果写入共享缓存(CACHE_DIR)，
+用户之后提交同一篇论文时直接命中缓存。预取不调用计费接口。
+
+用法:
+    python prefetch_app.py https://rss.arxiv.org/rss/cs.CL --loop
+    python prefetch_app.py papers.txt --now --workers 2 --daily-limit 10
+"""
+
+import argparse
+import html
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import date, datetime
+from datetime import time as dtime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from batch_app import BatchRunner, parse_paper_list
+from src.core.pipeline import pipeline
+from src.core.project_state import ProjectState
+from src.utils.metrics import PREFETCH_PAPERS
+from src.utils.paper_id import arxiv_id, canonical_paper_id
+from src.utils.workspace import workspace
+from config import Config
+
+config = Config()
+logger = logging.getLogger("prefetch")
+
+_URL = re.compile(r"https?://[^\s<>\"'\])]+")
+# RSS描述或JSON中不带链接的arXiv编号，如 arXiv:2401.12345v1 / "id": "2401.12345"
+_BARE_ARXIV = re.compile(r"(?:arxiv:\s*|\"id\"\s*:\s*\")(\d{4}\.\d{4,5}(?:v\d+)?)", re.IGNORECASE)
+
+Window = Optional[Tuple[dtime, dtime]]
+
+
+def normalize_paper_url(url: str) -> Optional[str]:
+    """arXiv链接统一为PDF链接，其他链接只接受.pdf；不是论文链接时返回None"""
+    paper = arxiv_id(url)
+    if paper:
+        return f"https://arxiv.org/pdf/{paper}"
+    if urlsplit(url).path.lower().endswith(".pdf"):
+        return url
+    return None
+
+
+def parse_feed(text: str) -> List[Tuple[str, str]]:
+    """从RSS/Atom/JSON/HTML文本中抽取论文链接，按出现顺序去重，返回 [(pdf_url, "")]"""
+    text = html.unescape(text)
+    candidates = [m.group(0) for m in _URL.finditer(text)]
+    candidates += [f"https://arxiv.org/abs/{m.group(1)}" for m in _BARE_ARXIV.finditer(text)]
+    papers: Dict[str, str] = {}
+    for url in candidates:
+        pdf_url = normalize_paper_url(url)
+        if pdf_url:
+            papers.setdefault(canonical_paper_id(pdf_url), pdf_url)
+    return [(pdf_url, "") for pdf_url in papers.values()]
+
+
+def load_papers(source: str) -> List[Tuple[str, str]]:
+    """读取论文来源: http(s)链接或本地文件；每行 `PDF链接 [Git链接]` 的列表文件按 batch_app 的格式解析"""
+    if source.startswith(("http://", "https://")):
+        import requests
+
+        response = requests.get(source, timeout=30, headers={"User-Agent": "FastPaperReader"})
+        response.raise_for_status()
+        return parse_feed(response.text)
+    with open(source, "r", encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith(("<", "{", "[")):
+        return parse_feed(text)
+    papers: Dict[str, Tuple[str, str]] = {}
+    for pdf_url, git_url in parse_paper_list(source):
+        pdf_url = normalize_paper_url(pdf_url) or pdf_url
+        papers.setdefault(canonical_paper_id(pdf_url), (pdf_url, git_url))
+    return list(papers.values())
+
+
+def parse_window(spec: str) -> Window:
+    """解析 "HH:MM-HH:MM"，为空时返回None(不限时段)"""
+    if not spec.strip():
+        return None
+    start, end = (dtime.fromisoformat(part.strip()) for part in spec.split("-", 1))
+    return start, end
+
+
+def in_window(window: Window, now: Optional[datetime] = None) -> bool:
+    """当前时间是否在预取时段内，时段可以跨零点"""
+    if window is None or window[0] == window[1]:
+        return True
+    start, end = window
+    current = (now or datetime.now()).time()
+    if start < end:
+        return start <= current < end
+    return current >= start or current < end
+
+
+class PrefetchRunner(BatchRunner):
+    """在预取时段内批量运行全部步骤，不计费，并限制每天实际处理的论文篇数
+
+    已预取完成或全局索引中已有结果的论文直接跳过且不占用额度；超出时段或额度的论文记为deferred，下次运行时再处理。
+    """
+
+    def __init__(self, output_dir: str, workers: int = 1, daily_limit: int = 20,
+                 window: Window = None, search_knowledge: bool = True):
+        super().__init__(output_dir, access_key="", client_name="", workers=workers,
+                         search_knowledge=search_knowledge)
+        self.daily_limit = daily_limit
+        self.window = window
+        self._budget_path = os.path.join(output_dir, "prefetch_budget.json")
+        self._budget_lock = threading.Lock()
+
+    def _create_state(self, pdf_url: str, git_url: str) -> ProjectState:
+        """预取任务不调用计费接口"""
+        state = ProjectState()
+        state.pdf_url = pdf_url
+        state.git_url = git_url or None
+        workspace.touch(state.project_id)
+        state.update_step(1, "completed", f"预取项目，PDF: {pdf_url}")
+        return state
+
+    def used_today(self) -> int:
+        try:
+            with open(self._budget_path, "r", encoding="utf-8") as f:
+                budget = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        return budget.get("used", 0) if budget.get("date") == date.today().isoformat() else 0
+
+    def _take_budget(self) -> bool:
+        """占用一篇的额度，今日额度用完时返回False；0表示不限制"""
+        with self._budget_lock:
+            used = self.used_today()
+            if self.daily_limit and used >= self.daily_limit:
+                return False
+            tmp_path = f"{self._budget_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"date": date.today().isoformat(), "used": used + 1}, f)
+            os.replace(tmp_path, self._budget_path)
+            return True
+
+    @staticmethod
+    def _skipped(pdf_url: str, git_url: str, status: str, reason: str) -> Dict:
+        """未执行的论文的报告记录"""
+        return {"pdf_url": pdf_url, "git_url": git_url, "done": [], "warnings": [], "status": status,
+                "state": None, "error": reason, "elapsed": 0.0}
+
+    def process_paper(self, pdf_url: str, git_url: str) -> Dict:
+        record = self._load_checkpoint(pdf_url)
+        if record and record["status"] == "completed":
+            PREFETCH_PAPERS.inc(result="cached")
+            return record
+        # 用户已生成过的论文同样无需预取
+        if pipeline.find_reusable(pdf_url, git_url):
+            PREFETCH_PAPERS.inc(result="indexed")
+            return self._skipped(pdf_url, git_url, "indexed", "全局索引中已有结果")
+        # 每篇开始前检查，时段结束后不再开始新的论文
+        if not in_window(self.window):
+            PREFETCH_PAPERS.inc(result="deferred")
+            return self._skipped(pdf_url, git_url, "deferred", "不在预取时段")
+        if not self._take_budget():
+            PREFETCH_PAPERS.inc(result="deferred")
+            return self._skipped(pdf_url, git_url, "deferred", "今日预取额度已用完")
+        record = super().process_paper(pdf_url, git_url)
+        PREFETCH_PAPERS.inc(result=record["status"])
+        return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在低峰时段预取热门论文，生成共享缓存")
+    parser.add_argument("source", nargs="?", default=config.PREFETCH_FEED,
+                        help="RSS/Atom/JSON链接，或论文列表文件(每行: PDF链接 [Git链接])")
+    parser.add_argument("--output", default=os.path.join(config.OUTPUT_DIR, "prefetch"), help="检查点与报告目录")
+    parser.add_argument("--workers", type=int, default=config.PREFETCH_WORKERS, help="同时处理的论文数")
+    parser.add_argument("--daily-limit", type=int, default=config.PREFETCH_DAILY_LIMIT,
+                        help="每天最多处理的论文数，0表示不限制")
+    parser.add_argument("--window", default=config.PREFETCH_WINDOW, help="预取时段(本地时间)，如 01:00-07:00")
+    parser.add_argument("--now", action="store_true", help="忽略预取时段立即执行")
+    parser.add_argument("--loop", action="store_true", help="常驻运行，每隔 --interval 秒检查一次来源")
+    parser.add_argument("--interval", type=int, default=config.PREFETCH_INTERVAL, help="常驻运行时的检查间隔(秒)")
+    parser.add_argument("--skip-search", action="store_true", help="跳过知识库自动搜索")
+    args = parser.parse_args()
+    if not args.source:
+        parser.error("未指定论文来源，请传入参数或配置 PREFETCH_FEED")
+
+    config.ensure_directories()
+    if config.WORKSPACE_SWEEP_INTERVAL:
+        workspace.start_sweeper()
+    window = None if args.now else parse_window(args.window)
+    runner = PrefetchRunner(args.output, workers=args.workers, daily_limit=args.daily_limit,
+                            window=window, search_knowledge=not args.skip_search)
+    while True:
+        if not in_window(window):
+            print(f"⏸️ 当前不在预取时段 {args.window}")
+        else:
+            try:
+                papers = load_papers(args.source)
+            except Exception as e:
+                logger.error(f"Failed to load prefetch source {args.source}: {e}")
+                papers = []
+            print(f"🚀 预取 {len(papers)} 篇论文，并发数 {args.workers}，今日已处理 {runner.used_today()}/{args.daily_limit or '不限'}")
+            if papers:
+                records = runner.run(papers)
+                completed = sum(1 for r in records if r["status"] == "completed")
+                print(f"🎉 完成 {completed}/{len(records)}，报告: {os.path.join(args.output, 'batch_report.md')}")
+        if not args.loop:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
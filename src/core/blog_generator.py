@@ -1,12 +1,173 @@
-from typing import Dict, Optional
-from jinja2 import Environment, FileSystemLoader
+from typing import Dict, List, Optional, Tuple
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from markupsafe import Markup, escape
+from functools import lru_cache
+import html
+import logging
 import os
+import re
+
+import markdown
+
+from config import config
+from .blog_sections import split_markdown_sections
+from .figure_assets import IMAGE_PATTERN, FigureAsset
+
+logger = logging.getLogger(__name__)
+
+# Mermaid支持的图表类型(首行关键字)
+MERMAID_DIAGRAM_TYPES = (
+    "graph", "flowchart", "sequenceDiagram", "classDiagram", "stateDiagram", "stateDiagram-v2",
+    "erDiagram", "gantt", "pie", "journey", "mindmap", "timeline", "gitGraph", "quadrantChart",
+    "requirementDiagram", "xychart-beta", "sankey-beta", "block-beta", "C4Context",
+)
+
+_FENCE_PATTERN = re.compile(r"^(```|~~~)[ \t]*([\w+-]*)[^\n]*\n(.*?)^\1[ \t]*$", re.M | re.S)
+_CODE_PATTERN = re.compile(r"(^(```|~~~).*?^\2[ \t]*$|`[^`\n]+`)", re.M | re.S)
+_MATH_PATTERN = re.compile(
+    r"\$\$.+?\$\$|\\\[.+?\\\]|\\\(.+?\\\)|(?<![\\$\w])\$(?=\S)[^$\n]+?(?<=\S)\$(?!\d)",
+    re.S,
+)
+_EAGER_IMG_PATTERN = re.compile(r"<img (?![^>]*\bloading=)")
+# 方括号节点文本中含括号等特殊字符且未加引号；以 ( [ / \ 开头的是 [(数据库)]、[[子程序]]、[/梯形/] 等节点形状，不改写
+_UNQUOTED_LABEL_PATTERN = re.compile(r"(\b\w+)\[(?![\"(\[/\\])([^\]\n\"]*[(){}<>;][^\]\n\"]*)\]")
+
+
+# 示例图表为固定内容，模块加载时生成一次
+_FLOWCHART_DIAGRAM = (
+    "graph TD\n"
+    "    A[输入] --> B[处理]\n"
+    "    B --> C[输出]\n"
+)
+_SEQUENCE_DIAGRAM = (
+    "sequenceDiagram\n"
+    "    participant A as 用户\n"
+    "    participant B as 系统\n"
+    "    A->>B: 请求\n"
+    "    B->>A: 响应\n"
+)
+
+
+def _nl2br(value: str) -> Markup:
+    return Markup("<br>\n".join(escape(value or "").split("\n")))
+
+
+@lru_cache(maxsize=None)
+def get_template_env() -> Environment:
+    """进程内共享的Jinja2环境: 字节码缓存到磁盘，按TEMPLATE_AUTO_RELOAD决定是否检查模板更新，并预编译全部模板"""
+    template_dir = os.path.join(os.path.dirname(__file__), '..', 'templates')
+    os.makedirs(config.TEMPLATE_CACHE_DIR, exist_ok=True)
+    env = Environment(
+        loader=FileSystemLoader(template_dir),
+        bytecode_cache=FileSystemBytecodeCache(config.TEMPLATE_CACHE_DIR),
+        auto_reload=config.TEMPLATE_AUTO_RELOAD,
+    )
+    env.filters['nl2br'] = _nl2br
+    for name in env.list_templates(extensions=["html"]):
+        env.get_template(name)
+    return env
+
+
+@lru_cache(maxsize=512)
+def _render_section_fragment(section_key: str, title: str, content: str, is_html: bool,
+                             details: Tuple[Tuple[str, str, str], ...]) -> str:
+    """按内容缓存单个章节的HTML片段，批量渲染时相同章节不会重复渲染"""
+    section = {
+        "title": title,
+        "content": content,
+        "is_html": is_html,
+        "details": [{"type": t, "title": dt, "content": dc} for t, dt, dc in details],
+    }
+    return str(get_template_env().get_template('_section.html').module.render_section(section_key, section))
+
+
+@lru_cache(maxsize=256)
+def _markdown_to_html(markdown_text: str) -> str:
+    """markdown转HTML并按内容缓存，公式与mermaid代码块在转换前替换为占位符，避免被markdown改写"""
+    placeholders: Dict[str, str] = {}
+
+    def stash(fragment_html: str) -> str:
+        key = f"BLOGPLACEHOLDER{len(placeholders)}X"
+        placeholders[key] = fragment_html
+        return key
+
+    def replace_mermaid(match: re.Match) -> str:
+        if match.group(2).lower() != "mermaid":
+            return match.group(0)
+        diagram = _prepare_mermaid(match.group(3))
+        return "\n" + stash(f'<pre class="mermaid">{html.escape(diagram)}</pre>') + "\n"
+
+    text = _FENCE_PATTERN.sub(replace_mermaid, markdown_text)
+
+    # 仅在代码块之外保护公式
+    parts = []
+    last = 0
+    for match in _CODE_PATTERN.finditer(text):
+        parts.append(_MATH_PATTERN.sub(lambda m: stash(html.escape(m.group(0))), text[last:match.start()]))
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(_MATH_PATTERN.sub(lambda m: stash(html.escape(m.group(0))), text[last:]))
+
+    body = markdown.markdown(
+        "".join(parts),
+        extensions=["fenced_code", "tables", "codehilite", "sane_lists"],
+        extension_configs={"codehilite": {"guess_lang": False, "css_class": "codehilite"}},
+    )
+    for key, fragment in placeholders.items():
+        body = body.replace(f"<p>{key}</p>", fragment).replace(key, fragment)
+    # 其余图片也延迟到滚动到附近时再加载
+    return _EAGER_IMG_PATTERN.sub('<img loading="lazy" decoding="async" ', body)
+
+
+def _prepare_mermaid(diagram: str) -> str:
+    """校验mermaid图表，先做确定性修正，仍无效且开启RENDER_LLM_REPAIR时才调用LLM修复"""
+    diagram = diagram.strip()
+    first_line = diagram.split("\n", 1)[0].strip()
+    if first_line.startswith(("graph", "flowchart")):
+        # 节点文本中含括号等特殊字符时需加引号，这是LLM生成图表最常见的错误
+        diagram = _UNQUOTED_LABEL_PATTERN.sub(lambda m: f'{m.group(1)}["{m.group(2)}"]', diagram)
+    if _is_valid_mermaid(diagram) or not config.RENDER_LLM_REPAIR:
+        return diagram
+    return _repair_mermaid(diagram)
+
+
+def _is_valid_mermaid(diagram: str) -> bool:
+    """轻量校验: 图表类型关键字与括号配对"""
+    lines = [line.strip() for line in diagram.split("\n") if line.strip() and not line.strip().startswith("%%")]
+    if not lines or not lines[0].split()[0].startswith(MERMAID_DIAGRAM_TYPES):
+        return False
+    pairs = {")": "(", "]": "[", "}": "{"}
+    for line in lines:
+        stack = []
+        for ch in re.sub(r'"[^"]*"', "", line):
+            if ch in "([{":
+                stack.append(ch)
+            elif ch in pairs:
+                if not stack or stack.pop() != pairs[ch]:
+                    return False
+        if stack:
+            return False
+    return True
+
+
+def _repair_mermaid(diagram: str) -> str:
+    """调用Claude CLI修复无法解析的mermaid图表，失败时保留原图"""
+    from ..utils.subprocess_manager import subprocess_manager
+
+    prompt = f"下面的mermaid图表无法解析，请修正语法错误，只输出修正后的mermaid代码，不要解释:\n```mermaid\n{diagram}\n```"
+    result = subprocess_manager.run_sync(subprocess_manager.claude_argv(prompt, accept_edits=False), timeout=120)
+    if not result.ok:
+        logger.warning(f"Mermaid repair failed: {result.stderr[-200:]}")
+        return diagram
+    match = _FENCE_PATTERN.search(result.stdout)
+    repaired = (match.group(3) if match else result.stdout).strip()
+    return repaired if _is_valid_mermaid(repaired) else diagram
+
 
 class BlogGenerator:
     def __init__(self):
-        # 设置Jinja2环境
-        template_dir = os.path.join(os.path.dirname(__file__), '..', 'templates')
-        self.env = Environment(loader=FileSystemLoader(template_dir))
+        # 共享预编译的Jinja2环境
+        self.env = get_template_env()
     
     def generate_blog(self, 
                      paper_analysis: Dict, 
@@ -16,15 +177,65 @@ class BlogGenerator:
         
         # 准备模板数据
         template_data = {
-            "sections": self._prepare_sections(paper_analysis, code_analysis),
+            "title": "论文分析结果",
+            "sections": self._render_fragments(self._prepare_sections(paper_analysis, code_analysis)),
             "has_code": code_analysis is not None,
-            "knowledge_base": knowledge_base or {}
+            "code_analysis": code_analysis,
+            "knowledge_base": knowledge_base or {},
+            "pygments_css": self._pygments_css()
         }
         
         # 渲染模板
         template = self.env.get_template('blog.html')
         return template.render(**template_data)
     
+    def render_markdown(self, markdown_text: str, knowledge_base: Optional[List[str]] = None,
+                        figures: Optional[Dict[str, FigureAsset]] = None) -> str:
+        """将Blog markdown确定性地渲染为HTML: 公式交给KaTeX、代码由Pygments高亮、mermaid图表由模板渲染
+
+        figures: {markdown中的图片路径: 处理后的图片}，对应的图片输出为懒加载的响应式<img>
+        """
+        if figures:
+            markdown_text = IMAGE_PATTERN.sub(
+                lambda m: figures[m.group(2)].img_tag(m.group(1)) if m.group(2) in figures else m.group(0),
+                markdown_text)
+        title, sections = split_markdown_sections(markdown_text)
+        rendered = {}
+        for index, (section_title, section_md) in enumerate(sections):
+            rendered[f"section-{index + 1}"] = {
+                "title": section_title,
+                "content": _markdown_to_html(section_md),
+                "details": [],
+                "is_html": True,
+            }
+        template = self.env.get_template('blog.html')
+        return template.render(
+            title=title or "论文解读",
+            sections=self._render_fragments(rendered),
+            has_code=False,
+            code_analysis=None,
+            knowledge_base={"sources": knowledge_base or []},
+            pygments_css=self._pygments_css(),
+        )
+    
+    def _render_fragments(self, sections: Dict) -> Dict:
+        """为每个章节附加(缓存的)HTML片段"""
+        for key, section in sections.items():
+            details = tuple((d.get("type", ""), d.get("title", ""), d.get("content", "") or "") for d in section["details"])
+            section["fragment"] = _render_section_fragment(
+                key, section["title"], section["content"] or "", section["is_html"], details
+            )
+        return sections
+    
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _pygments_css() -> str:
+        try:
+            from pygments.formatters import HtmlFormatter
+        except ImportError:
+            return ""
+        return HtmlFormatter(style="default").get_style_defs(".codehilite")
+    
     def _prepare_sections(self, paper_analysis: Dict, code_analysis: Optional[Dict]) -> Dict:
         """准备各个部分的内容"""
         sections = {}
@@ -60,7 +271,8 @@ class BlogGenerator:
             sections[key] = {
                 "title": title,
                 "content": content,
-                "details": details
+                "details": details,
+                "is_html": False
             }
         
         return sections
@@ -75,17 +287,9 @@ class BlogGenerator:
     
     def _generate_flowchart(self, data: Dict) -> str:
         """生成流程图"""
-        mermaid = "graph TD\n"
         # 简单示例
-        mermaid += "    A[输入] --> B[处理]\n"
-        mermaid += "    B --> C[输出]\n"
-        return mermaid
+        return _FLOWCHART_DIAGRAM
     
     def _generate_sequence_diagram(self, data: Dict) -> str:
         """生成序列图"""
-        mermaid = "sequenceDiagram\n"
-        mermaid += "    participant A as 用户\n"
-        mermaid += "    participant B as 系统\n"
-        mermaid += "    A->>B: 请求\n"
-        mermaid += "    B->>A: 响应\n"
-        return mermaid
\ No newline at end of file
+        return _SEQUENCE_DIAGRAM
\ No newline at end of file
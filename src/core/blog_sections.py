@@ -0,0 +1,171 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from ..utils.artifact_cache import digest
+
+# Blog生成提示词版本，修改模块生成方式时递增，使旧的章节缓存失效
+BLOG_PROMPT_VERSION = "blog-v1"
+
+
+@dataclass(frozen=True)
+class SectionSpec:
+    """Blog的一个标准模块"""
+    key: str
+    title: str
+    aliases: Tuple[str, ...]        # 在生成的markdown标题中识别该模块
+    tex_keywords: Tuple[str, ...]   # 在论文\section标题中查找相关内容
+    uses_code: bool = False         # 是否需要代码分析结果
+
+
+# 报告的7个标准输出模块，顺序即Blog中的顺序
+BLOG_SECTIONS: List[SectionSpec] = [
+    SectionSpec("motivation", "动机", ("动机", "motivation"), ("introduction", "motivation")),
+    SectionSpec("background", "背景", ("背景", "background"), ("introduction", "background", "related", "preliminar")),
+    SectionSpec("limitations", "同类方法的缺陷", ("缺陷", "局限", "不足", "limitation"), ("related", "introduction", "limitation")),
+    SectionSpec("problem", "解决的问题", ("问题", "problem"), ("introduction", "problem", "formulation")),
+    SectionSpec("methodology", "方法", ("方法", "method", "approach"), ("method", "approach", "model", "architecture", "framework", "algorithm"), uses_code=True),
+    SectionSpec("experiments", "实验", ("实验", "experiment"), ("experiment", "evaluation", "result", "ablation", "setup"), uses_code=True),
+    SectionSpec("conclusion", "结论", ("结论", "总结", "conclusion"), ("conclusion", "discussion", "limitation", "future")),
+]
+
+# split_blog_modules 中不属于标准模块的内容: 开头的导语，以及其他标题的章节
+PREFACE_KEY = "_preface"
+EXTRA_KEY = "_extra"
+
+_FENCE_PATTERN = re.compile(r"^(```|~~~).*?^\1[ \t]*$", re.M | re.S)
+_HEADING_PATTERN = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$", re.M)
+_TEX_SECTION_PATTERN = re.compile(r"\\section\*?\{([^{}]*)\}")
+_TEX_TITLE_PATTERN = re.compile(r"\\title\{([^{}]+)\}")
+_WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z\-]{3,}")
+
+
+def split_markdown_sections(markdown_text: str) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+    """按最高层级标题切分章节；若最高层级只有开头一个标题，则将其视为文章标题"""
+    code_spans = [m.span() for m in _FENCE_PATTERN.finditer(markdown_text)]
+    headings = [
+        m for m in _HEADING_PATTERN.finditer(markdown_text)
+        if not any(start <= m.start() < end for start, end in code_spans)
+    ]
+    if not headings:
+        return None, [("", markdown_text)]
+
+    title = None
+    level = min(len(m.group(1)) for m in headings)
+    top = [m for m in headings if len(m.group(1)) == level]
+    if len(top) == 1 and top[0] is headings[0] and len(headings) > 1:
+        title = top[0].group(2).strip()
+        level = min(len(m.group(1)) for m in headings[1:])
+        top = [m for m in headings[1:] if len(m.group(1)) == level]
+
+    sections = []
+    body_start = headings[0].end() if title else 0
+    preface = markdown_text[body_start:top[0].start()].strip()
+    if preface:
+        sections.append(("", preface))
+    for i, match in enumerate(top):
+        end = top[i + 1].start() if i + 1 < len(top) else len(markdown_text)
+        sections.append((match.group(2).strip(), markdown_text[match.end():end].strip()))
+    return title, sections
+
+
+def match_section(heading: str) -> Optional[SectionSpec]:
+    """根据标题文字判断属于哪个标准模块"""
+    lowered = heading.lower()
+    for spec in BLOG_SECTIONS:
+        if any(alias in lowered for alias in spec.aliases):
+            return spec
+    return None
+
+
+def split_blog_modules(markdown_text: str) -> Dict[str, str]:
+    """把生成的Blog拆分为标准模块，返回 {模块key: 模块正文}
+
+    不属于标准模块的内容不丢弃: 导语记为 PREFACE_KEY，其他标题(及重复的模块标题)连同标题一起按原顺序记为 EXTRA_KEY。
+    """
+    _, sections = split_markdown_sections(markdown_text)
+    modules: Dict[str, str] = {}
+    extras: List[str] = []
+    for heading, body in sections:
+        spec = match_section(heading) if heading else None
+        if spec and spec.key not in modules:
+            modules[spec.key] = body
+        elif heading:
+            extras.append(f"## {heading}\n\n{body}".strip())
+        elif body:
+            modules[PREFACE_KEY] = body
+    if extras:
+        modules[EXTRA_KEY] = "\n\n".join(extras)
+    return modules
+
+
+def assemble_blog(modules: Dict[str, str], title: Optional[str] = None) -> str:
+    """按标准顺序拼接各模块，导语在最前，其他章节在标准模块之后"""
+    parts = [f"# {title}"] if title else []
+    if modules.get(PREFACE_KEY):
+        parts.append(modules[PREFACE_KEY].strip())
+    for spec in BLOG_SECTIONS:
+        if spec.key in modules:
+            parts.append(f"## {spec.title}\n\n{modules[spec.key].strip()}")
+    if modules.get(EXTRA_KEY):
+        parts.append(modules[EXTRA_KEY].strip())
+    return "\n\n".join(parts) + "\n"
+
+
+def tex_title(tex_content: str) -> Optional[str]:
+    match = _TEX_TITLE_PATTERN.search(tex_content)
+    return " ".join(match.group(1).split()) if match else None
+
+
+def split_tex_sections(tex_content: str) -> List[Tuple[str, str]]:
+    """按\\section切分TEX，第一个\\section之前的内容(标题、摘要)记为abstract"""
+    matches = list(_TEX_SECTION_PATTERN.finditer(tex_content))
+    if not matches:
+        return [("abstract", tex_content)]
+    sections = [("abstract", tex_content[:matches[0].start()])]
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(tex_content)
+        sections.append((match.group(1).strip(), tex_content[match.start():end]))
+    return sections
+
+
+def _relevant_passages(spec: SectionSpec, section_tex: str, knowledge: str, limit: int = 8) -> str:
+    """挑选与该模块相关的知识库段落: 命中模块关键词或该模块论文内容中的术语"""
+    passages = [p.strip() for p in re.split(r"\n\s*\n", knowledge or "") if p.strip()]
+    if not passages:
+        return ""
+    terms = {w.lower() for w in _WORD_PATTERN.findall(section_tex)}
+    keywords = set(spec.aliases) | set(spec.tex_keywords)
+    scored = []
+    for index, passage in enumerate(passages):
+        lowered = passage.lower()
+        score = 3 * sum(1 for k in keywords if k in lowered)
+        score += len(terms & {w.lower() for w in _WORD_PATTERN.findall(passage)})
+        if score:
+            scored.append((score, index, passage))
+    selected = sorted(sorted(scored, key=lambda item: -item[0])[:limit], key=lambda item: item[1])
+    return "\n\n".join(" ".join(p.split()) for _, _, p in selected)
+
+
+def section_inputs(spec: SectionSpec, tex_content: str, code_content: str, knowledge: str) -> Dict[str, str]:
+    """该模块生成所需的输入: 相关的TEX章节、知识库段落，以及(方法/实验模块的)代码分析"""
+    tex_sections = split_tex_sections(tex_content)
+    related = [body for heading, body in tex_sections
+               if heading == "abstract" or any(k in heading.lower() for k in spec.tex_keywords)]
+    # 只有摘要时说明没有匹配到章节，退回使用全文
+    section_tex = "\n".join(related) if len(related) > 1 else tex_content
+    return {
+        "tex": section_tex,
+        "knowledge": _relevant_passages(spec, section_tex, knowledge),
+        "code": code_content if spec.uses_code else "",
+    }
+
+
+def section_digest(spec: SectionSpec, inputs: Dict[str, str]) -> str:
+    """模块输入摘要，输入不变时复用单独生成的该模块内容"""
+    return digest(BLOG_PROMPT_VERSION, spec.key, inputs["tex"], inputs["knowledge"], inputs["code"])
+
+
+def blog_digest(tex_content: str) -> str:
+    """整篇生成的Blog按TEX缓存，用于在只重新生成部分模块时保留工作流返回的导语、其他章节和标题"""
+    return digest(BLOG_PROMPT_VERSION, "full", tex_content)
@@ -1,7 +1,6 @@
-import subprocess
-import asyncio
 from typing import Dict, Optional
 from config import config
+from ..utils.subprocess_manager import subprocess_manager
 
 class CodeAnalyzer:
     def __init__(self):
@@ -41,21 +40,16 @@ class CodeAnalyzer:
     async def _run_claude_analysis(self, repo_path: str, prompt: str) -> Dict:
         """运行Claude Code分析"""
         try:
-            # 切换到代码目录并运行claude -p
-            cmd = f'cd "{repo_path}" && {self.claude_command} "{prompt}"'
-            
-            process = await asyncio.create_subprocess_shell(
-                cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+            # 在代码目录中运行claude -p
+            result = await subprocess_manager.run(
+                subprocess_manager.claude_argv(prompt, accept_edits=False),
+                cwd=repo_path
             )
             
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode == 0:
-                return self._parse_claude_output(stdout.decode())
+            if result.ok:
+                return self._parse_claude_output(result.stdout)
             else:
-                raise Exception(f"Claude分析失败: {stderr.decode()}")
+                raise Exception(f"Claude分析失败: {result.stderr}")
                 
         except Exception as e:
             # 如果Claude Code不可用，返回基础分析
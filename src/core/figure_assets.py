@@ -0,0 +1,180 @@
+import hashlib
+import html
+import io
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# markdown图片: ![说明](路径 "标题")
+IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"]*")?\s*\)')
+
+@dataclass
+class FigureAsset:
+    """一张去重后的图片及其不同宽度的版本"""
+    digest: str
+    width: int
+    height: int
+    variants: List[Tuple[int, str]] = field(default_factory=list)  # (宽度, 相对HTML的路径)，按宽度升序
+
+    def img_tag(self, alt: str = "") -> str:
+        """懒加载的响应式<img>标签"""
+        largest = self.variants[-1][1]
+        attrs = [f'src="{html.escape(largest)}"']
+        if len(self.variants) > 1:
+            srcset = ", ".join(f"{html.escape(path)} {width}w" for width, path in self.variants)
+            attrs.append(f'srcset="{srcset}"')
+            attrs.append(f'sizes="(max-width: {self.variants[-1][0]}px) 100vw, {self.variants[-1][0]}px"')
+        if self.width and self.height:
+            # 预留与图片等比例的位置，加载时页面不跳动
+            display_width = self.variants[-1][0]
+            attrs.append(f'width="{display_width}" height="{round(self.height * display_width / self.width)}"')
+        attrs.append(f'alt="{html.escape(alt)}" loading="lazy" decoding="async"')
+        return f"<img {' '.join(attrs)}>"
+
+
+def _encode(data: bytes, digest: str, extension: str, output_dir: str,
+            widths: Sequence[int], quality: int) -> Tuple[int, int, List[Tuple[int, str]]]:
+    """在子进程中把一张图片转换为若干宽度的WebP，返回 (原始宽, 原始高, [(宽度, 文件名)])
+
+    Pillow在这里才导入，加载本模块不会拖慢应用启动；未安装时抛出ImportError，由调用方原样复制图片。
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        width, height = image.size
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "P") else "RGB")
+        # 只生成不超过原图宽度的版本，原图比最小宽度还小时保留原尺寸
+        targets = sorted({w for w in widths if w < width} | {min(width, max(widths))})
+        variants = []
+        for target in targets:
+            name = f"{digest}-{target}.webp"
+            path = os.path.join(output_dir, name)
+            if not os.path.exists(path):
+                resized = image if target == width else image.resize(
+                    (target, max(1, round(height * target / width))), Image.LANCZOS)
+                # 同一进程的多个线程可能同时转换同一张图片，临时文件名不能只用进程号
+                tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+                try:
+                    resized.save(tmp_path, "WEBP", quality=quality, method=4)
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.unlink(tmp_path)
+            variants.append((target, name))
+    return width, height, variants
+
+
+def _encode_or_copy(args) -> Tuple[int, int, List[Tuple[int, str]]]:
+    """转换失败(未安装Pillow、PDF/EPS插图等)时原样复制"""
+    data, digest, extension, output_dir, widths, quality = args
+    try:
+        return _encode(data, digest, extension, output_dir, widths, quality)
+    except Exception:
+        name = f"{digest}{extension}"
+        path = os.path.join(output_dir, name)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return 0, 0, [(0, name)]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _shared_pool(max_workers: int) -> ProcessPoolExecutor:
+    """进程内共享的转换进程池，首次使用时创建，之后各次渲染复用
+
+    Gradio在多个线程中处理请求，在多线程进程中fork子进程可能继承其他线程持有的锁，因此用spawn方式启动。
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        # 子进程异常退出后进程池不再可用，重新创建
+        if _pool is None or _pool_workers != max_workers or getattr(_pool, "_broken", False):
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = max_workers
+        return _pool
+
+
+def find_image_refs(markdown_text: str) -> List[str]:
+    """Blog markdown中引用的图片路径(去重，保持顺序)"""
+    return list(dict.fromkeys(m.group(2) for m in IMAGE_PATTERN.finditer(markdown_text)))
+
+
+def file_reader(path: str) -> Callable[[], bytes]:
+    """读取磁盘上图片的函数"""
+    def read() -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+    return read
+
+
+class FigureAssetPipeline:
+    """Blog图片处理: 按内容哈希去重，用进程池转换为多种宽度的WebP，生成懒加载的<img>标签
+
+    输出文件名包含内容哈希，相同图片在多篇Blog或重复渲染时不会重复转换。
+    """
+
+    def __init__(self, widths: Optional[Sequence[int]] = None, quality: Optional[int] = None,
+                 max_workers: Optional[int] = None):
+        self.widths = tuple(widths or config.FIGURE_WIDTHS)
+        self.quality = quality or config.FIGURE_QUALITY
+        self.max_workers = max_workers or config.FIGURE_WORKERS
+
+    def process(self, sources: Dict[str, Callable[[], bytes]], output_dir: str,
+                url_prefix: str = "") -> Dict[str, FigureAsset]:
+        """sources: {Blog中的图片引用: 读取图片内容的函数}，返回 {图片引用: FigureAsset}"""
+        os.makedirs(output_dir, exist_ok=True)
+        digests: Dict[str, str] = {}
+        jobs: Dict[str, Tuple[bytes, str]] = {}
+        for ref, read in sources.items():
+            try:
+                data = read()
+            except Exception as e:
+                logger.warning(f"Figure {ref} unavailable: {e}")
+                continue
+            digest = hashlib.sha256(data).hexdigest()[:16]
+            digests[ref] = digest
+            jobs.setdefault(digest, (data, os.path.splitext(ref)[1].lower()))
+        if not jobs:
+            return {}
+
+        results: Dict[str, Tuple[int, int, List[Tuple[int, str]]]] = {}
+        args = [(data, digest, ext, output_dir, self.widths, self.quality) for digest, (data, ext) in jobs.items()]
+        if len(args) == 1 or self.max_workers <= 1:
+            for arg in args:
+                results[arg[1]] = _encode_or_copy(arg)
+        else:
+            try:
+                for arg, result in zip(args, _shared_pool(self.max_workers).map(_encode_or_copy, args)):
+                    results[arg[1]] = result
+            except BrokenProcessPool as e:
+                logger.warning(f"Figure worker pool broken ({e}), converting in-process")
+                for arg in args:
+                    if arg[1] not in results:
+                        results[arg[1]] = _encode_or_copy(arg)
+        logger.info(f"Processed {len(jobs)} unique figures ({len(sources)} references)")
+
+        assets = {}
+        for ref, digest in digests.items():
+            width, height, variants = results[digest]
+            assets[ref] = FigureAsset(digest, width, height,
+                                      [(w, f"{url_prefix}{name}") for w, name in variants])
+        return assets
@@ -0,0 +1,139 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+
+@dataclass
+class PaperLink:
+    """论文中出现的链接"""
+    url: str            # 规范化后的链接，代码仓库只保留到仓库根目录
+    kind: str           # "code" | "model" | "dataset" | "project_page" | "paperswithcode" | "paper" | "other"
+    host: str
+    position: int       # 第一次出现在TEX中的位置
+    mentions: int       # 出现次数
+    score: float        # 越高越可能是本文自己发布的资源
+    context: str        # 第一次出现前后的文字
+
+
+# 一个组合模式完成一次扫描: SSH仓库地址 / 带协议或www.的链接 / 省略协议的常见代码托管链接。
+# TEX正文里的链接可能带 \_ \% 等转义，链接在空白、括号、引号处结束
+_URL_CHARS = r"(?:[^\s{}\\<>\"'|]|\\[_%#&~])+"
+_LINK = re.compile(
+    r"(?P<ssh>git@(?P<ssh_host>github\.com|gitlab\.com|bitbucket\.org):(?P<ssh_path>[\w\-./]+))"
+    rf"|(?P<url>(?:https?://|www\.){_URL_CHARS})"
+    rf"|(?<![\w/.@])(?P<bare>(?:github\.com|gitlab\.com|bitbucket\.org|huggingface\.co|paperswithcode\.com)/{_URL_CHARS})",
+    re.IGNORECASE,
+)
+_TEX_ESCAPE = re.compile(r"\\([_%#&~])")
+_TRAILING = ".,;:!?)]}'\""
+
+# 链接前文出现这些说法时，通常是论文自己的代码/主页
+_RELEASE_CONTEXT = re.compile(
+    r"(code|implementation|source|models?|weights|checkpoints?|data(?:set)?s?|project page|website|demo)"
+    r"[^.]{0,60}(available|released|found|provided|hosted|public|open[- ]?source)"
+    r"|(available|released|open[- ]?sourced?)\s+(at|on|from|in)"
+    r"|our (code|implementation|project|models?|data(?:set)?)"
+    r"|\\footnote\s*\{?\s*$"
+    r"|代码|开源",
+    re.IGNORECASE,
+)
+_CITATION_CONTEXT = re.compile(r"\\bibitem|\\cite\w*\{[^}]*\}[\s(~]*$|\bet al\.", re.IGNORECASE)
+_BIBLIOGRAPHY = re.compile(r"\\begin\{thebibliography\}|\\section\*?\{(references|bibliography)\}|\\bibliography\{", re.IGNORECASE)
+
+_CODE_HOSTS = ("github.com", "gitlab.com", "bitbucket.org")
+_DATASET_HOSTS = ("kaggle.com", "zenodo.org", "figshare.com", "data.mendeley.com", "physionet.org")
+_PAPER_HOSTS = ("arxiv.org", "doi.org", "openreview.net", "aclanthology.org", "proceedings.neurips.cc", "openaccess.thecvf.com")
+# GitHub等站点下不是仓库的一级路径
+_NON_REPO_PATHS = {"about", "features", "orgs", "topics", "sponsors", "settings", "marketplace", "explore"}
+
+# 同类链接的基础分，代码仓库最重要
+_KIND_WEIGHT = {"code": 3.0, "model": 2.0, "dataset": 2.0, "project_page": 2.0, "paperswithcode": 1.5, "paper": 0.0, "other": 0.5}
+
+
+def _classify(url: str) -> Optional[Dict[str, str]]:
+    """返回 {url, kind, host}；不是有效链接时返回None"""
+    parts = urlsplit(url if "://" in url else f"https://{url}")
+    host = parts.netloc.lower().removeprefix("www.")
+    if "." not in host:
+        return None
+    segments = [s for s in parts.path.split("/") if s]
+    if host in _CODE_HOSTS:
+        if len(segments) < 2 or segments[0].lower() in _NON_REPO_PATHS:
+            return {"url": f"https://{host}/{'/'.join(segments)}".rstrip("/"), "kind": "other", "host": host}
+        repo = segments[1].removesuffix(".git")
+        return {"url": f"https://{host}/{segments[0]}/{repo}", "kind": "code", "host": host}
+    if host == "huggingface.co":
+        if segments and segments[0] == "datasets" and len(segments) >= 3:
+            return {"url": f"https://{host}/{'/'.join(segments[:3])}", "kind": "dataset", "host": host}
+        if segments and segments[0] == "spaces" and len(segments) >= 3:
+            return {"url": f"https://{host}/{'/'.join(segments[:3])}", "kind": "project_page", "host": host}
+        if len(segments) >= 2 and segments[0] not in ("papers", "docs", "blog"):
+            return {"url": f"https://{host}/{'/'.join(segments[:2])}", "kind": "model", "host": host}
+    if host == "paperswithcode.com":
+        kind = "dataset" if segments and segments[0] == "dataset" else "paperswithcode"
+        return {"url": f"https://{host}/{'/'.join(segments[:2])}", "kind": kind, "host": host}
+    clean = f"{parts.scheme or 'https'}://{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+    if host.endswith(_DATASET_HOSTS) or "dataset" in parts.path.lower():
+        return {"url": clean, "kind": "dataset", "host": host}
+    if host.endswith(_PAPER_HOSTS):
+        return {"url": clean, "kind": "paper", "host": host}
+    if host.endswith(".github.io") or host.endswith(".gitlab.io"):
+        return {"url": clean, "kind": "project_page", "host": host}
+    return {"url": clean, "kind": "other", "host": host}
+
+
+class LinkExtractor:
+    """一次扫描抽取TEX中的全部链接，按类型分类，并按位置与上下文排序
+
+    代码仓库等链接若出现在 "code is available at" 之类的说法或脚注之后、位于正文前部，
+    多半是论文自己发布的资源；出现在参考文献或引用旁的链接多半是别人的工作，排序靠后。
+    """
+
+    def __init__(self, context_window: int = 120):
+        self.context_window = context_window
+
+    def extract(self, text: str) -> List[PaperLink]:
+        """返回去重后的链接，按得分从高到低排序"""
+        bibliography = _BIBLIOGRAPHY.search(text)
+        bib_start = bibliography.start() if bibliography else len(text)
+        length = max(len(text), 1)
+        links: Dict[str, PaperLink] = {}
+
+        for match in _LINK.finditer(text):
+            if match.group("ssh"):
+                raw = f"https://{match.group('ssh_host')}/{match.group('ssh_path')}"
+            else:
+                raw = _TEX_ESCAPE.sub(r"\1", match.group("url") or match.group("bare"))
+            raw = raw.rstrip(_TRAILING)
+            info = _classify(raw)
+            if info is None:
+                continue
+            existing = links.get(info["url"])
+            if existing is not None:
+                existing.mentions += 1
+                existing.score = round(existing.score + 0.2, 3)
+                continue
+
+            before = text[max(0, match.start() - self.context_window):match.start()]
+            after = text[match.end():match.end() + 40]
+            score = _KIND_WEIGHT[info["kind"]] + (1 - match.start() / length)
+            if _RELEASE_CONTEXT.search(before[-100:]):
+                score += 2.0
+            if match.start() >= bib_start or _CITATION_CONTEXT.search(before[-60:]):
+                score -= 2.5
+            links[info["url"]] = PaperLink(
+                url=info["url"], kind=info["kind"], host=info["host"], position=match.start(), mentions=1,
+                score=round(score, 3), context=" ".join(f"{before}⟨link⟩{after}".split()),
+            )
+        return sorted(links.values(), key=lambda link: (-link.score, link.position))
+
+    @staticmethod
+    def best(links: List[PaperLink], kind: str = "code") -> Optional[PaperLink]:
+        """某类链接中得分最高的一个"""
+        return next((link for link in links if link.kind == kind), None)
+
+    def best_repo_url(self, text: str) -> Optional[str]:
+        """论文自己的代码仓库链接"""
+        link = self.best(self.extract(text))
+        return link.url if link else None
@@ -1,86 +1,182 @@
-from typing import Dict, List, Optional
-import openai
+import asyncio
+import json
+import logging
+import random
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
 from config import config
+from .blog_sections import BLOG_SECTIONS, split_tex_sections
+from ..utils.background_loop import background_loop
+from ..utils.metrics import track_backend
+from ..utils.rate_limiter import rate_limits
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "你是一个专业的学术论文分析专家"
+
+# 结构化输出: 字段与Blog的7个标准模块一致
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {spec.key: {"type": "string", "description": spec.title} for spec in BLOG_SECTIONS},
+    "required": [spec.key for spec in BLOG_SECTIONS],
+    "additionalProperties": False,
+}
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "paper_analysis", "strict": True, "schema": ANALYSIS_SCHEMA},
+}
+
+
+def split_tex_chunks(tex_content: str, max_chars: int) -> List[str]:
+    """按\\section把TEX拼成不超过max_chars的若干段，单个章节过长时再按空行切分"""
+    pieces: List[str] = []
+    for _, section in split_tex_sections(tex_content):
+        while len(section) > max_chars:
+            cut = section.rfind("\n\n", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(section[:cut])
+            section = section[cut:]
+        pieces.append(section)
+    chunks: List[str] = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + len(piece) <= max_chars:
+            chunks[-1] += piece
+        else:
+            chunks.append(piece)
+    return [chunk for chunk in chunks if chunk.strip()]
+
 
 class PaperProcessor:
-    def __init__(self):
-        if config.OPENAI_API_KEY:
-            openai.api_key = config.OPENAI_API_KEY
-    
-    async def analyze_paper(self, tex_content: str, knowledge_base: Optional[List[str]] = None) -> Dict:
-        """使用OpenAI分析论文内容"""
-        try:
-            prompt = self._build_analysis_prompt(tex_content, knowledge_base)
-            
-            response = await openai.ChatCompletion.acreate(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "你是一个专业的学术论文分析专家"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=4000
+    """直接调用OpenAI兼容接口分析论文(不经过MCP工作流)
+
+    AsyncOpenAI客户端(httpx连接池)常驻在后台事件循环中，各个回调共享连接；请求经过openai限流器排队，
+    以流式返回，连接错误、超时、限流、5xx以及输出不完整时指数退避重试。结果按JSON Schema结构化输出。
+    论文不截断: 超过 max_input_chars 时按章节分段并发分析，再合并为一份结果。
+    """
+
+    def __init__(self, model: Optional[str] = None, timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None, max_input_chars: Optional[int] = None,
+                 concurrency: Optional[int] = None):
+        self.model = model or config.OPENAI_MODEL
+        self.timeout = timeout or config.OPENAI_TIMEOUT
+        self.max_retries = config.OPENAI_MAX_RETRIES if max_retries is None else max_retries
+        self.max_input_chars = max_input_chars or config.OPENAI_MAX_INPUT_CHARS
+        self.concurrency = concurrency or config.OPENAI_CONCURRENCY
+        self._client: Optional["AsyncOpenAI"] = None
+
+    def _get_client(self) -> "AsyncOpenAI":
+        # 只在后台事件循环中调用；重试由 _complete 统一处理，SDK自身不再重试
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                api_key=config.OPENAI_API_KEY,
+                base_url=config.OPENAI_BASE_URL,
+                max_retries=0,
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                http_client=DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)),
             )
-            
-            return self._parse_analysis_result(response.choices[0].message.content)
-            
+        return self._client
+
+    async def analyze_paper(self, tex_content: str, knowledge_base: Optional[List[str]] = None,
+                            on_delta: Optional[Callable[[str], None]] = None) -> Dict:
+        """使用OpenAI分析论文内容，返回 {模块key: 内容}；失败时返回 {"error": ...}
+
+        可在任意事件循环中await，实际请求在后台事件循环中执行；on_delta 在后台线程中收到流式输出的片段。
+        """
+        try:
+            return await asyncio.wrap_future(background_loop.submit(
+                self._analyze(tex_content, knowledge_base or [], on_delta)))
         except Exception as e:
+            logger.error(f"Paper analysis failed: {e}")
             return {"error": f"论文分析失败: {str(e)}"}
-    
-    def _build_analysis_prompt(self, tex_content: str, knowledge_base: Optional[List[str]]) -> str:
+
+    def analyze_paper_sync(self, tex_content: str, knowledge_base: Optional[List[str]] = None,
+                           on_delta: Optional[Callable[[str], None]] = None) -> Dict:
+        """在同步代码(如Gradio回调)中分析论文"""
+        return asyncio.run(self.analyze_paper(tex_content, knowledge_base, on_delta))
+
+    async def _analyze(self, tex_content: str, knowledge_base: List[str],
+                       on_delta: Optional[Callable[[str], None]]) -> Dict[str, str]:
+        chunks = split_tex_chunks(tex_content, self.max_input_chars)
+        if len(chunks) <= 1:
+            return await self._complete(self._build_analysis_prompt(tex_content, knowledge_base), on_delta)
+
+        logger.info(f"Paper has {len(tex_content)} chars, analyzing in {len(chunks)} parts")
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def analyze_chunk(index: int, chunk: str) -> Dict[str, str]:
+            async with semaphore:
+                return await self._complete(self._build_chunk_prompt(chunk, index, len(chunks)))
+
+        partials = await asyncio.gather(*(analyze_chunk(i, chunk) for i, chunk in enumerate(chunks)))
+        return await self._complete(self._build_merge_prompt(partials, knowledge_base), on_delta)
+
+    async def _complete(self, prompt: str, on_delta: Optional[Callable[[str], None]] = None) -> Dict[str, str]:
+        """流式请求一次结构化输出，可重试的错误按指数退避(带随机抖动)重试"""
+        import openai
+
+        retryable = (openai.APIConnectionError, openai.APITimeoutError, openai.RateLimitError,
+                     openai.InternalServerError, ValueError)
+        for attempt in range(self.max_retries + 1):
+            parts: List[str] = []
+            finish_reason = None
+            try:
+                async with rate_limits.get("openai").aslot():
+                    with track_backend("openai"):
+                        stream = await self._get_client().chat.completions.create(
+                            model=self.model,
+                            messages=[
+                                {"role": "system", "content": SYSTEM_PROMPT},
+                                {"role": "user", "content": prompt},
+                            ],
+                            response_format=RESPONSE_FORMAT,
+                            stream=True,
+                        )
+                        async for chunk in stream:
+                            if not chunk.choices:
+                                continue
+                            choice = chunk.choices[0]
+                            if choice.delta and choice.delta.content:
+                                parts.append(choice.delta.content)
+                                if on_delta:
+                                    on_delta(choice.delta.content)
+                            finish_reason = choice.finish_reason or finish_reason
+                if finish_reason == "length":
+                    raise ValueError("输出超过长度限制")
+                result = json.loads("".join(parts))
+                return {spec.key: str(result.get(spec.key, "")).strip() for spec in BLOG_SECTIONS}
+            except retryable as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(2 ** attempt, 30) * random.uniform(0.5, 1.0)
+                logger.warning(f"OpenAI request failed ({type(e).__name__}: {e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _section_list() -> str:
+        return "\n".join(f"{i}. {spec.title} ({spec.key})" for i, spec in enumerate(BLOG_SECTIONS, 1))
+
+    def _build_analysis_prompt(self, tex_content: str, knowledge_base: List[str]) -> str:
         """构建分析提示词"""
-        prompt = f"""
-        请分析以下论文内容，并按照以下结构输出：
-        
-        1. 动机 (Motivation)
-        2. 背景 (Background)
-        3. 同类方法的缺陷 (Limitations of Existing Methods)
-        4. 解决的问题 (Problem Solved)
-        5. 方法 (Methodology)
-        6. 实验 (Experiments)
-        7. 结论 (Conclusion)
-        
-        论文内容：
-        {tex_content[:8000]}  # 限制长度避免token超限
-        """
-        
+        prompt = f"请分析以下论文内容，按JSON字段输出以下各部分：\n{self._section_list()}\n\n论文内容：\n{tex_content}"
+        if knowledge_base:
+            prompt += f"\n\n参考知识库：\n{chr(10).join(knowledge_base)}"
+        return prompt
+
+    def _build_chunk_prompt(self, chunk: str, index: int, total: int) -> str:
+        return (f"以下是一篇论文的第{index + 1}/{total}部分。只根据这一部分的内容填写各字段，"
+                f"没有相关内容的字段输出空字符串：\n{self._section_list()}\n\n论文内容：\n{chunk}")
+
+    def _build_merge_prompt(self, partials: List[Dict[str, str]], knowledge_base: List[str]) -> str:
+        prompt = (f"以下是同一篇论文各部分的分析结果(JSON列表，按论文顺序)。请合并为对整篇论文的完整分析，"
+                  f"去除重复内容，按JSON字段输出：\n{self._section_list()}\n\n"
+                  f"各部分分析：\n{json.dumps(partials, ensure_ascii=False)}")
         if knowledge_base:
-            prompt += f"\n\n参考知识库：\n{chr(10).join(knowledge_base[:5])}"
-        
+            prompt += f"\n\n参考知识库：\n{chr(10).join(knowledge_base)}"
         return prompt
-    
-    def _parse_analysis_result(self, content: str) -> Dict:
-        """解析分析结果"""
-        sections = {
-            "motivation": "",
-            "background": "",
-            "limitations": "",
-            "problem": "",
-            "methodology": "",
-            "experiments": "",
-            "conclusion": ""
-        }
-        
-        # 简单的文本解析逻辑，后续可以优化
-        lines = content.split('\n')
-        current_section = None
-        
-        for line in lines:
-            line = line.strip()
-            if "动机" in line or "Motivation" in line:
-                current_section = "motivation"
-            elif "背景" in line or "Background" in line:
-                current_section = "background"
-            elif "缺陷" in line or "Limitations" in line:
-                current_section = "limitations"
-            elif "问题" in line or "Problem" in line:
-                current_section = "problem"
-            elif "方法" in line or "Methodology" in line:
-                current_section = "methodology"
-            elif "实验" in line or "Experiments" in line:
-                current_section = "experiments"
-            elif "结论" in line or "Conclusion" in line:
-                current_section = "conclusion"
-            elif current_section and line:
-                sections[current_section] += line + "\n"
-        
-        return sections
\ No newline at end of file
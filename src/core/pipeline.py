@@ -1,36 +1,131 @@
 import asyncio
+import functools
+import json
 import os
 import logging
-import markdown
-from subprocess import Popen, PIPE
-from typing import Tuple, Optional
-import time
-import secrets
-import requests
-import pandas as pd
-
-from datetime import datetime
+import posixpath
+from dataclasses import asdict
+from typing import Dict, List, Tuple, Optional
+
 from .project_state import ProjectState
-from ..processors.pdf_processor import PDFProcessor
-from ..processors.git_processor import GitProcessor
+from .term_linker import TermLinker
+from .link_extractor import LinkExtractor
+from .figure_assets import FigureAsset, FigureAssetPipeline, file_reader, find_image_refs
+from .blog_sections import (BLOG_SECTIONS, SectionSpec, assemble_blog, blog_digest, section_digest, section_inputs,
+                            split_blog_modules, split_markdown_sections, tex_title)
+from ..utils.subprocess_manager import subprocess_manager
+from ..utils.artifact_cache import ArtifactCache, digest, file_digest
+from ..utils.metrics import STEP_DURATION
+from ..utils.workspace import workspace
+from ..utils.single_flight import single_flight
+from ..utils.paper_id import arxiv_id, canonical_paper_id, canonical_repo_id, is_versionless
+from ..utils.paper_index import paper_index
 from config import Config
-from ..processors.mcp_processor import get_keywords, get_link, get_summary, get_knowedge, get_blog
+from ..processors.tex_archive import TexArchive
+from ..processors.mcp_processor import get_keywords, get_link, get_summary, get_knowedge, get_blog, get_blog_section
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 在步骤消息中展示的非代码仓库链接类型
+LINK_LABELS = {"project_page": "项目主页", "model": "模型", "dataset": "数据集"}
+
+# /docs 代码分析提示词版本，修改提示词或其输入时递增，使旧缓存失效
+CODE_ANALYSIS_PROMPT_VERSION = "docs-v2"
+# 全局论文索引的版本，步骤流程或输出格式变化时递增，旧版本生成的结果不再复用
+PIPELINE_VERSION = f"pipeline-v1+{CODE_ANALYSIS_PROMPT_VERSION}"
+
+# 写入全局索引的产物: 索引中的名称 → ProjectState字段
+INDEX_ARTIFACTS = {
+    "tex": "tex_path", "summary": "summary_path", "code_analysis": "code_analysis_path",
+    "knowledge": "knowledge_path", "blog": "blog_path", "blog_html": "html_output",
+}
+# 复用时必须存在的产物
+INDEX_REQUIRED = ("tex", "knowledge", "blog", "blog_html")
+
+
+def timed_step(step_num: int, name: str):
+    """把步骤方法的耗时记录到 state.timing_spans 和步骤耗时指标；返回消息以❌开头记为failed，以⚠️开头记为skipped
+
+    步骤执行期间持有项目工作目录的引用，后台清理不会删除正在使用的目录
+    """
+    def decorator(func):
+        metric_name = func.__name__.replace("_step", "")
+
+        @functools.wraps(func)
+        def wrapper(self, state: ProjectState, *args, **kwargs) -> Tuple[ProjectState, str]:
+            with workspace.use(state.project_id), state.step_span(step_num, name) as record:
+                state, message = func(self, state, *args, **kwargs)
+                if message.startswith("❌"):
+                    record["status"] = "failed"
+                elif message.startswith("⚠️"):
+                    record["status"] = "skipped"
+            STEP_DURATION.observe(record["duration"], step=metric_name, status=record["status"])
+            return state, message
+        return wrapper
+    return decorator
+
 
 class PipelineProcessor:
     """步骤化处理管道"""
     
     def __init__(self):
         self.config = Config()
-        self.pdf_processor = PDFProcessor()
-        self.git_processor = GitProcessor()
+        self.term_linker = TermLinker()
+        self.link_extractor = LinkExtractor()
+        self.figure_pipeline = FigureAssetPipeline()
+        self.summary_cache = ArtifactCache("summary")
+        self.code_analysis_cache = ArtifactCache("code_analysis")
+        self.blog_section_cache = ArtifactCache("blog_sections")
+        # 按论文标识缓存下载和外部服务的结果，预取过的论文(见 prefetch_app.py)首次请求即可命中；
+        # PDF和Doc2X压缩包较大，按大小和保留时长淘汰
+        cache_max_age = self.config.CACHE_MAX_AGE_HOURS * 3600
+        self.pdf_cache = ArtifactCache("pdf", suffix=".pdf", max_bytes=self.config.PDF_CACHE_MB * 1024 * 1024,
+                                       max_age=cache_max_age)
+        self.doc2x_cache = ArtifactCache("doc2x", suffix=".zip", max_bytes=self.config.DOC2X_CACHE_MB * 1024 * 1024,
+                                         max_age=cache_max_age)
+        self.knowledge_search_cache = ArtifactCache("knowledge_search", suffix=".json")
+        self.knowledge_cache = ArtifactCache("knowledge")
+    
+    # 处理器在第一次使用时才导入和构造(Doc2X客户端、GitPython、Jinja2等)，缩短应用启动时间
+    @functools.cached_property
+    def pdf_processor(self):
+        from ..processors.pdf_processor import PDFProcessor
+        return PDFProcessor()
+    
+    @functools.cached_property
+    def arxiv_processor(self):
+        from ..processors.arxiv_processor import ArxivSourceProcessor
+        return ArxivSourceProcessor()
+    
+    @functools.cached_property
+    def git_processor(self):
+        from ..processors.git_processor import GitProcessor
+        return GitProcessor()
+    
+    @functools.cached_property
+    def billing(self):
+        from ..processors.billing_processor import BillingProcessor
+        return BillingProcessor()
     
-    def create_project(self, pdf_url: str, access_key: str, client_name: str, git_url: str = "") -> Tuple[ProjectState, str]:
-        """步骤1: 项目初始化"""
+    @functools.cached_property
+    def blog_generator(self):
+        from .blog_generator import BlogGenerator
+        return BlogGenerator()
+    
+    def warmup(self):
+        """预先加载处理器与MCP客户端，应用启动后在后台调用，首个请求不必等待"""
+        for name in ("pdf_processor", "git_processor", "billing", "blog_generator"):
+            try:
+                getattr(self, name)
+            except Exception as e:
+                logger.warning(f"Warmup of {name} failed: {e}")
+        import fastmcp  # noqa: F401
+    
+    def create_project(self, pdf_url: str, access_key: str, client_name: str, git_url: str = "",
+                       reuse: bool = True) -> Tuple[ProjectState, str]:
+        """步骤1: 项目初始化；reuse为True且全局索引中已有这篇论文的结果时直接复用，可再调用 regenerate 重新生成"""
         try:
             state = ProjectState()
             state.pdf_url = pdf_url.strip() if pdf_url else None
@@ -40,44 +135,36 @@ class PipelineProcessor:
             if not state.pdf_url:
                 raise ValueError("PDF链接不能为空")
             
-            if all([access_key, client_name]):
-                url = "https://openapi.dp.tech/openapi/v1/api/integral/consume"
-                headers = {
-                    'accessKey': access_key,
-                    'x-app-key': client_name,
-                    'Content-Type': 'application/json'
-                }
-                payload = {
-                    'bizNo': int(f'{int(time.time())}{secrets.randbits(16)}'),
-                    'changeType': 0,
-                    'eventValue': self.config.EVENTVALUE,
-                    'skuId': 10022,
-                    'scene': 'appCustomizeCharge'
-                }
-                _time = str(datetime.now())
-                resp = requests.post(url, headers=headers, json=payload, timeout=10)
-                result = resp.json()
-                if result['code'] == 0:
-                    pass
-                    data = [
-                        {'project': state.project_id, 'client_name': client_name, 'time': _time, 'id': result['data']['id'], 'eventValue': payload['eventValue'], 'bizNo': payload['bizNo']}
-                    ]
-                    df = pd.DataFrame(data=data)
-                    if os.path.isfile(self.config.BILL_CSV_PATH):
-                        df.to_csv(self.config.BILL_CSV_PATH, mode='a', index=False, header=False)
-                elif result['code'] == 170603:
-                    raise ValueError(result['error']['msg'])
-                else:
-                    raise ValueError(result['error'])
-            else:
+            if not all([access_key, client_name]):
                 raise ValueError("未登录，请先登录!!")
+            # step_span 在进入前出错时没有耗时记录
+            record = None
+            try:
+                with state.step_span(1, "项目初始化") as record, state.span("计费接口", "network"):
+                    payload = self.billing.charge_sync(state.project_id, access_key, client_name, self.config.EVENTVALUE)
+            finally:
+                if record is not None:
+                    STEP_DURATION.observe(record["duration"], step="create_project", status=record["status"])
             
             # 更新步骤状态
+            workspace.touch(state.project_id)
             state.update_step(1, "completed", f"项目已创建，PDF: {state.pdf_url}")
             
             message = f"✅ 项目创建成功！消耗{payload['eventValue']}光子\n项目ID: {state.project_id}\nPDF: {state.pdf_url}"
             if state.git_url:
                 message += f"\nGit: {state.git_url}"
+            entry = self.find_reusable(state.pdf_url, state.git_url) if reuse else None
+            if entry:
+                # 已经扣费，复用失败时保留项目，按正常流程生成
+                try:
+                    self._restore_from_index(state, entry)
+                    message += (f"\n♻️ 这篇论文已于 {entry['created_at']} 生成过，已直接提供Blog与HTML结果"
+                                f"\n如需重新生成，请点击“重新生成”")
+                except Exception as e:
+                    logger.warning(f"Failed to reuse paper index entry for project {state.project_id}: {e}")
+                    state = self._fresh_state(state)
+                    state.git_url = git_url.strip() if git_url else None
+                    message += "\n⚠️ 读取已有结果失败，请按步骤重新生成"
             
             logger.info(f"Created project {state.project_id}")
             return state, message
@@ -87,6 +174,7 @@ class PipelineProcessor:
             logger.error(error_msg)
             return ProjectState(), error_msg
     
+    @timed_step(2, "下载PDF")
     def download_pdf_step(self, state: ProjectState) -> Tuple[ProjectState, str]:
         """步骤2A: 下载PDF"""
         try:
@@ -97,19 +185,36 @@ class PipelineProcessor:
             
             # 使用异步方法下载PDF
             async def download_async():
-                return await self.pdf_processor.download_pdf(state.pdf_url)
+                return await self.pdf_processor.download_pdf(state.pdf_url, workspace.path(state.project_id))
             
             # 在新的事件循环中运行异步函数
-            try:
-                pdf_path = asyncio.run(download_async())
-            except RuntimeError:
-                # 如果已经在事件循环中，使用同步方式
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
+            def fetch() -> str:
                 try:
-                    pdf_path = loop.run_until_complete(download_async())
-                finally:
-                    loop.close()
+                    return asyncio.run(download_async())
+                except RuntimeError:
+                    # 如果已经在事件循环中，使用同步方式
+                    loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(loop)
+                    try:
+                        return loop.run_until_complete(download_async())
+                    finally:
+                        loop.close()
+            
+            # 下载过的论文直接从缓存复制
+            paper_key = digest(canonical_paper_id(state.pdf_url))
+            def download() -> str:
+                cached_path = os.path.join(workspace.path(state.project_id), f"paper_{paper_key[:16]}.pdf")
+                if self.pdf_cache.restore(paper_key, cached_path, self._paper_cache_age(state.pdf_url)):
+                    return cached_path
+                pdf_path = fetch()
+                self.pdf_cache.put_file(paper_key, pdf_path)
+                return pdf_path
+            
+            # 多个会话同时下载同一篇论文时只下载一次，其余会话复制到各自的项目目录
+            with state.span("下载PDF文件", "network"):
+                pdf_path = single_flight.do(f"{canonical_paper_id(state.pdf_url)}:download_pdf", download)
+            with state.span("复制共享结果", "disk"):
+                pdf_path = workspace.adopt(state.project_id, pdf_path)
             
             state.pdf_path = pdf_path
             state.update_step(2, "completed", f"PDF已下载至: {pdf_path}")
@@ -124,30 +229,43 @@ class PipelineProcessor:
             logger.error(f"PDF download failed for project {state.project_id}: {e}")
             return state, error_msg
     
+    @timed_step(2, "克隆代码")
     def clone_git_step(self, state: ProjectState) -> Tuple[ProjectState, str]:
         """步骤2B: 克隆Git代码"""
         try:
             if not state.git_url:
                 return state, "⚠️ 未提供Git链接，跳过代码克隆"
             
+            # 重新克隆其他仓库时先删除之前克隆的仓库
+            if state.git_path and os.path.isdir(state.git_path):
+                self.git_processor.cleanup_repository(state.git_path)
+                state.git_path = None
+            
             # 使用异步方法克隆Git仓库
             async def clone_async():
-                return await self.git_processor.clone_and_analyze(state.git_url)
+                return await self.git_processor.clone_and_analyze(state.git_url, workspace.path(state.project_id))
             
             # 在新的事件循环中运行异步函数
-            try:
-                git_result = asyncio.run(clone_async())
-            except RuntimeError:
-                # 如果已经在事件循环中，使用同步方式
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
+            def clone() -> Dict:
                 try:
-                    git_result = loop.run_until_complete(clone_async())
-                finally:
-                    loop.close()
-            
-            state.git_path = git_result["path"]
-            message = f"✅ Git仓库克隆成功！\n目录: {git_result['path']}"
+                    return asyncio.run(clone_async())
+                except RuntimeError:
+                    # 如果已经在事件循环中，使用同步方式
+                    loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(loop)
+                    try:
+                        return loop.run_until_complete(clone_async())
+                    finally:
+                        loop.close()
+            
+            with state.span("git clone", "network"):
+                git_result = single_flight.do(f"{canonical_repo_id(state.git_url)}:clone_git", clone)
+            # git_result 与同时等待的其他会话共享同一个对象，不能原地修改
+            with state.span("复制共享结果", "disk"):
+                git_path = workspace.adopt(state.project_id, git_result["path"])
+            
+            state.git_path = git_path
+            message = f"✅ Git仓库克隆成功！\n目录: {git_path}"
             logger.info(f"Cloned git repo for project {state.project_id}")
             return state, message
             
@@ -156,6 +274,7 @@ class PipelineProcessor:
             logger.error(f"Git clone failed for project {state.project_id}: {e}")
             return state, error_msg
     
+    @timed_step(3, "PDF转TEX")
     def pdf_to_tex_step(self, state: ProjectState) -> Tuple[ProjectState, str]:
         """步骤3: PDF转TEX转换"""
         try:
@@ -164,19 +283,37 @@ class PipelineProcessor:
             
             state.update_step(3, "running", "正在转换PDF为TEX...")
             
-            # 使用现有的PDF处理器
-            tex_path, extracted_git_url = self.pdf_processor.process_pdf_to_tex(state.pdf_path)
-            
+            # arXiv论文优先使用LaTeX源码，同一篇论文同时只转换一次
+            tex_path, source, archive_path, source_root = single_flight.do(
+                f"{canonical_paper_id(state.pdf_url)}:pdf_to_tex", lambda: self._convert_to_tex(state))
+            # 复制整个解压目录: 主TEX可能在子目录中，或通过 \input{../...} 引用同级目录的文件
+            with state.span("复制共享结果", "disk"):
+                extract_dir = workspace.adopt(state.project_id, source_root)
+                tex_path = os.path.join(extract_dir, os.path.relpath(tex_path, source_root))
+                if archive_path:
+                    archive_path = workspace.adopt(state.project_id, archive_path)
+            
+            # 一次扫描抽取全部链接，得分最高的代码仓库作为论文的Git链接
+            with state.span("链接抽取", "compute"):
+                with open(tex_path, "r", encoding="utf-8") as f:
+                    links = self.link_extractor.extract(f.read())
+            repo = LinkExtractor.best(links)
+            extracted_git_url = repo.url if repo else None
             state.tex_path = tex_path
+            state.tex_archive_path = archive_path
             state.extracted_git_url = extracted_git_url
+            state.paper_links = [asdict(link) for link in links]
             state.update_step(3, "completed", f"TEX文件已生成: {tex_path}")
             
-            message = f"✅ PDF转TEX成功！\nTEX文件: {tex_path}"
+            message = f"✅ PDF转TEX成功！\nTEX文件: {tex_path}\n来源: {source}"
             if extracted_git_url:
                 message += f"\n🔗 发现Git链接: {extracted_git_url}"
                 # 如果没有提供Git链接但从PDF中提取到了，更新状态
                 if not state.git_url:
                     state.git_url = extracted_git_url
+            others = [link for link in links if link.kind in LINK_LABELS]
+            if others:
+                message += "\n📎 其他资源: " + ", ".join(f"{LINK_LABELS[link.kind]} {link.url}" for link in others[:5])
             
             logger.info(f"Converted PDF to TEX for project {state.project_id}")
             return state, message
@@ -187,6 +324,33 @@ class PipelineProcessor:
             logger.error(f"PDF to TEX failed for project {state.project_id}: {e}")
             return state, error_msg
     
+    def _convert_to_tex(self, state: ProjectState) -> List[Optional[str]]:
+        """获取TEX，返回 [TEX路径, 来源, Doc2X的zip路径, 解压根目录]；arXiv没有源码或获取失败时用Doc2X转换PDF"""
+        paper_arxiv_id = arxiv_id(state.pdf_url)
+        if paper_arxiv_id and self.config.ARXIV_SOURCE_ENABLED:
+            try:
+                with state.span("arXiv源码", "network"):
+                    tex_path = self.arxiv_processor.fetch(paper_arxiv_id, os.path.dirname(state.pdf_path))
+                if tex_path:
+                    return [tex_path, "arXiv源码", None,
+                            self.arxiv_processor.source_dir(paper_arxiv_id, os.path.dirname(state.pdf_path))]
+            except Exception as e:
+                logger.warning(f"arXiv source for {paper_arxiv_id} unavailable, falling back to Doc2X: {e}")
+        # 按PDF内容缓存，论文有新版本时PDF不同，不会用到旧版本的转换结果
+        zip_key = file_digest(state.pdf_path)
+        zip_path = os.path.join(os.path.dirname(state.pdf_path), f"doc2x_{zip_key[:16]}.zip")
+        with state.span("查询转换缓存", "disk"):
+            cache_hit = self.doc2x_cache.restore(zip_key, zip_path)
+        if not cache_hit:
+            with state.span("Doc2X转换", "network"):
+                zip_path = self.pdf_processor.convert_pdf_to_tex_async(state.pdf_path)
+            self.doc2x_cache.put_file(zip_key, zip_path)
+        # 只解压主TEX和它引用的图片，其余图片留在zip中按需读取
+        with state.span("解压TEX", "disk"):
+            tex_path = self.pdf_processor.extract_tex(zip_path)
+        return [tex_path, "Doc2X", zip_path, self.pdf_processor.extract_dir(zip_path)]
+    
+    @timed_step(4, "知识库搜索")
     def search_knowledge_step(self, state: ProjectState) -> Tuple[ProjectState, str]:
         """步骤4A: 自动搜索知识库"""
         try:
@@ -195,14 +359,27 @@ class PipelineProcessor:
             
             # TODO: 实现自动知识库搜索
             # 1. 读取TEX文件内容
-            with open(state.tex_path, "r", encoding="utf-8") as f:
+            with state.span("读取TEX", "disk"), open(state.tex_path, "r", encoding="utf-8") as f:
                 tex_content = f.read()
-            # 2. 提取关键词
-            keywords = asyncio.run(get_keywords(tex_content))
+            search_key = digest(tex_content)
+            def search() -> List[str]:
+                cached = self.knowledge_search_cache.get_text(search_key)
+                if cached is not None:
+                    return json.loads(cached)
+                # 2. 提取关键词
+                with state.span("MCP关键词提取", "llm"):
+                    keywords = asyncio.run(get_keywords(tex_content))
 
-            # 3. 搜索外部知识库
-            # 4. 返回相关链接
-            mock_knowledge = asyncio.run(get_link(keywords))
+                # 3. 搜索外部知识库
+                # 4. 返回相关链接
+                with state.span("MCP链接搜索", "network"):
+                    links = asyncio.run(get_link(keywords))
+                if links:
+                    self.knowledge_search_cache.put_text(search_key, json.dumps(links, ensure_ascii=False))
+                return links
+
+            # 多个会话同时搜索同一篇论文时共享一次MCP调用的结果
+            mock_knowledge = single_flight.do(f"{canonical_paper_id(state.pdf_url)}:search_knowledge", search)
 
             # 添加到现有知识库（避免重复）
             for url in mock_knowledge:
@@ -246,6 +423,7 @@ class PipelineProcessor:
             logger.error(f"Knowledge management failed for project {state.project_id}: {e}")
             return state, error_msg
     
+    @timed_step(5, "代码分析")
     def analyze_code_step(self, state: ProjectState) -> Tuple[ProjectState, str]:
         """步骤5: 代码分析"""
         try:
@@ -254,26 +432,54 @@ class PipelineProcessor:
             
             state.update_step(5, "running", "正在分析代码...")
             
-            with open(state.tex_path) as f:
+            with state.span("读取TEX", "disk"), open(state.tex_path) as f:
                 tex_content = f.read()
-            # TODO: 实现代码分析
-            # 1. mcp: 生成 summary
-            message = asyncio.run(get_summary(tex_content))
-            state.summary_path = f'{self.config.TEMP_DIR}/summary_{hash(state.pdf_url)}.md'
-            state.code_analysis_path = f'{self.config.TEMP_DIR}/code_analysis_{hash(state.pdf_url)}.md'
+            # 1. mcp: 生成 summary，同一篇TEX复用已有摘要
+            summary_key = digest(tex_content)
+            message = self.summary_cache.get_text(summary_key)
+            if message is None:
+                with state.span("MCP论文摘要", "llm"):
+                    message = asyncio.run(get_summary(tex_content))
+                if message:
+                    self.summary_cache.put_text(summary_key, message)
+            workdir = workspace.path(state.project_id)
+            state.summary_path = os.path.join(workdir, "summary.md")
+            state.code_analysis_path = os.path.join(workdir, "code_analysis.md")
             with open(state.summary_path, 'w') as f:
                 f.write(message)
-            # 2. 使用claude -p 分析代码, 这个步骤可能需要在命令行上执行，这里大概率不成功
-            _prompt_msg = f"/docs --paper-summary {state.summary_path} --code-dir {state.git_path} --output {state.code_analysis_path}"
-            cmd = f'{self.config.CLAUDE_CODE_COMMAND} --permission-mode acceptEdits "{_prompt_msg}"'
-            logger.info(f'Claude: {cmd}')
-            claude_content = Popen(cmd, shell=True, stdin=PIPE, stdout=PIPE)
-            str_out, _ = claude_content.communicate()
+
+            # 2. 代码提交、摘要和提示词版本都未变化时直接复用分析结果
+            with state.span("查询分析缓存", "disk"):
+                analysis_key = digest(self.git_processor.get_head_sha(state.git_path), digest(message), CODE_ANALYSIS_PROMPT_VERSION)
+                cache_hit = self.code_analysis_cache.restore(analysis_key, state.code_analysis_path)
+            if cache_hit:
+                state.code_analysis = "ok"
+                state.update_step(5, "completed", "代码分析完成(缓存)")
+                logger.info(f"Code analysis cache hit for project {state.project_id}")
+                return state, "✅ 代码分析完成！\n- 命中缓存，复用相同代码版本与论文摘要的分析结果"
+
+            # 3. 论文术语 → 代码位置索引，缩小代码分析需要阅读的范围
+            with state.span("术语定位", "compute"):
+                term_links = self.term_linker.link(tex_content, state.git_path)
+            state.term_links_path = os.path.join(workdir, "term_links.md")
+            with open(state.term_links_path, 'w', encoding='utf-8') as f:
+                f.write(TermLinker.to_markdown(term_links, state.git_path))
+            logger.info(f"Linked {len(term_links)} paper terms to code for project {state.project_id}")
+            # 4. 使用claude -p 分析代码, 这个步骤可能需要在命令行上执行，这里大概率不成功
+            _prompt_msg = f"/docs --paper-summary {state.summary_path} --term-links {state.term_links_path} --code-dir {state.git_path} --output {state.code_analysis_path}"
+            argv = subprocess_manager.claude_argv(_prompt_msg)
+            logger.info(f'Claude: {argv}')
+            with state.span("Claude Code分析", "llm"):
+                result = subprocess_manager.run_sync(argv, on_line=lambda line: logger.debug(f'Claude: {line}'))
+            result.raise_for_status()
+            if not os.path.isfile(state.code_analysis_path):
+                raise Exception(f"Claude未生成代码分析文件: {state.code_analysis_path}")
+            self.code_analysis_cache.put_file(analysis_key, state.code_analysis_path)
 
             state.code_analysis =  "ok"
             state.update_step(5, "completed", "代码分析完成")
             
-            message = "✅ 代码分析完成！\n- 项目结构已分析\n- 代码逻辑已提取\n- 伪代码已生成"
+            message = f"✅ 代码分析完成！\n- 论文术语已定位到 {len(term_links)} 处代码\n- 项目结构已分析\n- 代码逻辑已提取\n- 伪代码已生成"
             logger.info(f"Code analysis completed for project {state.project_id}")
             return state, message
             
@@ -283,6 +489,7 @@ class PipelineProcessor:
             logger.error(f"Code analysis failed for project {state.project_id}: {e}")
             return state, error_msg
 
+    @timed_step(6, "论文理解")
     def understand_paper_step(self, state: ProjectState) -> Tuple[ProjectState, str]:
         """步骤6: 论文理解生成"""
         try:
@@ -291,17 +498,31 @@ class PipelineProcessor:
             
             state.update_step(6, "running", "正在理解论文...")
             
-            with open(state.tex_path) as f:
+            with state.span("读取TEX", "disk"), open(state.tex_path) as f:
                 tex_content = f.read()
             # TODO: 实现论文理解
             # 1. 读取TEX内容
             # 2. 结合知识库内容
-            message = asyncio.run(get_knowedge(tex_content, state.knowledge_base))
+            # 每个知识链接单独理解，按 (TEX, 链接) 缓存: 增加链接时已有链接的段落保持不变，
+            # Blog生成时只有与新段落相关的模块输入发生变化
+            groups = [[url] for url in state.knowledge_base] or [[]]
+            passages = {i: self.knowledge_cache.get_text(digest(tex_content, *urls)) for i, urls in enumerate(groups)}
+            missing = [i for i, text in passages.items() if text is None]
+            if missing:
+                async def understand_missing():
+                    return await asyncio.gather(*(get_knowedge(tex_content, groups[i]) for i in missing))
+                with state.span("MCP知识库理解", "llm"):
+                    results = asyncio.run(understand_missing())
+                for i, text in zip(missing, results):
+                    passages[i] = text
+                    if text:
+                        self.knowledge_cache.put_text(digest(tex_content, *groups[i]), text)
+            message = "\n\n".join(passages[i].strip() for i in range(len(groups)) if passages[i])
             state.update_step(6, "completed", "理解文章完成")
             state.paper_analysis = 'ok'
 
             # 4. 或者使用Claude生成
-            state.knowledge_path = f'{self.config.TEMP_DIR}/knowledge_out_{hash(state.pdf_url)}.md'
+            state.knowledge_path = os.path.join(workspace.path(state.project_id), "knowledge_out.md")
             with open(state.knowledge_path, "w", encoding="utf-8") as f:
                 f.write(message)
             return state,message 
@@ -313,31 +534,72 @@ class PipelineProcessor:
             return state, error_msg
 
 
+    @timed_step(7, "Blog生成")
     def generate_blog_step(self, state: ProjectState) -> Tuple[ProjectState, str]: 
         """步骤7: 组合生成Blog"""
         try:
             state.update_step(7, "running", "正在Blog...")
             
-            with open(state.tex_path) as f:
-                tex_content = f.read()
-            with open(state.code_analysis_path, "r", encoding="utf-8") as f:
-                code_content = f.read()
-            with open(state.knowledge_path) as f:
-                knowledge_out = f.read()
-            # TODO: 实现论文理解
-            # 1. 读取TEX内容
-            # 2. 结合知识库内容
-            message = asyncio.run(get_blog(tex_content, code_content, knowledge_out))
+            with state.span("读取输入", "disk"):
+                with open(state.tex_path) as f:
+                    tex_content = f.read()
+                code_content = ""
+                if state.code_analysis_path and os.path.isfile(state.code_analysis_path):
+                    with open(state.code_analysis_path, "r", encoding="utf-8") as f:
+                        code_content = f.read()
+                with open(state.knowledge_path) as f:
+                    knowledge_out = f.read()
+
+            # 1. 按模块计算输入摘要，输入未变化且单独生成过的模块直接复用
+            with state.span("划分模块输入", "compute"):
+                inputs = {spec.key: section_inputs(spec, tex_content, code_content, knowledge_out) for spec in BLOG_SECTIONS}
+                digests = {spec.key: section_digest(spec, inputs[spec.key]) for spec in BLOG_SECTIONS}
+            cached_sections = {}
+            for spec in BLOG_SECTIONS:
+                cached = self.blog_section_cache.get_text(digests[spec.key])
+                if cached is not None:
+                    cached_sections[spec.key] = cached
+
+            # 2. 串行模式下没有任何可复用的模块时整篇调用一次工作流，拆分出的模块按各自的输入摘要缓存；
+            #    并行模式每个模块单独生成
+            modules: Dict[str, str] = dict(cached_sections)
+            reused = len(cached_sections)
+            title = tex_title(tex_content)
+            if not self.config.BLOG_PARALLEL_SECTIONS:
+                full_key = blog_digest(tex_content)
+                if not cached_sections:
+                    with state.span("MCP整篇Blog生成", "llm"):
+                        full_blog = asyncio.run(get_blog(tex_content, code_content, knowledge_out))
+                    self.blog_section_cache.put_text(full_key, full_blog)
+                    for key, body in split_blog_modules(full_blog).items():
+                        if key in digests:
+                            self.blog_section_cache.put_text(digests[key], body)
+                else:
+                    full_blog = self.blog_section_cache.get_text(full_key)
+                if full_blog is not None:
+                    # 工作流返回的导语和其他章节原样保留；复用模块时标准模块以按模块缓存的内容为准
+                    for key, body in split_blog_modules(full_blog).items():
+                        if key not in digests or not cached_sections:
+                            modules[key] = body
+                    title = title or split_markdown_sections(full_blog)[0]
+            # 3. 缺失或输入变化的模块并发生成，只带各自相关的TEX章节与知识库段落
+            missing = [spec for spec in BLOG_SECTIONS if spec.key not in modules]
+            if missing:
+                for spec, body in asyncio.run(self._generate_sections(missing, inputs, state)):
+                    modules[spec.key] = body
+                    self.blog_section_cache.put_text(digests[spec.key], body)
+            message = assemble_blog(modules, title)
 
             # 生成Blog内容
-            state.blog_path = f'{self.config.TEMP_DIR}/blog_{hash(state.pdf_url)}.md'
+            state.blog_path = os.path.join(workspace.path(state.project_id), "blog.md")
             with open(state.blog_path, "w", encoding="utf-8") as f:
                 f.write(message)
 
+            import markdown
             state.blog_content = markdown.markdown(message)
             state.update_step(7, "completed", "Blog生成完成")
             
-            message = "✅ 论文理解完成！\n已生成7个模块的Blog内容"
+            message = f"✅ 论文理解完成！\n已生成{len(BLOG_SECTIONS)}个模块的Blog内容（复用{reused}个，重新生成{len(BLOG_SECTIONS) - reused}个）"
             logger.info(f"Paper understanding completed for project {state.project_id}")
             return state, message
             
@@ -348,6 +610,22 @@ class PipelineProcessor:
             return state, error_msg
 
     
+    async def _generate_sections(self, specs: List[SectionSpec], inputs: Dict[str, Dict[str, str]],
+                                 state: ProjectState) -> List[Tuple[SectionSpec, str]]:
+        """并发生成多个Blog模块，按传入顺序返回，每个模块的耗时记录到state"""
+        semaphore = asyncio.Semaphore(self.config.BLOG_SECTION_CONCURRENCY)
+
+        async def generate(spec: SectionSpec) -> Tuple[SectionSpec, str]:
+            async with semaphore:
+                section_inputs = inputs[spec.key]
+                with state.span(f"MCP模块生成: {spec.title}", "llm"):
+                    section_md = await get_blog_section(
+                        spec.title, section_inputs["tex"], section_inputs["code"], section_inputs["knowledge"])
+            return spec, split_blog_modules(section_md).get(spec.key, section_md.strip())
+
+        return await asyncio.gather(*(generate(spec) for spec in specs))
+
+    @timed_step(8, "HTML渲染")
     def render_blog_step(self, state: ProjectState) -> Tuple[ProjectState, str]:
         """步骤8: HTML渲染输出"""
         try:
@@ -355,18 +633,31 @@ class PipelineProcessor:
                 return state, "❌ 无法执行此步骤：请先完成论文理解"
             
             state.update_step(8, "running", "正在渲染HTML...")
-            html_path = f"{self.config.TEMP_DIR}/blog_{state.project_id[:8]}.html"
-            _prompt_msg = f"把文件{state.blog_path}渲染成HTML输出，要求界面美观，并且要把图表、代码、公式等内容都正确渲染，如果图表有不正确的地方要改正并输出到{html_path}"
-            cmd = f'{self.config.CLAUDE_CODE_COMMAND} --permission-mode acceptEdits "{_prompt_msg}"'
-            logger.info(f'Claude: {cmd}')
-            claude_content = Popen(cmd, shell=True, stdin=PIPE, stdout=PIPE)
-            _, _ = claude_content.communicate()
+            html_path = os.path.join(workspace.path(state.project_id), f"blog_{state.project_id[:8]}.html")
+            with state.span("读取Blog", "disk"), open(state.blog_path, "r", encoding="utf-8") as f:
+                blog_markdown = f.read()
+            with state.span("图片处理", "compute"):
+                figures = self._process_figures(state, blog_markdown)
+            with state.span("渲染HTML", "compute"):
+                html = self.blog_generator.render_markdown(blog_markdown, knowledge_base=state.knowledge_base,
+                                                           figures=figures)
+            with state.span("写入HTML", "disk"), open(html_path, "w", encoding="utf-8") as f:
+                f.write(html)
             
             state.update_step(8, "completed", f"HTML已生成: {html_path}")
             
             message = f"✅ HTML渲染完成！\n文件路径: {html_path}"
+            if figures:
+                message += f"\n🖼 图片: {len(figures)}张 (去重后{len({f.digest for f in figures.values()})}张)"
             logger.info(f"HTML rendering completed for project {state.project_id}")
             state.html_output = html_path
+            # 复用的结果已在索引中，只发布本项目生成的结果
+            if not state.reused_from:
+                try:
+                    with state.span("写入全局索引", "disk"):
+                        self._publish_to_index(state)
+                except Exception as e:
+                    logger.warning(f"Failed to publish project {state.project_id} to paper index: {e}")
             return state, message
             
         except Exception as e:
@@ -376,5 +667,85 @@ class PipelineProcessor:
             return state, error_msg
 
 
+    def _paper_cache_age(self, pdf_url: str) -> Optional[float]:
+        """按论文标识缓存的结果的有效期(秒)；不带版本号的arXiv链接可能已有新版本，过期后重新获取"""
+        if is_versionless(canonical_paper_id(pdf_url)) and self.config.PAPER_CACHE_TTL_HOURS:
+            return self.config.PAPER_CACHE_TTL_HOURS * 3600
+        return None
+
+    def find_reusable(self, pdf_url: str, git_url: Optional[str] = None) -> Optional[Dict]:
+        """全局索引中当前管道版本生成的这篇论文的结果"""
+        return paper_index.lookup(pdf_url, PIPELINE_VERSION, git_url or "", required=INDEX_REQUIRED,
+                                  max_age=self._paper_cache_age(pdf_url))
+
+    def _publish_to_index(self, state: ProjectState):
+        artifacts = {name: getattr(state, attr) for name, attr in INDEX_ARTIFACTS.items()}
+        artifacts["assets"] = os.path.join(os.path.dirname(state.html_output), "assets")
+        metadata = {
+            "project_id": state.project_id, "git_url": state.git_url, "extracted_git_url": state.extracted_git_url,
+            "knowledge_base": state.knowledge_base, "paper_links": state.paper_links,
+        }
+        paper_index.publish(state.pdf_url, PIPELINE_VERSION, artifacts, metadata)
+
+    def _restore_from_index(self, state: ProjectState, entry: Dict):
+        """把索引中的产物复制到项目目录，并把对应步骤标记为已完成"""
+        restored = paper_index.restore(entry, os.path.join(workspace.path(state.project_id), "reused"))
+        for name, attr in INDEX_ARTIFACTS.items():
+            setattr(state, attr, restored.get(name))
+        state.git_url = state.git_url or entry.get("git_url")
+        state.extracted_git_url = entry.get("extracted_git_url")
+        state.knowledge_base = list(entry.get("knowledge_base") or [])
+        state.paper_links = list(entry.get("paper_links") or [])
+        state.reused_from = {key: entry.get(key) for key in ("paper_id", "version", "created_at", "project_id")}
+        import markdown
+        with open(state.blog_path, "r", encoding="utf-8") as f:
+            state.blog_content = markdown.markdown(f.read())
+        # 读取成功后再标记步骤完成；代码分析和论文理解的结果在对应文件中，不在state中填占位值
+        note = f"复用 {entry['created_at']} 生成的结果"
+        if state.summary_path and state.code_analysis_path:
+            state.update_step(5, "completed", note)
+        for step_num in (3, 4, 6, 7, 8):
+            state.update_step(step_num, "completed", note)
+        logger.info(f"Project {state.project_id} reuses {entry['paper_id']} from paper index")
+
+    def regenerate(self, state: ProjectState) -> Tuple[ProjectState, str]:
+        """放弃复用的结果，在同一个项目中从下载PDF开始重新生成(不再计费)"""
+        if state.step_status.get(1) != "completed":
+            return state, "❌ 无法执行此步骤：请先完成项目初始化"
+        if not state.reused_from:
+            return state, "⚠️ 当前项目没有复用已有结果，直接执行各步骤即可"
+        return self._fresh_state(state), "🔁 已放弃复用的结果，请从“下载PDF”开始依次执行各步骤重新生成"
+
+    @staticmethod
+    def _fresh_state(state: ProjectState) -> ProjectState:
+        """同一项目只保留初始化结果(不再计费)，其余步骤重新执行"""
+        fresh = ProjectState(project_id=state.project_id, pdf_url=state.pdf_url, git_url=state.git_url)
+        fresh.update_step(1, "completed", state.step_messages.get(1, ""))
+        return fresh
+
+    def _process_figures(self, state: ProjectState, blog_markdown: str) -> Dict[str, FigureAsset]:
+        """Blog引用的图片按TEX目录、Doc2X的zip依次查找，转换后放在项目目录的assets/下"""
+        refs = find_image_refs(blog_markdown)
+        if not refs or not state.tex_path:
+            return {}
+        tex_dir = os.path.dirname(state.tex_path)
+        archive = TexArchive(state.tex_archive_path) if state.tex_archive_path and os.path.isfile(state.tex_archive_path) else None
+        try:
+            sources = {}
+            for ref in refs:
+                if "://" in ref or ref.startswith("data:"):
+                    continue
+                path = os.path.normpath(os.path.join(tex_dir, ref))
+                if os.path.isfile(path):
+                    sources[ref] = file_reader(path)
+                elif archive is not None and posixpath.normpath(ref) in archive.images():
+                    sources[ref] = functools.partial(archive.read_bytes, posixpath.normpath(ref))
+            assets_dir = os.path.join(workspace.path(state.project_id), "assets")
+            return self.figure_pipeline.process(sources, assets_dir, url_prefix="assets/")
+        finally:
+            if archive is not None:
+                archive.close()
+
+
 # 全局pipeline实例
 pipeline = PipelineProcessor()
@@ -1,7 +1,12 @@
+import time
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any, Iterator
+from dataclasses import dataclass, field, fields, asdict
+
+# 子操作类型及在日志中的显示名
+SPAN_KINDS = {"network": "网络", "llm": "LLM", "disk": "磁盘", "compute": "计算"}
 
 
 @dataclass
@@ -20,13 +25,19 @@ class ProjectState:
     pdf_path: Optional[str] = None
     git_path: Optional[str] = None
     tex_path: Optional[str] = None
+    tex_archive_path: Optional[str] = None  # Doc2X返回的zip，未引用的图片留在其中按需读取(TexArchive)
     summary_path: Optional[str] = None
     code_analysis_path: Optional[str] = None
+    term_links_path: Optional[str] = None
     knowledge_path: Optional[str] = None
     blog_path: Optional[str] = None
 
 
     extracted_git_url: Optional[str] = None
+    # TEX中的全部链接(代码仓库、模型、数据集、项目主页等)，按得分排序，见 LinkExtractor
+    paper_links: List[Dict[str, Any]] = field(default_factory=list)
+    # 复用的全局索引记录(论文标识、生成时间等)，见 PaperIndex；为None时结果由本项目生成
+    reused_from: Optional[Dict[str, Any]] = None
     
     # 知识库和分析结果
     knowledge_base: List[str] = field(default_factory=list)
@@ -39,6 +50,8 @@ class ProjectState:
     current_step: int = 0
     step_status: Dict[int, str] = field(default_factory=dict)  # "pending", "running", "completed", "failed"
     step_messages: Dict[int, str] = field(default_factory=dict)  # 步骤执行消息
+    # 耗时记录: 每个步骤及其子操作的 {step, parent, name, kind, start, duration, status}
+    timing_spans: List[Dict[str, Any]] = field(default_factory=list)
     
     def __post_init__(self):
         """初始化所有步骤状态为pending"""
@@ -54,6 +67,78 @@ class ProjectState:
         if status == "completed":
             self.current_step = max(self.current_step, step_num)
     
+    @contextmanager
+    def _timed(self, step_num: int, parent: str, name: str, kind: str) -> Iterator[Dict[str, Any]]:
+        record = {
+            "step": step_num, "parent": parent, "name": name, "kind": kind,
+            "start": datetime.now().isoformat(timespec="milliseconds"), "duration": 0.0, "status": "ok",
+        }
+        begin = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record["status"] = "failed"
+            raise
+        finally:
+            record["duration"] = round(time.perf_counter() - begin, 3)
+            self.timing_spans.append(record)
+    
+    @contextmanager
+    def step_span(self, step_num: int, name: str) -> Iterator[Dict[str, Any]]:
+        """记录一个步骤的耗时，期间的span()都归属于该步骤；重新执行时替换该步骤之前的记录"""
+        self.timing_spans = [s for s in self.timing_spans if not (s["step"] == step_num and s["parent"] == name)]
+        previous = getattr(self, "_active_step", None)
+        self._active_step = (step_num, name)
+        try:
+            with self._timed(step_num, name, name, "step") as record:
+                yield record
+        finally:
+            self._active_step = previous
+    
+    @contextmanager
+    def span(self, name: str, kind: str) -> Iterator[Optional[Dict[str, Any]]]:
+        """记录当前步骤内一个子操作(kind: network/llm/disk/compute)的耗时，不在步骤内时不记录"""
+        active = getattr(self, "_active_step", None)
+        if active is None:
+            yield None
+            return
+        with self._timed(active[0], active[1], name, kind) as record:
+            yield record
+    
+    def _timing_lines(self, step_num: int) -> List[str]:
+        """某个步骤的耗时明细: 总耗时、按类型汇总，以及各子操作"""
+        lines = []
+        for step in (s for s in self.timing_spans if s["step"] == step_num and s["kind"] == "step"):
+            children = [s for s in self.timing_spans if s["step"] == step_num and s["parent"] == step["name"] and s["kind"] != "step"]
+            totals: Dict[str, float] = {}
+            for child in children:
+                totals[child["kind"]] = totals.get(child["kind"], 0.0) + child["duration"]
+            breakdown = ", ".join(f"{SPAN_KINDS.get(k, k)} {v:.2f}s" for k, v in totals.items())
+            lines.append(f"   ⏱ {step['name']} {step['duration']:.2f}s" + (f" ({breakdown})" if breakdown else ""))
+            for child in children:
+                mark = "" if child["status"] == "ok" else " ❌"
+                lines.append(f"      · {child['name']} [{SPAN_KINDS.get(child['kind'], child['kind'])}] {child['duration']:.2f}s{mark}")
+        return lines
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为可写入JSON的字典"""
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat()
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProjectState":
+        """从to_dict的结果恢复项目状态"""
+        known = {f.name for f in fields(cls)}
+        values = {k: v for k, v in data.items() if k in known}
+        if isinstance(values.get("created_at"), str):
+            values["created_at"] = datetime.fromisoformat(values["created_at"])
+        # JSON的键只能是字符串，步骤编号需要转回整数
+        for key in ("step_status", "step_messages"):
+            if key in values:
+                values[key] = {int(k): v for k, v in values[key].items()}
+        return cls(**values)
+    
     def to_status_text(self) -> str:
         """生成状态文本显示"""
         status_lines = [
@@ -105,6 +190,7 @@ class ProjectState:
             log_lines.append(f"{emoji} {name}: {status}")
             if message:
                 log_lines.append(f"   └─ {message}")
+            log_lines.extend(self._timing_lines(step_num))
         
         return "\n".join(log_lines)
     
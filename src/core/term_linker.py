@@ -0,0 +1,292 @@
+import math
+import os
+import re
+from bisect import bisect_right
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class PaperTerm:
+    """从论文TEX中抽取的术语"""
+    text: str                                   # 论文中的原始写法
+    kind: str                                   # "method" | "hyperparameter" | "symbol"
+    variants: List[str] = field(default_factory=list)  # 代码中可能出现的写法(小写)
+    frequency: int = 1                          # 在论文中出现的次数
+
+
+@dataclass
+class TermLink:
+    """论文术语 → 代码位置"""
+    term: str
+    kind: str
+    path: str
+    line: int
+    snippet: str
+    score: float
+
+
+class AhoCorasick:
+    """Aho-Corasick多模式匹配自动机，一次扫描即可找出所有模式的出现位置"""
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = patterns
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for idx, pattern in enumerate(patterns):
+            self._add(pattern, idx)
+        self._build()
+
+    def _add(self, pattern: str, idx: int):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(idx)
+
+    def _build(self):
+        """广度优先构建失配指针"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """遍历匹配结果，返回(起始位置, 模式序号)"""
+        node = 0
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        for pos, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for idx in out[node]:
+                yield pos - len(patterns[idx]) + 1, idx
+
+
+# 常见超参数及其在代码中的写法
+HYPERPARAMETER_ALIASES: Dict[str, List[str]] = {
+    "learning rate": ["learning_rate", "learningrate", "lr"],
+    "batch size": ["batch_size", "batchsize"],
+    "weight decay": ["weight_decay", "weightdecay"],
+    "dropout": ["dropout", "drop_rate", "dropout_rate"],
+    "warmup": ["warmup", "warmup_steps", "warmup_epochs"],
+    "epochs": ["epochs", "num_epochs", "max_epochs", "n_epochs"],
+    "momentum": ["momentum"],
+    "temperature": ["temperature", "temp", "tau"],
+    "label smoothing": ["label_smoothing", "smoothing"],
+    "beam size": ["beam_size", "num_beams", "beam_width"],
+    "hidden size": ["hidden_size", "hidden_dim", "d_model"],
+    "embedding dimension": ["embed_dim", "embedding_dim", "emb_dim"],
+    "number of layers": ["num_layers", "n_layers", "nlayers"],
+    "number of heads": ["num_heads", "n_heads", "nheads"],
+    "gradient clipping": ["clip_grad", "grad_clip", "max_grad_norm"],
+    "max length": ["max_length", "max_len", "max_seq_len"],
+    "top-k": ["top_k", "topk"],
+    "top-p": ["top_p", "topp"],
+}
+
+GREEK_LETTERS = {
+    "alpha", "beta", "gamma", "delta", "epsilon", "varepsilon", "zeta", "eta", "theta",
+    "lambda", "mu", "sigma", "tau", "phi", "psi", "omega", "rho", "kappa", "xi", "pi",
+}
+
+KIND_WEIGHTS = {"method": 3.0, "hyperparameter": 2.0, "symbol": 1.0}
+
+SOURCE_EXTENSIONS = {
+    ".py", ".pyx", ".ipynb", ".c", ".cc", ".cpp", ".cu", ".h", ".hpp", ".java", ".js", ".ts",
+    ".go", ".rs", ".jl", ".m", ".lua", ".sh", ".yaml", ".yml", ".json", ".toml", ".cfg", ".ini",
+}
+
+SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv", "build", "dist", ".idea", ".vscode"}
+
+_MATH_PATTERN = re.compile(
+    r"\$\$(.+?)\$\$|\$(.+?)\$|\\\[(.+?)\\\]|\\begin\{(equation|align|gather|multline)\*?\}(.+?)\\end\{\4\*?\}",
+    re.S,
+)
+_ACRONYM_PATTERN = re.compile(r"((?:[A-Z][\w\-]+\s+){1,5}[A-Z]?[\w\-]+)\s*\(([A-Z][A-Za-z0-9\-]{1,11})\)")
+_EMPH_PATTERN = re.compile(r"\\(?:textbf|emph|textsc|textit)\{([^{}]{3,60})\}")
+_CAMEL_PATTERN = re.compile(r"\b([A-Z][a-z]+(?:[A-Z][a-z0-9]*)+|[A-Z]{2,}[a-z]*(?:-?\d+)?[A-Za-z]*)\b")
+_SUBSCRIPT_PATTERN = re.compile(r"\b([A-Za-z])_\{?\\?(?:text|mathrm)?\{?([A-Za-z0-9]+)\}?")
+_OPERATOR_PATTERN = re.compile(r"\\(?:mathrm|operatorname|text|mathit)\{([A-Za-z]{3,})\}")
+_GREEK_PATTERN = re.compile(r"\\(" + "|".join(sorted(GREEK_LETTERS)) + r")\b")
+_DEFINITION_PATTERN = re.compile(r"^\s*(def|class|struct|fn|func|function)\b|add_argument|^\s*[\w.\[\]'\"]+\s*[:=]")
+
+_STOP_WORDS = {"the", "and", "for", "with", "this", "that", "we", "our", "figure", "table", "section", "appendix"}
+
+
+def _lower_preserving_offsets(text: str) -> str:
+    """转小写且每个字符位置不变: 小写后长度会变化的字符(如İ)保持原样，匹配位置可直接对应原文"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(low if len(low) == 1 else ch for ch, low in ((ch, ch.lower()) for ch in text))
+
+
+def _identifier_variants(text: str) -> List[str]:
+    """生成术语在代码中可能的写法: snake_case / 连写 / kebab-case"""
+    words = [w.lower() for w in re.split(r"[^A-Za-z0-9]+|(?<=[a-z])(?=[A-Z])", text) if w]
+    if not words:
+        return []
+    variants = {"".join(words), "_".join(words)}
+    if len(words) > 1:
+        variants.add("-".join(words))
+    return sorted(v for v in variants if len(v) >= 3)
+
+
+class TermLinker:
+    """基于论文索引的项目深度理解器: 将论文中的方法名、超参数、公式符号映射到代码位置"""
+
+    def __init__(self, max_links_per_term: int = 5, max_file_size: int = 1024 * 1024):
+        self.max_links_per_term = max_links_per_term
+        self.max_file_size = max_file_size
+
+    def extract_terms(self, tex_content: str) -> List[PaperTerm]:
+        """从TEX内容中抽取方法名、超参数和公式符号"""
+        terms: Dict[Tuple[str, str], PaperTerm] = {}
+
+        def add(text: str, kind: str, variants: List[str]):
+            text = text.strip()
+            if kind != "hyperparameter":
+                variants = [v for v in variants if len(v) >= 3]
+            if not variants or text.lower() in _STOP_WORDS:
+                return
+            key = (kind, text.lower())
+            if key in terms:
+                terms[key].frequency += 1
+            else:
+                terms[key] = PaperTerm(text=text, kind=kind, variants=variants)
+
+        # 方法名: 缩写定义、强调文本、驼峰/全大写名称
+        for full_name, acronym in _ACRONYM_PATTERN.findall(tex_content):
+            add(acronym, "method", _identifier_variants(acronym) + _identifier_variants(full_name))
+        for emph in _EMPH_PATTERN.findall(tex_content):
+            if len(emph.split()) <= 4 and "\\" not in emph:
+                add(emph, "method", _identifier_variants(emph))
+        camel_counts = Counter(_CAMEL_PATTERN.findall(_MATH_PATTERN.sub(" ", tex_content)))
+        for name, count in camel_counts.items():
+            if count >= 2:
+                for _ in range(count):
+                    add(name, "method", _identifier_variants(name))
+
+        # 超参数
+        lowered = tex_content.lower()
+        for phrase, aliases in HYPERPARAMETER_ALIASES.items():
+            count = lowered.count(phrase)
+            for _ in range(count):
+                add(phrase, "hyperparameter", aliases)
+
+        # 公式符号
+        for match in _MATH_PATTERN.finditer(tex_content):
+            math_text = next((g for g in match.groups() if g and g not in ("equation", "align", "gather", "multline")), None)
+            # 环境内容恰好与环境名相同时(如 \begin{align}align\end{align})没有可提取的内容
+            if math_text is None:
+                continue
+            for letter in _GREEK_PATTERN.findall(math_text):
+                add(f"\\{letter}", "symbol", [letter])
+            for base, sub in _SUBSCRIPT_PATTERN.findall(math_text):
+                if len(sub) > 1 or sub.isalpha():
+                    add(f"{base}_{{{sub}}}", "symbol", sorted({f"{base}_{sub}".lower(), f"{base}{sub}".lower()} - {""}))
+            for operator in _OPERATOR_PATTERN.findall(math_text):
+                add(operator, "symbol", _identifier_variants(operator))
+
+        return list(terms.values())
+
+    def _iter_source_files(self, repo_path: str) -> Iterator[str]:
+        for root, dirs, files in os.walk(repo_path):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith('.')]
+            for name in files:
+                if os.path.splitext(name)[1].lower() in SOURCE_EXTENSIONS:
+                    path = os.path.join(root, name)
+                    try:
+                        if os.path.getsize(path) <= self.max_file_size:
+                            yield path
+                    except OSError:
+                        continue
+
+    def link(self, tex_content: str, repo_path: str, limit: int = 200) -> List[TermLink]:
+        """单次扫描代码仓库，返回按相关度排序的(论文术语 → 文件:行)链接"""
+        terms = self.extract_terms(tex_content)
+        if not terms:
+            return []
+
+        # 所有写法合并进同一个自动机，记录每个写法对应的术语
+        pattern_terms: Dict[str, List[int]] = defaultdict(list)
+        for term_idx, term in enumerate(terms):
+            for variant in term.variants:
+                pattern_terms[variant].append(term_idx)
+        patterns = list(pattern_terms)
+        automaton = AhoCorasick(patterns)
+
+        hits: Dict[int, List[Tuple[str, int, str, bool]]] = defaultdict(list)
+        files_per_term: Dict[int, set] = defaultdict(set)
+        for path in self._iter_source_files(repo_path):
+            try:
+                with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                    content = f.read()
+            except OSError:
+                continue
+            lowered = _lower_preserving_offsets(content)
+            line_starts = [0] + [m.end() for m in re.finditer("\n", content)]
+            lines = content.split("\n")
+            seen_lines = set()
+            for start, pattern_idx in automaton.iter_matches(lowered):
+                variant = patterns[pattern_idx]
+                end = start + len(variant)
+                if start > 0 and lowered[start - 1].isalnum():
+                    continue
+                if end < len(lowered) and lowered[end].isalnum() and not content[end].isupper():
+                    continue
+                line_no = bisect_right(line_starts, start)
+                for term_idx in pattern_terms[variant]:
+                    if (term_idx, line_no) in seen_lines:
+                        continue
+                    seen_lines.add((term_idx, line_no))
+                    line_text = lines[line_no - 1].strip()
+                    is_definition = bool(_DEFINITION_PATTERN.search(line_text))
+                    rel_path = os.path.relpath(path, repo_path)
+                    hits[term_idx].append((rel_path, line_no, line_text[:160], is_definition))
+                    files_per_term[term_idx].add(rel_path)
+
+        links: List[TermLink] = []
+        for term_idx, term_hits in hits.items():
+            term = terms[term_idx]
+            # 论文中越常见、代码中越集中的术语越有指示性
+            base = KIND_WEIGHTS[term.kind] * (1 + math.log(term.frequency)) / (1 + math.log(len(files_per_term[term_idx])))
+            scored = sorted(
+                ((base * (2.0 if is_def else 1.0), path, line_no, snippet) for path, line_no, snippet, is_def in term_hits),
+                key=lambda item: (-item[0], item[1], item[2]),
+            )
+            for score, path, line_no, snippet in scored[:self.max_links_per_term]:
+                links.append(TermLink(term.text, term.kind, path, line_no, snippet, round(score, 3)))
+
+        links.sort(key=lambda l: (-l.score, l.term, l.path, l.line))
+        return links[:limit]
+
+    @staticmethod
+    def to_markdown(links: List[TermLink], repo_path: Optional[str] = None) -> str:
+        """生成供代码分析阅读的术语索引"""
+        lines = ["# 论文术语 → 代码位置索引", ""]
+        if repo_path:
+            lines += [f"代码目录: `{repo_path}`", ""]
+        if not links:
+            lines.append("未找到论文术语在代码中的对应位置")
+            return "\n".join(lines)
+        lines += ["| 术语 | 类型 | 位置 | 代码 | 得分 |", "|---|---|---|---|---|"]
+        for link in links:
+            snippet = link.snippet.replace("|", "\\|").replace("`", "'")
+            lines.append(f"| {link.term} | {link.kind} | `{link.path}:{link.line}` | `{snippet}` | {link.score} |")
+        return "\n".join(lines)
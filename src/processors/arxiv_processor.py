@@ -0,0 +1,132 @@
+import gzip
+import io
+import logging
+import os
+import re
+import tarfile
+from pathlib import Path
+from typing import List, Optional, Set
+
+from config import config
+from ..utils.metrics import DOWNLOADED_BYTES, track_backend
+
+logger = logging.getLogger(__name__)
+
+# \input{file} / \include{file} / \subfile{file}，以及不带括号的 \input file
+_INCLUDE = re.compile(r"\\(?:input|include|subfile)\s*(?:\{([^}]+)\}|\s([^\s{}\\%]+))")
+_COMMENT = re.compile(r"(?<!\\)%.*")
+# 展开嵌套文件的最大深度，防止互相引用
+_MAX_DEPTH = 20
+
+
+class ArxivSourceProcessor:
+    """获取arXiv论文的LaTeX源码(e-print)，找到主TEX文件并展开 \\input / \\include
+
+    作者提供源码时直接使用原始TEX，无需经过Doc2X的PDF识别；只提供PDF的论文返回None。
+    """
+
+    def __init__(self, eprint_url: Optional[str] = None, timeout: int = 60):
+        self.eprint_url = eprint_url or config.ARXIV_EPRINT_URL
+        self.timeout = timeout
+
+    def download_source(self, arxiv_id: str) -> bytes:
+        """下载e-print，返回原始内容(通常是gzip压缩的tar包或单个TEX文件)"""
+        import requests
+
+        url = self.eprint_url.format(id=arxiv_id)
+        with track_backend("arxiv"):
+            response = requests.get(url, timeout=self.timeout, headers={"User-Agent": "FastPaperReader"})
+            response.raise_for_status()
+        DOWNLOADED_BYTES.inc(len(response.content), source="arxiv")
+        return response.content
+
+    @staticmethod
+    def unpack(data: bytes, target_dir: str) -> bool:
+        """把e-print解压到目标目录，内容是PDF(作者未提供源码)时返回False"""
+        os.makedirs(target_dir, exist_ok=True)
+        try:
+            with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as tar:
+                # data过滤器拒绝绝对路径、..、设备文件和指向目录外的链接
+                tar.extractall(target_dir, filter="data")
+            return True
+        except tarfile.ReadError:
+            pass
+        # 只有一个TEX文件时e-print是gzip压缩的单个文件
+        try:
+            data = gzip.decompress(data)
+        except OSError:
+            pass
+        if data.lstrip().startswith(b"%PDF"):
+            return False
+        Path(target_dir, "main.tex").write_bytes(data)
+        return True
+
+    @staticmethod
+    def find_main_tex(source_dir: str) -> Optional[Path]:
+        """含 \\documentclass 和 \\begin{document} 的TEX文件；有多个时优先常见主文件名，其次取最大的文件"""
+        candidates = []
+        for path in Path(source_dir).rglob("*.tex"):
+            if path.stem.endswith("_flat"):
+                continue
+            text = path.read_text(encoding="utf-8", errors="replace")
+            text = _COMMENT.sub("", text)
+            if "\\documentclass" in text and "\\begin{document}" in text:
+                candidates.append(path)
+        if not candidates:
+            return None
+        preferred = {"main.tex", "paper.tex", "ms.tex", "arxiv.tex"}
+        return max(candidates, key=lambda p: (p.name.lower() in preferred, p.stat().st_size))
+
+    @staticmethod
+    def _resolve(base_dir: Path, name: str) -> Optional[Path]:
+        name = name.strip()
+        for candidate in (base_dir / name, base_dir / f"{name}.tex"):
+            if candidate.is_file():
+                return candidate
+        return None
+
+    @classmethod
+    def flatten(cls, main_tex: Path, root: Optional[Path] = None) -> str:
+        """把 \\input / \\include 引用的文件内容原位展开，相对路径按主文件所在目录解析"""
+        root = root or main_tex.parent
+        seen: Set[Path] = set()
+
+        def expand(path: Path, depth: int) -> str:
+            seen.add(path.resolve())
+            lines: List[str] = []
+            for line in path.read_text(encoding="utf-8", errors="replace").splitlines():
+                # 注释中的 \input 不展开
+                comment = _COMMENT.search(line)
+                code = line[:comment.start()] if comment else line
+
+                def replace(match: re.Match) -> str:
+                    target = cls._resolve(root, match.group(1) or match.group(2))
+                    if target is None or depth >= _MAX_DEPTH or target.resolve() in seen:
+                        return match.group(0)
+                    return expand(target, depth + 1)
+
+                lines.append(_INCLUDE.sub(replace, code) + (comment.group(0) if comment else ""))
+            return "\n".join(lines)
+
+        return expand(main_tex, 0)
+
+    @staticmethod
+    def source_dir(arxiv_id: str, target_dir: str) -> str:
+        """源码解压目录，主TEX可能在其子目录中"""
+        return os.path.join(target_dir, f"arxiv_{arxiv_id.replace('/', '_')}")
+
+    def fetch(self, arxiv_id: str, target_dir: str) -> Optional[str]:
+        """下载并解压源码到 source_dir()，返回展开后的主TEX文件路径；没有源码时返回None"""
+        source_dir = self.source_dir(arxiv_id, target_dir)
+        data = self.download_source(arxiv_id)
+        if not self.unpack(data, source_dir):
+            logger.info(f"arXiv {arxiv_id} has no LaTeX source")
+            return None
+        main_tex = self.find_main_tex(source_dir)
+        if main_tex is None:
+            logger.info(f"No main TEX file found in arXiv {arxiv_id} source")
+            return None
+        flat_path = main_tex.with_name(f"{main_tex.stem}_flat.tex")
+        flat_path.write_text(self.flatten(main_tex), encoding="utf-8")
+        logger.info(f"Resolved arXiv {arxiv_id} main TEX {main_tex.name}")
+        return str(flat_path)
@@ -0,0 +1,196 @@
+import asyncio
+import csv
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from config import config
+from ..utils.background_loop import background_loop
+from ..utils.metrics import track_backend
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# 计费接口: 余额不足
+CODE_INSUFFICIENT_BALANCE = 170603
+
+
+class BillingLedger:
+    """只追加的计费账本(SQLite WAL)
+
+    每笔扣费先写入 pending，请求结束后再追加 charged / rejected / unknown，不修改已有记录。
+    (bizNo, status) 唯一，重复写入同一状态不会产生重复记录；某笔扣费的当前状态即其最后一条记录。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or config.BILL_LEDGER_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # 计费记录不能丢，每次提交都落盘
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS ledger (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                biz_no TEXT NOT NULL,
+                status TEXT NOT NULL,
+                project TEXT,
+                client_name TEXT,
+                event_value INTEGER,
+                charge_id TEXT,
+                detail TEXT,
+                created_at TEXT NOT NULL,
+                UNIQUE (biz_no, status)
+            )"""
+        )
+        if config.BILL_CSV_PATH and os.path.isfile(config.BILL_CSV_PATH) and self._is_empty():
+            self.import_csv(config.BILL_CSV_PATH)
+
+    def _is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM ledger LIMIT 1").fetchone() is None
+
+    def append(self, biz_no: str, status: str, project: Optional[str] = None, client_name: Optional[str] = None,
+               event_value: Optional[int] = None, charge_id: Optional[str] = None, detail: Optional[str] = None) -> bool:
+        """追加一条记录，返回是否新写入(同一bizNo的同一状态只记录一次)"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO ledger (biz_no, status, project, client_name, event_value, charge_id, detail, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (biz_no, status, project, client_name, event_value, charge_id, detail,
+                 datetime.now().isoformat(timespec="milliseconds")),
+            )
+            return cursor.rowcount == 1
+
+    def import_csv(self, path: str) -> int:
+        """导入旧版CSV(project, client_name, time, id, eventValue, bizNo)中的扣费记录，返回导入条数"""
+        imported = 0
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.reader(f):
+                # 跳过表头和不完整的行
+                if len(row) < 6 or not row[5].strip().isdigit():
+                    continue
+                project, client_name, charged_at, charge_id, event_value, biz_no = (v.strip() for v in row[:6])
+                imported += self.append(biz_no, "charged", project=project, client_name=client_name,
+                                        event_value=int(event_value) if event_value.isdigit() else None,
+                                        charge_id=charge_id, detail=f"imported from {os.path.basename(path)} ({charged_at})")
+        logger.info(f"Imported {imported} charges from {path} into billing ledger")
+        return imported
+
+    def status(self, biz_no: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status FROM ledger WHERE biz_no = ? ORDER BY seq DESC LIMIT 1", (biz_no,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def entries(self, biz_no: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = "SELECT * FROM ledger" + (" WHERE biz_no = ?" if biz_no else "") + " ORDER BY seq"
+        with self._lock:
+            cursor = self._conn.execute(query, (biz_no,) if biz_no else ())
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def unresolved(self) -> List[str]:
+        """最后状态仍为pending/unknown的bizNo，需要与计费平台对账"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT biz_no FROM ledger l WHERE seq = (SELECT MAX(seq) FROM ledger WHERE biz_no = l.biz_no)"
+                " AND status IN ('pending', 'unknown') ORDER BY seq"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+class BillingProcessor:
+    """调用计费接口扣除光子
+
+    httpx.AsyncClient 连接池常驻在后台事件循环中，各个Gradio回调共享连接；
+    网络错误时用同一个bizNo重试，计费平台按bizNo去重，不会重复扣费。
+    """
+
+    def __init__(self, ledger: Optional[BillingLedger] = None, url: Optional[str] = None,
+                 timeout: float = 10.0, retries: int = 2):
+        self.ledger = ledger or BillingLedger()
+        self.url = url or config.BILLING_URL
+        self.timeout = timeout
+        self.retries = retries
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        # 只在后台事件循环中调用
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self._client
+
+    @staticmethod
+    def new_biz_no() -> str:
+        return f'{int(time.time())}{secrets.randbits(16)}'
+
+    async def charge(self, project_id: str, access_key: str, client_name: str, event_value: int,
+                     biz_no: Optional[str] = None) -> Dict[str, Any]:
+        """扣费，成功时返回请求内容并附带计费平台返回的id；余额不足或被拒绝时抛出ValueError"""
+        import httpx
+
+        biz_no = biz_no or self.new_biz_no()
+        if self.ledger.status(biz_no) == "charged":
+            logger.info(f"Billing {biz_no} already charged, skipping")
+            return {"bizNo": int(biz_no), "eventValue": event_value}
+
+        headers = {
+            'accessKey': access_key,
+            'x-app-key': client_name,
+            'Content-Type': 'application/json'
+        }
+        payload = {
+            'bizNo': int(biz_no),
+            'changeType': 0,
+            'eventValue': event_value,
+            'skuId': 10022,
+            'scene': 'appCustomizeCharge'
+        }
+        self.ledger.append(biz_no, "pending", project=project_id, client_name=client_name, event_value=event_value)
+
+        for attempt in range(self.retries + 1):
+            try:
+                with track_backend("billing"):
+                    resp = await self._get_client().post(self.url, headers=headers, json=payload)
+                result = resp.json()
+                break
+            except (httpx.TransportError, ValueError) as e:
+                if attempt == self.retries:
+                    # 不确定是否已扣费，留待对账
+                    self.ledger.append(biz_no, "unknown", project=project_id, client_name=client_name,
+                                       event_value=event_value, detail=str(e))
+                    raise Exception(f"计费接口请求失败: {e}")
+                logger.warning(f"Billing request {biz_no} failed ({e}), retrying")
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+        if result.get('code') == 0:
+            charge_id = str(result['data']['id'])
+            self.ledger.append(biz_no, "charged", project=project_id, client_name=client_name,
+                               event_value=event_value, charge_id=charge_id)
+            return {**payload, "id": charge_id}
+
+        error = result.get('error') or {}
+        message = error.get('msg') if result.get('code') == CODE_INSUFFICIENT_BALANCE and isinstance(error, dict) else error
+        self.ledger.append(biz_no, "rejected", project=project_id, client_name=client_name,
+                           event_value=event_value, detail=str(message))
+        raise ValueError(message)
+
+    def charge_sync(self, project_id: str, access_key: str, client_name: str, event_value: int) -> Dict[str, Any]:
+        """在同步代码(如Gradio回调)中扣费"""
+        timeout = (self.timeout + 1) * (self.retries + 1) + 2
+        return background_loop.run(self.charge(project_id, access_key, client_name, event_value), timeout=timeout)
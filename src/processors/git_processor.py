@@ -1,4 +1,3 @@
-import git
 import os
 import tempfile
 import shutil
@@ -10,12 +9,12 @@ class GitProcessor:
         self.temp_dir = config.TEMP_DIR
         os.makedirs(self.temp_dir, exist_ok=True)
     
-    async def clone_and_analyze(self, git_url: str) -> Dict:
-        """克隆Git仓库并进行基础分析"""
+    async def clone_and_analyze(self, git_url: str, target_dir: Optional[str] = None) -> Dict:
+        """克隆Git仓库并进行基础分析，target_dir为None时克隆到默认temp目录"""
         repo_path = None
         try:
             # 克隆仓库
-            repo_path = await self._clone_repository(git_url)
+            repo_path = await self._clone_repository(git_url, target_dir)
             
             return {
                 "path": repo_path,
@@ -26,18 +25,19 @@ class GitProcessor:
                 shutil.rmtree(repo_path, ignore_errors=True)
             raise Exception(f"Git仓库处理失败: {str(e)}")
     
-    async def _clone_repository(self, git_url: str) -> str:
+    async def _clone_repository(self, git_url: str, target_dir: Optional[str] = None) -> str:
         """克隆Git仓库"""
         try:
             # 创建临时目录
             repo_name = git_url.split('/')[-1].replace('.git', '')
-            repo_path = os.path.join(self.temp_dir, f"repo_{hash(git_url)}_{repo_name}")
+            repo_path = os.path.join(target_dir or self.temp_dir, f"repo_{hash(git_url)}_{repo_name}")
             
             # 如果目录已存在，先删除
             if os.path.exists(repo_path):
                 shutil.rmtree(repo_path)
             
             # 克隆仓库
+            import git  # GitPython导入较慢，首次使用时再加载
             git.Repo.clone_from(git_url, repo_path, depth=1)
             
             return repo_path
@@ -73,6 +73,11 @@ class GitProcessor:
         walk_directory(repo_path)
         return structure
     
+    def get_head_sha(self, repo_path: str) -> str:
+        """获取仓库当前HEAD的提交SHA"""
+        import git
+        return git.Repo(repo_path).head.commit.hexsha
+    
     def cleanup_repository(self, repo_path: str):
         """清理克隆的仓库"""
         if os.path.exists(repo_path):
@@ -1,13 +1,206 @@
-from fastmcp import Client
+import asyncio
+import functools
+import logging
 import re
 import os
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+
+from config import config
+from ..utils.metrics import MCP_CIRCUIT_OPEN, MCP_TAIL_EVENTS, track_backend
+from ..utils.rate_limiter import BackendBusy, rate_limits
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpen(Exception):
+    """MCP服务连续失败已熔断，请求未发出"""
+
+
+def _client(url: str):
+    """fastmcp导入较慢(约0.4s)，首次调用MCP服务时再加载"""
+    from fastmcp import Client as FastMCPClient
+    return FastMCPClient(url)
+
+
+def parse_timeouts(spec: str) -> Dict[str, float]:
+    """解析 "服务=秒,..."，如 "summary=600,blog=900"，服务名不带 mcp_ 前缀"""
+    timeouts = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            timeouts[f"mcp_{name.strip()}"] = float(value)
+    return timeouts
+
+
+class LatencyWindow:
+    """最近若干次成功调用的耗时，用于计算对冲请求的等待时间"""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int) -> Optional[float]:
+        """样本不足 min_samples 时返回None"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class CircuitBreaker:
+    """连续失败 failures 次后熔断: cooldown 秒内直接拒绝，之后放行一个探测请求，成功则恢复，失败则重新熔断
+
+    本地排队失败(BackendBusy)和调用方取消不计为服务失败。
+    """
+
+    def __init__(self, name: str, failures: int, cooldown: float):
+        self.name = name
+        self.failures = failures
+        self.cooldown = cooldown
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        if not self.failures:
+            return
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining <= 0 and not self._probing:
+                self._probing = True
+                return
+        MCP_TAIL_EVENTS.inc(backend=self.name, event="circuit_rejected")
+        raise CircuitOpen(f"{self.name} 服务连续失败，已暂停调用" +
+                          (f"，{remaining:.0f}s后重试" if remaining > 0 else "，正在探测恢复"))
+
+    def on_success(self):
+        with self._lock:
+            was_open = self._opened_at is not None
+            self._consecutive = 0
+            self._opened_at = None
+            self._probing = False
+        if was_open:
+            MCP_CIRCUIT_OPEN.set(0, backend=self.name)
+            logger.info(f"{self.name} circuit closed")
+
+    def on_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            trip = self.failures and (self._probing or self._consecutive >= self.failures)
+            if trip:
+                self._opened_at = time.monotonic()
+            self._probing = False
+        if trip:
+            MCP_CIRCUIT_OPEN.set(1, backend=self.name)
+            logger.warning(f"{self.name} circuit opened after {self._consecutive} consecutive failures")
+
+    def release(self):
+        """调用未完成(取消或本地排队失败)时释放探测名额，不改变熔断状态"""
+        with self._lock:
+            self._probing = False
+
+
+_timeouts = parse_timeouts(config.MCP_TIMEOUTS)
+_latencies: Dict[str, LatencyWindow] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_state_lock = threading.Lock()
+
+
+def _backend_state(backend: str):
+    with _state_lock:
+        if backend not in _breakers:
+            _latencies[backend] = LatencyWindow()
+            _breakers[backend] = CircuitBreaker(backend, config.MCP_BREAKER_FAILURES, config.MCP_BREAKER_COOLDOWN)
+        return _latencies[backend], _breakers[backend]
+
+
+async def _attempt(backend: str, call: Callable[[], Awaitable], latency: LatencyWindow):
+    """发出一次请求: 经过限流器排队，统计耗时，成功时记录延迟样本"""
+    async with rate_limits.get(backend).aslot():
+        with track_backend(backend):
+            start = time.perf_counter()
+            result = await call()
+    latency.record(time.perf_counter() - start)
+    return result
+
+
+async def _hedged(backend: str, call: Callable[[], Awaitable], latency: LatencyWindow):
+    """超过最近耗时的分位数仍未返回时发出第二个相同请求，取先成功的结果并取消另一个
+
+    只在限流器有空闲并发时对冲，避免服务繁忙时加重负载；两个请求都失败时抛出先失败的异常。
+    """
+    delay = latency.quantile(config.MCP_HEDGE_QUANTILE, config.MCP_HEDGE_MIN_SAMPLES) \
+        if config.MCP_HEDGE_ENABLED else None
+    primary = asyncio.ensure_future(_attempt(backend, call, latency))
+    if delay is None:
+        return await primary
+    tasks = [primary]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done and rate_limits.get(backend).has_capacity():
+            MCP_TAIL_EVENTS.inc(backend=backend, event="hedge_sent")
+            logger.info(f"{backend} slower than p{config.MCP_HEDGE_QUANTILE * 100:g} ({delay:.1f}s), sending hedged request")
+            tasks.append(asyncio.ensure_future(_attempt(backend, call, latency)))
+        error = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        MCP_TAIL_EVENTS.inc(backend=backend, event="hedge_won")
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _tracked(backend: str):
+    """MCP调用的统一策略: 熔断、截止时间和可选的对冲请求；每次请求经过该服务的限流器排队，并统计进行中数量与耗时"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            latency, breaker = _backend_state(backend)
+            breaker.before_call()
+            deadline = _timeouts.get(backend, config.MCP_TIMEOUT)
+            try:
+                result = await asyncio.wait_for(
+                    _hedged(backend, lambda: func(*args, **kwargs), latency), deadline or None)
+            except asyncio.TimeoutError:
+                MCP_TAIL_EVENTS.inc(backend=backend, event="deadline")
+                breaker.on_failure()
+                raise TimeoutError(f"{backend} 超过截止时间({deadline:g}s)未返回") from None
+            except (BackendBusy, asyncio.CancelledError):
+                breaker.release()
+                raise
+            except Exception:
+                breaker.on_failure()
+                raise
+            breaker.on_success()
+            return result
+        return wrapper
+    return decorator
 
 
 # 获取关键词
+@_tracked("mcp_keyword")
 async def get_keywords(tex_content: str):
     url = os.environ.get('SERVER_GET_KEYWORD')
     keyworks = ''
-    async with Client(url) as mcp_client:
+    async with _client(url) as mcp_client:
         tools = await mcp_client.list_tools()
         result = await mcp_client.call_tool(tools[0].name, {"question": tex_content})
         for content in result.content:
@@ -19,9 +212,10 @@ async def get_keywords(tex_content: str):
     return keyworks
     
 # 获取论文相关链接
+@_tracked("mcp_link")
 async def get_link(keywords: str):
     url = os.environ.get('SERVER_SEARCH_LINK')
-    async with Client(url) as mcp_client:
+    async with _client(url) as mcp_client:
        tools = await mcp_client.list_tools()
        result = await mcp_client.call_tool(tools[0].name, {"question": keywords})
        url_list = []
@@ -34,10 +228,11 @@ async def get_link(keywords: str):
        return url_list
 
 # 获取论文摘要
+@_tracked("mcp_summary")
 async def get_summary(tex_content: str):
     url = os.environ.get('SERVER_SUMMARY')
     message = ''
-    async with Client(url) as mcp_client:
+    async with _client(url) as mcp_client:
         tools = await mcp_client.list_tools()
         result = await mcp_client.call_tool(tools[0].name, {"question": tex_content})
         for content in result.content:
@@ -45,10 +240,11 @@ async def get_summary(tex_content: str):
     return message
 
 #  获取论文相关知识
+@_tracked("mcp_knowledge")
 async def get_knowedge(tex_content: str, knowledges):
     url = os.environ.get('SERVER_KNOWLEDGE')
     message = ''
-    async with Client(url) as mcp_client:
+    async with _client(url) as mcp_client:
         tools = await mcp_client.list_tools()
         result = await mcp_client.call_tool(tools[0].name, {
             "question": tex_content,
@@ -63,13 +259,24 @@ async def get_knowedge(tex_content: str, knowledges):
     return message
 
 #  生成博客
+@_tracked("mcp_blog")
 async def get_blog(tex_content: str, code_content, knowledges):
+    return await _gen_blog('', tex_content, code_content, knowledges)
+
+#  只生成博客的单个模块: 工作流的两个LLM节点都只输出该模块(见 MCP/Blog整合.json 的 blog_section 变量)，
+#  耗时远短于整篇生成，单独统计延迟、截止时间和熔断
+@_tracked("mcp_blog_section")
+async def get_blog_section(section_title: str, tex_content: str, code_content, knowledges):
+    return await _gen_blog(section_title, tex_content, code_content, knowledges)
+
+async def _gen_blog(section_title: str, tex_content: str, code_content, knowledges):
     url = os.environ.get('SERVER_GEN_BLOG')
     message = ''
-    async with Client(url) as mcp_client:
+    async with _client(url) as mcp_client:
         tools = await mcp_client.list_tools()
         result = await mcp_client.call_tool(tools[0].name, {
-            'question':'开始',
+            'question': '开始',
+            'qS7mBx2L': section_title,
             'tKEUT9iQ': tex_content,
             'gKxpZiRI': code_content,
             'ocN5KV4O': knowledges})
@@ -1,14 +1,17 @@
-import requests
-import re
 from typing import Optional
 import os
-from pdfdeal import Doc2X
 from config import config
+from ..core.link_extractor import LinkExtractor
+from ..utils.metrics import DOWNLOADED_BYTES, track_backend
+from ..utils.rate_limiter import is_throttle_text, rate_limits
 
 class PDFProcessor:
     def __init__(self):
         self.temp_dir = config.TEMP_DIR
         self.api_key = config.PDFDEAL_API_KEY
+        self.link_extractor = LinkExtractor()
+        # pdfdeal导入较慢，构造处理器时再加载
+        from pdfdeal import Doc2X
         self.client = Doc2X(apikey=self.api_key, debug=True, thread=5, full_speed=True)
 
         # 确保临时目录存在
@@ -27,6 +30,8 @@ class PDFProcessor:
         Returns:
             str: 下载的PDF文件路径
         """
+        import requests
+
         try:
             response = requests.get(pdf_url, stream=True, timeout=30)
             response.raise_for_status()
@@ -41,6 +46,7 @@ class PDFProcessor:
             with open(file_path, 'wb') as f:
                 for chunk in response.iter_content(chunk_size=8192):
                     f.write(chunk)
+                    DOWNLOADED_BYTES.inc(len(chunk), source="pdf")
             
             return file_path
             
@@ -53,34 +59,39 @@ class PDFProcessor:
         import pathlib
         output_path = pathlib.Path(pdf_path).parent
         print(f'output_path: {output_path}')
-        success, failed, flag = self.client.pdf2file(
-            pdf_file=pdf_path,
-            output_path=output_path.as_posix(),
-            output_format="tex",
-        )
+        with rate_limits.get("doc2x").slot() as permit, track_backend("doc2x"):
+            success, failed, flag = self.client.pdf2file(
+                pdf_file=pdf_path,
+                output_path=output_path.as_posix(),
+                output_format="tex",
+            )
+            # pdfdeal把失败放在返回值中而不抛出异常
+            if flag and is_throttle_text(str(failed)):
+                permit.throttled()
+        if success and os.path.isfile(success[0]):
+            DOWNLOADED_BYTES.inc(os.path.getsize(success[0]), source="doc2x")
         print(success)
         print(failed)
         print(flag)
         return success[0]
     
     def extract_git_url(self, text: str) -> Optional[str]:
-        """从文本中提取Git仓库链接"""
-        # 常见的Git URL模式
-        git_patterns = [
-            r'https://github\.com/[\w\-_./]+',
-            r'https://gitlab\.com/[\w\-_./]+',
-            r'https://bitbucket\.org/[\w\-_./]+',
-            r'git@github\.com:[\w\-_./]+\.git',
-        ]
-        
-        for pattern in git_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                # 清理URL，移除可能的标点符号
-                url = matches[0].rstrip('.,;:')
-                return url
+        """从文本中提取论文自己的代码仓库链接，全部链接见 LinkExtractor.extract"""
+        return self.link_extractor.best_repo_url(text)
+    
+    def extract_tex(self, zip_path: str) -> str:
+        """从Doc2X的zip中解压主TEX及其引用的图片，返回TEX文件路径；同一个zip已解压过时直接复用"""
+        from .tex_archive import TexArchive
         
-        return None
+        if not os.path.exists(zip_path):
+            raise Exception(f"转换后的ZIP文件未找到: {zip_path}")
+        with TexArchive(zip_path) as archive:
+            return archive.extract(self.extract_dir(zip_path))
+    
+    @staticmethod
+    def extract_dir(zip_path: str) -> str:
+        """zip的解压目录，主TEX可能在其子目录中"""
+        return os.path.join(os.path.dirname(zip_path), f"extracted_{os.path.splitext(os.path.basename(zip_path))[0]}")
     
     def process_pdf_to_tex(self, pdf_path: str) -> tuple[str, Optional[str]]:
         """处理PDF文件转换为TEX，返回TEX文件路径和Git链接
@@ -91,10 +102,6 @@ class PDFProcessor:
         Returns:
             tuple: (tex_file_path, git_url) - TEX文件路径和Git链接（可选）
         """
-        import zipfile
-        import shutil
-        from pathlib import Path
-        
         try:
             if not os.path.exists(pdf_path):
                 raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
@@ -102,24 +109,10 @@ class PDFProcessor:
             # 步骤1: 转换PDF为TEX
             zip_path = self.convert_pdf_to_tex_async(pdf_path)
             
-            if not os.path.exists(zip_path):
-                raise Exception(f"转换后的ZIP文件未找到: {zip_path}")
-            
-            # 步骤2: 解压并提取TEX内容
-            extract_dir = Path(zip_path).parent / f"extracted_{Path(zip_path).stem}"
-            extract_dir.mkdir(exist_ok=True)
-            
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-            
-            # 步骤3: 查找TEX文件
-            tex_files = list(extract_dir.glob("*.tex"))
-            if not tex_files:
-                raise Exception("解压后未找到TEX文件")
-            
-            tex_file_path = str(tex_files[0])
+            # 步骤2: 只解压主TEX及其引用的文件
+            tex_file_path = self.extract_tex(zip_path)
             
-            # 步骤4: 读取TEX内容并提取Git链接
+            # 步骤3: 读取TEX内容并提取Git链接
             with open(tex_file_path, 'r', encoding='utf-8') as f:
                 tex_content = f.read()
             
@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import zipfile
+from typing import IO, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# \includegraphics[...]{path} 以及 \input / \include 的文件
+_REFERENCE = re.compile(r"\\(?:includegraphics|input|include)\s*(?:\[[^\]]*\])?\s*\{([^}]+)\}")
+_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".svg", ".pdf", ".eps")
+_MANIFEST = ".extracted.json"
+
+
+class TexArchive:
+    """按需读取Doc2X返回的zip
+
+    只读取zip的中央目录，不解压全部内容: extract() 流式写出主TEX和它引用的文件，
+    同一个zip已解压过时直接复用；其余图片留在zip中，通过 images() / open() 按需读取。
+    """
+
+    def __init__(self, zip_path: str):
+        self.zip_path = zip_path
+        self._zip = zipfile.ZipFile(zip_path)
+        self._members: Dict[str, zipfile.ZipInfo] = {
+            info.filename: info for info in self._zip.infolist() if not info.is_dir()
+        }
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self) -> "TexArchive":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def main_tex(self) -> str:
+        """主TEX文件: 目录层级最浅、体积最大的.tex"""
+        tex_files = [name for name in self._members if name.lower().endswith(".tex")]
+        if not tex_files:
+            raise FileNotFoundError("zip中未找到TEX文件")
+        return min(tex_files, key=lambda name: (name.count("/"), -self._members[name].file_size))
+
+    def read_text(self, name: str) -> str:
+        return self._zip.read(self._members[name]).decode("utf-8", errors="replace")
+
+    def images(self) -> List[str]:
+        """zip中的全部图片文件名，内容通过open()按需读取"""
+        return [name for name in self._members if name.lower().endswith(_IMAGE_EXTENSIONS)]
+
+    def read_bytes(self, name: str) -> bytes:
+        return self._zip.read(self._members[name])
+
+    def open(self, name: str) -> IO[bytes]:
+        """以流的方式读取zip中的文件，不落盘"""
+        return self._zip.open(self._members[name])
+
+    def _resolve(self, base: str, reference: str) -> Optional[str]:
+        """把TEX中的相对路径映射为zip成员名，省略扩展名时依次尝试常见扩展名"""
+        path = posixpath.normpath(posixpath.join(posixpath.dirname(base), reference.strip()))
+        for candidate in (path, f"{path}.tex", *(path + ext for ext in _IMAGE_EXTENSIONS)):
+            if candidate in self._members:
+                return candidate
+        return None
+
+    def referenced(self, main: str) -> List[str]:
+        """主TEX及其引用的文件(递归解析 \\input / \\include)"""
+        result, pending = [main], [main]
+        while pending:
+            name = pending.pop()
+            if not name.lower().endswith(".tex"):
+                continue
+            for match in _REFERENCE.finditer(self.read_text(name)):
+                for reference in match.group(1).split(","):
+                    member = self._resolve(main, reference)
+                    if member and member not in result:
+                        result.append(member)
+                        pending.append(member)
+        return result
+
+    def _signature(self, names: List[str]) -> Dict[str, int]:
+        return {name: self._members[name].CRC for name in names}
+
+    def extract(self, target_dir: str) -> str:
+        """解压主TEX及其引用的文件，返回主TEX路径；目录中已有相同内容时跳过"""
+        main = self.main_tex()
+        names = self.referenced(main)
+        signature = self._signature(names)
+        manifest_path = os.path.join(target_dir, _MANIFEST)
+        main_path = os.path.join(target_dir, *main.split("/"))
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                if json.load(f) == signature and all(
+                        os.path.isfile(os.path.join(target_dir, *name.split("/"))) for name in names):
+                    logger.info(f"Reusing extracted TEX tree {target_dir}")
+                    return main_path
+        except (OSError, ValueError):
+            pass
+
+        for name in names:
+            destination = os.path.join(target_dir, *name.split("/"))
+            # 拒绝 ../ 等指向目录之外的成员
+            if os.path.commonpath([os.path.abspath(destination), os.path.abspath(target_dir)]) != os.path.abspath(target_dir):
+                raise ValueError(f"zip成员路径非法: {name}")
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(destination), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as out, self.open(name) as src:
+                    shutil.copyfileobj(src, out, 1024 * 1024)
+                os.replace(tmp_path, destination)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(signature, f)
+        logger.info(f"Extracted {len(names)}/{len(self._members)} members to {target_dir}")
+        return main_path
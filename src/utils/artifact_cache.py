@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional
+
+from config import config
+from .metrics import CACHE_EVICTIONS, CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+def digest(*parts: str) -> str:
+    """计算若干文本片段的sha256摘要"""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update((part or "").encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """计算文件内容的sha256摘要"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ArtifactCache:
+    """按内容摘要缓存生成的文件，写入为原子替换，可在多进程间共享
+
+    指定 max_bytes 或 max_age(秒)时，每次写入后清理: 先删除写入时间超过 max_age 的文件，
+    再按最近命中时间从旧到新淘汰，直到总大小不超过 max_bytes。
+    """
+
+    def __init__(self, namespace: str, root: Optional[str] = None, suffix: str = ".md",
+                 max_bytes: Optional[int] = None, max_age: Optional[float] = None):
+        self.namespace = namespace
+        self.suffix = suffix
+        self.cache_dir = os.path.join(root or config.CACHE_DIR, namespace)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{self.suffix}")
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[str]:
+        """命中时返回缓存文件路径；指定 max_age(秒)时，写入时间早于该时长的缓存视为未命中"""
+        path = self.path_for(key)
+        if os.path.isfile(path) and (not max_age or time.time() - os.path.getmtime(path) <= max_age):
+            logger.info(f"Cache hit [{self.namespace}] {key[:12]}")
+            CACHE_REQUESTS.inc(namespace=self.namespace, result="hit")
+            # 访问时间记录最近命中，修改时间保持为写入时间(max_age按它判断)；挂载选项不更新atime时同样有效
+            try:
+                os.utime(path, (time.time(), os.path.getmtime(path)))
+            except OSError:
+                pass
+            return path
+        logger.info(f"Cache miss [{self.namespace}] {key[:12]}")
+        CACHE_REQUESTS.inc(namespace=self.namespace, result="miss")
+        return None
+
+    def get_text(self, key: str) -> Optional[str]:
+        path = self.get(key)
+        if path is None:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _atomic_write(self, key: str, write) -> str:
+        path = self.path_for(key)
+        # 临时目录可能被整体清理，写入前确保缓存目录存在
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        if self.max_bytes or self.max_age:
+            self.prune(keep=path)
+        return path
+
+    def prune(self, keep: Optional[str] = None) -> int:
+        """按 max_age 和 max_bytes 清理缓存文件(keep 除外)，返回删除的文件数
+
+        其他进程正在写入的临时文件只在超过 max_age 后删除。
+        """
+        now = time.time()
+        files = []
+        for item in os.scandir(self.cache_dir):
+            try:
+                stat = item.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if item.is_file(follow_symlinks=False):
+                files.append((max(stat.st_atime, stat.st_mtime), stat.st_mtime, stat.st_size, item.path))
+        files.sort()
+        total = sum(size for _, _, size, _ in files)
+        removed = 0
+        for last_used, written, size, path in files:
+            if path == keep:
+                continue
+            if self.max_age and now - written > self.max_age:
+                reason = "age"
+            elif self.max_bytes and total > self.max_bytes and not path.endswith(".tmp"):
+                reason = "quota"
+            else:
+                continue
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            CACHE_EVICTIONS.inc(namespace=self.namespace, reason=reason)
+        if removed:
+            logger.info(f"Pruned {removed} files from cache [{self.namespace}], {total / 1024 / 1024:.1f}MB left")
+        return removed
+
+    def put_text(self, key: str, content: str) -> str:
+        return self._atomic_write(key, lambda f: f.write(content.encode("utf-8")))
+
+    def put_file(self, key: str, src_path: str) -> str:
+        def copy(f):
+            with open(src_path, "rb") as src:
+                shutil.copyfileobj(src, f)
+        return self._atomic_write(key, copy)
+
+    def restore(self, key: str, dst_path: str, max_age: Optional[float] = None) -> bool:
+        """命中时把缓存文件复制到目标路径"""
+        path = self.get(key, max_age)
+        if path is None:
+            return False
+        shutil.copyfile(path, dst_path)
+        return True
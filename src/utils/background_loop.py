@@ -0,0 +1,49 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BackgroundLoop:
+    """在守护线程中常驻的事件循环
+
+    Gradio的每个回调都在各自线程里用 asyncio.run 新建事件循环，绑定事件循环的异步客户端
+    (httpx.AsyncClient 等连接池)无法跨回调复用。需要复用连接的客户端都创建在这个循环上，
+    同步代码通过 run() 提交协程并等待结果。
+    """
+
+    def __init__(self, name: str = "background-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True).start()
+                logger.info(f"Started background event loop [{self.name}]")
+            return self._loop
+
+    def submit(self, coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        """提交协程，立即返回Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """提交协程并阻塞等待结果，超时时取消协程"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+
+# 全局实例，所有共享连接池的异步客户端都运行在这里
+background_loop = BackgroundLoop()
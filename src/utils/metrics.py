@@ -0,0 +1,228 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 步骤与外部调用的耗时跨度从毫秒级(渲染)到半小时(Claude Code)
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """只增不减的计数"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    """可增可减的当前值，如进行中的请求数"""
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """按桶累计的分布，如耗时"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % ("+Inf" if bound == float("inf") else _format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """进程内的指标集合，按Prometheus文本格式输出"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+STEP_DURATION = registry.histogram(
+    "fpr_step_duration_seconds", "Pipeline step duration", ("step", "status"))
+BACKEND_IN_FLIGHT = registry.gauge(
+    "fpr_backend_in_flight", "Requests currently in flight per backend (doc2x, mcp_*, claude)", ("backend",))
+BACKEND_DURATION = registry.histogram(
+    "fpr_backend_request_duration_seconds", "Backend request duration", ("backend", "status"))
+QUEUE_DEPTH = registry.gauge(
+    "fpr_queue_depth", "Jobs waiting for a concurrency slot", ("queue",))
+QUEUE_WAIT = registry.histogram(
+    "fpr_queue_wait_seconds", "Time spent waiting for a concurrency slot", ("queue",))
+DOWNLOADED_BYTES = registry.counter(
+    "fpr_downloaded_bytes_total", "Bytes downloaded from external sources", ("source",))
+CACHE_REQUESTS = registry.counter(
+    "fpr_cache_requests_total", "Artifact cache lookups", ("namespace", "result"))
+CACHE_EVICTIONS = registry.counter(
+    "fpr_cache_evictions_total", "Artifact cache files removed by size or age limits", ("namespace", "reason"))
+SINGLE_FLIGHT_REQUESTS = registry.counter(
+    "fpr_single_flight_requests_total",
+    "Coalesced step calls by outcome (leader ran it, joined an in-process call, shared another process's result)",
+    ("step", "result"))
+WORKSPACE_BYTES = registry.gauge(
+    "fpr_workspace_bytes", "Disk usage of project workspaces, caches, paper index and single-flight results after the last sweep")
+WORKSPACE_EVICTIONS = registry.counter(
+    "fpr_workspace_evictions_total", "Project workspaces and cache entries removed by the sweeper", ("reason",))
+RATE_LIMIT_CONCURRENCY = registry.gauge(
+    "fpr_rate_limit_concurrency", "Current adaptive (AIMD) concurrency limit per backend", ("backend",))
+RATE_LIMIT_THROTTLED = registry.counter(
+    "fpr_rate_limit_throttled_total",
+    "Throttling events per backend (throttled by the backend, rejected because the queue was full or the wait timed out)",
+    ("backend", "reason"))
+MCP_TAIL_EVENTS = registry.counter(
+    "fpr_mcp_tail_events_total",
+    "MCP tail-latency control events (hedge_sent, hedge_won, deadline, circuit_rejected)", ("backend", "event"))
+MCP_CIRCUIT_OPEN = registry.gauge(
+    "fpr_mcp_circuit_open", "1 while the circuit breaker of an MCP server is open", ("backend",))
+PREFETCH_PAPERS = registry.counter(
+    "fpr_prefetch_papers_total", "Papers handled by the prefetch scheduler", ("result",))
+
+
+@contextmanager
+def track_backend(backend: str) -> Iterator[None]:
+    """统计一次外部调用: 进行中的数量、耗时与成功/失败"""
+    status = "ok"
+    start = time.perf_counter()
+    BACKEND_IN_FLIGHT.inc(backend=backend)
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        BACKEND_IN_FLIGHT.dec(backend=backend)
+        BACKEND_DURATION.observe(time.perf_counter() - start, backend=backend, status=status)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """在后台线程提供 /metrics"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Metrics endpoint: http://{host}:{port}/metrics")
+    return server
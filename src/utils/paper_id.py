@@ -0,0 +1,56 @@
+import re
+from typing import Optional
+from urllib.parse import parse_qs, parse_qsl, urlencode, urlsplit
+
+# arXiv 新旧两种编号: 2401.12345 / hep-th/9901001，可带版本号
+_ARXIV = re.compile(
+    r"arxiv\.org/(?:abs|pdf|html|format)/((?:\d{4}\.\d{4,5})|(?:[a-z\-]+(?:\.[A-Z]{2})?/\d{7}))(v\d+)?",
+    re.IGNORECASE,
+)
+# 不影响链接指向内容的跟踪参数，生成标识时去掉
+_TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid"}
+
+
+def arxiv_id(url: str) -> Optional[str]:
+    """链接中的arXiv编号(含版本号)，不是arXiv链接时返回None"""
+    match = _ARXIV.search(url or "")
+    return f"{match.group(1)}{match.group(2) or ''}" if match else None
+
+
+def canonical_paper_id(url: str) -> str:
+    """论文链接的规范标识: 同一篇论文的 abs/pdf 链接、http/https、末尾的 .pdf 都映射为同一个标识
+
+    - arXiv: arxiv:2401.12345 (指定版本时为 arxiv:2401.12345v2)
+    - OpenReview: openreview:<id>
+    - 其他链接: url:<host>/<path>?<排序后的查询参数>，查询参数可能区分不同论文(如 download.php?id=1)，
+      只去掉 utm_* 等跟踪参数
+    """
+    url = (url or "").strip()
+    arxiv = arxiv_id(url)
+    if arxiv:
+        return f"arxiv:{arxiv}"
+    parts = urlsplit(url if "://" in url else f"https://{url}")
+    host = parts.netloc.lower().removeprefix("www.")
+    if host.endswith("openreview.net"):
+        paper = parse_qs(parts.query).get("id")
+        if paper:
+            return f"openreview:{paper[0]}"
+    query = urlencode(sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                             if key not in _TRACKING_PARAMS and not key.startswith("utm_")))
+    return f"url:{host}{parts.path.rstrip('/')}" + (f"?{query}" if query else "")
+
+
+def is_versionless(paper_id: str) -> bool:
+    """不带版本号的arXiv标识，对应的内容会随作者上传新版本而变化"""
+    return paper_id.startswith("arxiv:") and not re.search(r"v\d+$", paper_id)
+
+
+def canonical_repo_id(git_url: str) -> str:
+    """代码仓库链接的规范标识，如 git:github.com/owner/repo"""
+    url = (git_url or "").strip()
+    if url.startswith("git@"):
+        url = "https://" + url[4:].replace(":", "/", 1)
+    parts = urlsplit(url if "://" in url else f"https://{url}")
+    host = parts.netloc.lower().removeprefix("www.")
+    path = parts.path.rstrip("/").removesuffix(".git")
+    return f"git:{host}{path}"
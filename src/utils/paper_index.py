@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from config import config
+from .artifact_cache import digest
+from .metrics import CACHE_REQUESTS
+from .paper_id import canonical_paper_id, canonical_repo_id
+
+logger = logging.getLogger(__name__)
+
+_ENTRY = "entry.json"
+
+
+class PaperIndex:
+    """已完成论文的全局索引: (规范论文标识, 管道版本) → 最终产物(TEX、摘要、代码分析、论文理解、Blog、HTML)
+
+    产物复制到索引目录保存，不受项目工作目录清理的影响；同一篇论文重新生成后覆盖旧的记录。
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or config.PAPER_INDEX_DIR
+
+    def _entry_dir(self, pdf_url: str, version: str) -> str:
+        return os.path.join(self.root, digest(canonical_paper_id(pdf_url), version)[:32])
+
+    def lookup(self, pdf_url: str, version: str, git_url: str = "", required: Iterable[str] = (),
+               max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """返回索引记录，产物的路径为绝对路径
+
+        用户指定了其他代码仓库、记录不完整(缺少 required 中的产物)、产物文件已被删除，
+        或指定了 max_age(秒)且记录早于该时长时视为未命中。
+        """
+        entry_path = os.path.join(self._entry_dir(pdf_url, version), _ENTRY)
+        entry_dir = os.path.dirname(entry_path)
+        try:
+            if max_age and time.time() - os.path.getmtime(entry_path) > max_age:
+                raise OSError("expired")
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+        if not isinstance(entry, dict) or not isinstance(entry.get("artifacts"), dict):
+            entry = None
+        if entry is not None and git_url and entry.get("repo_id") != canonical_repo_id(git_url):
+            entry = None
+        if entry is not None:
+            entry["artifacts"] = {name: os.path.join(entry_dir, rel) for name, rel in entry["artifacts"].items()}
+            complete = all(name in entry["artifacts"] for name in required)
+            if not complete or not all(os.path.exists(path) for path in entry["artifacts"].values()):
+                entry = None
+        if entry is not None:
+            # 记录最近命中时间(访问时间)，后台清理按它淘汰；修改时间保持为发布时间，max_age按它判断
+            try:
+                os.utime(entry_path, (time.time(), os.path.getmtime(entry_path)))
+            except OSError:
+                pass
+        CACHE_REQUESTS.inc(namespace="paper_index", result="hit" if entry else "miss")
+        return entry
+
+    def publish(self, pdf_url: str, version: str, artifacts: Dict[str, str], metadata: Dict[str, Any]) -> str:
+        """保存产物 {名称: 文件或目录路径} 及元数据，返回索引目录
+
+        先写入临时目录再整体替换，读取方不会看到只写了一半的记录。
+        """
+        entry_dir = self._entry_dir(pdf_url, version)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.root, prefix=".tmp_")
+        try:
+            stored = {}
+            for name, path in artifacts.items():
+                if not path or not os.path.exists(path):
+                    continue
+                # 保留原文件名(HTML引用的assets/目录名不能变)，重名时加上产物名称
+                rel = os.path.basename(path.rstrip(os.sep))
+                if rel in stored.values():
+                    rel = f"{name}_{rel}"
+                if os.path.isdir(path):
+                    shutil.copytree(path, os.path.join(tmp_dir, rel))
+                else:
+                    shutil.copy2(path, os.path.join(tmp_dir, rel))
+                stored[name] = rel
+            entry = {
+                **metadata,
+                "paper_id": canonical_paper_id(pdf_url),
+                "pdf_url": pdf_url,
+                "repo_id": canonical_repo_id(metadata["git_url"]) if metadata.get("git_url") else None,
+                "version": version,
+                "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "artifacts": stored,
+            }
+            with open(os.path.join(tmp_dir, _ENTRY), "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, indent=2)
+            # 旧记录先移走再换入新目录，两次rename之间的lookup视为未命中
+            old_dir = f"{entry_dir}.old.{os.getpid()}"
+            if os.path.isdir(entry_dir):
+                os.replace(entry_dir, old_dir)
+            os.replace(tmp_dir, entry_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        logger.info(f"Published {entry['paper_id']} ({version}) to paper index")
+        return entry_dir
+
+    @staticmethod
+    def restore(entry: Dict[str, Any], target_dir: str) -> Dict[str, str]:
+        """把索引记录的产物复制到项目目录，返回 {名称: 复制后的路径}"""
+        os.makedirs(target_dir, exist_ok=True)
+        restored = {}
+        for name, path in entry["artifacts"].items():
+            destination = os.path.join(target_dir, os.path.basename(path))
+            if os.path.isdir(path):
+                shutil.copytree(path, destination, dirs_exist_ok=True)
+            else:
+                shutil.copy2(path, destination)
+            restored[name] = destination
+        return restored
+
+
+# 全局索引实例
+paper_index = PaperIndex()
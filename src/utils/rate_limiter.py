@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from config import config
+from .metrics import QUEUE_DEPTH, QUEUE_WAIT, RATE_LIMIT_CONCURRENCY, RATE_LIMIT_THROTTLED
+
+logger = logging.getLogger(__name__)
+
+# 后端返回的限流/过载错误
+_THROTTLE_TEXT = re.compile(r"\b429\b|rate.?limit|too many requests|overloaded|quota exceeded|限流|频率", re.IGNORECASE)
+_THROTTLE_STATUS = (429, 503)
+
+
+class BackendBusy(Exception):
+    """后端排队已满或等待超时，请求未发出；提示用户稍后重试"""
+
+
+def throttle_info(error: BaseException) -> Tuple[bool, Optional[float]]:
+    """判断异常是否为限流，返回 (是否限流, 响应头Retry-After的秒数)"""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status in _THROTTLE_STATUS or _THROTTLE_TEXT.search(str(error)):
+        try:
+            retry_after = float(response.headers.get("retry-after"))
+        except (AttributeError, TypeError, ValueError):
+            retry_after = None
+        return True, retry_after
+    return False, None
+
+
+def is_throttle_text(text: str) -> bool:
+    """命令行输出等文本中是否包含限流信息"""
+    return bool(_THROTTLE_TEXT.search(text or ""))
+
+
+class Permit:
+    """一次获准的请求；调用方在后端返回限流但没有抛出异常时调用 throttled()"""
+
+    def __init__(self):
+        self.throttled_flag = False
+        self.retry_after: Optional[float] = None
+        self.queue_wait = 0.0
+
+    def throttled(self, retry_after: Optional[float] = None):
+        self.throttled_flag = True
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """单个后端的自适应限流: 令牌桶限制请求速率，AIMD调整并发上限
+
+    - 每次成功并发上限加 1/上限(约每轮加1)，收到限流时上限减半，并在 Retry-After 或指数退避时间内暂停发出新请求
+    - 超过上限的请求排队等待；排队数达到 max_queue 或等待超过 max_wait 时抛出 BackendBusy，把压力反馈给用户
+    - Gradio的每个请求在各自线程的事件循环中运行，状态用线程锁保护，可跨事件循环和同步代码共享
+    """
+
+    def __init__(self, name: str, rate: float = 0.0, max_concurrency: int = 4, min_concurrency: int = 1,
+                 max_queue: Optional[int] = None, max_wait: Optional[float] = None):
+        self.name = name
+        self.rate = rate  # 每秒请求数，0表示不限速率
+        self.burst = max(1.0, rate)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.max_queue = config.RATE_LIMIT_MAX_QUEUE if max_queue is None else max_queue
+        self.max_wait = config.RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._consecutive_throttles = 0
+        self._lock = threading.Lock()
+        RATE_LIMIT_CONCURRENCY.set(self.limit, backend=name)
+
+    def _try_acquire(self) -> Optional[float]:
+        """获得许可时返回None，否则返回建议的等待秒数"""
+        with self._lock:
+            now = time.monotonic()
+            if self.rate:
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.in_flight >= int(self.limit):
+                return 0.05
+            if self.rate and self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            if self.rate:
+                self._tokens -= 1
+            self.in_flight += 1
+            return None
+
+    def _enqueue(self):
+        with self._lock:
+            if self.max_queue and self.waiting >= self.max_queue:
+                RATE_LIMIT_THROTTLED.inc(backend=self.name, reason="queue_full")
+                raise BackendBusy(f"{self.name} 服务繁忙(排队 {self.waiting} 个请求)，请稍后重试")
+            self.waiting += 1
+
+    def _dequeue(self):
+        with self._lock:
+            self.waiting -= 1
+
+    def _check_deadline(self, start: float):
+        if self.max_wait and time.monotonic() - start > self.max_wait:
+            RATE_LIMIT_THROTTLED.inc(backend=self.name, reason="wait_timeout")
+            raise BackendBusy(f"{self.name} 服务繁忙(排队超过 {self.max_wait:g}s)，请稍后重试")
+
+    def _release(self, permit: Permit, error: Optional[BaseException] = None):
+        if error is not None and not permit.throttled_flag:
+            throttled, retry_after = throttle_info(error)
+            if throttled:
+                permit.throttled(retry_after)
+        with self._lock:
+            self.in_flight -= 1
+            if permit.throttled_flag:
+                self._consecutive_throttles += 1
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+                pause = permit.retry_after or min(2 ** (self._consecutive_throttles - 1), 60)
+                self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            elif error is None:
+                self._consecutive_throttles = 0
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            limit = self.limit
+        RATE_LIMIT_CONCURRENCY.set(limit, backend=self.name)
+        if permit.throttled_flag:
+            RATE_LIMIT_THROTTLED.inc(backend=self.name, reason="throttled")
+            logger.warning(f"{self.name} throttled, concurrency limit -> {limit:.1f}")
+
+    @asynccontextmanager
+    async def aslot(self) -> AsyncIterator[Permit]:
+        """在异步代码中获取许可，排队期间不阻塞事件循环"""
+        permit = Permit()
+        start = time.monotonic()
+        self._enqueue()
+        try:
+            with QUEUE_DEPTH.track_inprogress(queue=self.name):
+                while True:
+                    wait = self._try_acquire()
+                    if wait is None:
+                        break
+                    self._check_deadline(start)
+                    await asyncio.sleep(min(wait, 0.5))
+        finally:
+            self._dequeue()
+        permit.queue_wait = time.monotonic() - start
+        QUEUE_WAIT.observe(permit.queue_wait, queue=self.name)
+        try:
+            yield permit
+        except BaseException as e:
+            self._release(permit, e)
+            raise
+        self._release(permit)
+
+    @contextmanager
+    def slot(self) -> Iterator[Permit]:
+        """在同步代码中获取许可"""
+        permit = Permit()
+        start = time.monotonic()
+        self._enqueue()
+        try:
+            with QUEUE_DEPTH.track_inprogress(queue=self.name):
+                while True:
+                    wait = self._try_acquire()
+                    if wait is None:
+                        break
+                    self._check_deadline(start)
+                    time.sleep(min(wait, 0.5))
+        finally:
+            self._dequeue()
+        permit.queue_wait = time.monotonic() - start
+        QUEUE_WAIT.observe(permit.queue_wait, queue=self.name)
+        try:
+            yield permit
+        except BaseException as e:
+            self._release(permit, e)
+            raise
+        self._release(permit)
+
+    def has_capacity(self) -> bool:
+        """当前可以立即发出请求: 没有排队、未暂停、未达到并发上限且有剩余令牌"""
+        with self._lock:
+            now = time.monotonic()
+            tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate) if self.rate else 1.0
+            return (not self.waiting and now >= self._paused_until
+                    and self.in_flight < int(self.limit) and tokens >= 1)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {"limit": round(self.limit, 2), "in_flight": self.in_flight, "waiting": self.waiting,
+                    "paused": round(max(0.0, self._paused_until - time.monotonic()), 1)}
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[float, int]]:
+    """解析 "后端=每秒请求数:最大并发,..."，如 "doc2x=1:4,mcp=5:8" """
+    limits = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, value = item.split("=", 1)
+        rate, _, concurrency = value.partition(":")
+        limits[name.strip()] = (float(rate or 0), int(concurrency or 4))
+    return limits
+
+
+class RateLimiterRegistry:
+    """每个外部后端一个限流器，配置按后端名查找，找不到时按前缀(如 mcp_keyword → mcp)"""
+
+    def __init__(self, spec: Optional[str] = None):
+        self.limits = parse_rate_limits(spec if spec is not None else config.RATE_LIMITS)
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, backend: str) -> AdaptiveLimiter:
+        with self._lock:
+            limiter = self._limiters.get(backend)
+            if limiter is None:
+                rate, concurrency = self.limits.get(backend) or self.limits.get(backend.split("_")[0]) or (0.0, 4)
+                limiter = self._limiters[backend] = AdaptiveLimiter(backend, rate=rate, max_concurrency=concurrency)
+            return limiter
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.name: limiter.snapshot() for limiter in limiters}
+
+    def pressure_text(self) -> str:
+        """有请求排队或被限流的后端，供界面提示；全部空闲时返回空字符串"""
+        busy = []
+        for name, state in self.snapshot().items():
+            if state["waiting"] or state["paused"]:
+                detail = f"排队{state['waiting']}" + (f"，限流暂停{state['paused']:g}s" if state["paused"] else "")
+                busy.append(f"{name}({detail})")
+        return f"⏳ 服务繁忙: {', '.join(busy)}" if busy else ""
+
+
+# 全局实例，所有外部AI后端的调用都经过这里
+rate_limits = RateLimiterRegistry()
@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from config import config
+from .artifact_cache import digest
+from .metrics import SINGLE_FLIGHT_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows下只在进程内合并
+    fcntl = None
+
+
+class SingleFlight:
+    """合并相同key的并发计算: 同一时刻只有一个调用者(leader)真正执行，其余调用者等待并共享结果
+
+    进程内通过Future等待；跨进程(多个Gradio worker、batch_app)通过 fcntl 文件锁串行化，
+    leader把JSON结果写入 <key>.json，其他进程拿到锁后只使用在自己开始等待之后写入的结果。
+    这里只合并"正在进行"的调用，不是缓存；leader失败时不写结果，等待者各自重新执行。
+    """
+
+    def __init__(self, lock_dir: Optional[str] = None):
+        self.lock_dir = lock_dir or config.SINGLE_FLIGHT_DIR
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.lock_dir, f"{digest(key)[:32]}{suffix}")
+
+    @contextmanager
+    def _file_lock(self, key: str) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.lock_dir, exist_ok=True)
+        with open(self._path(key, ".lock"), "a") as f:
+            # 更新修改时间，后台清理(见 workspace.sweep)不会删除近期使用的锁文件
+            os.utime(f.fileno())
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _read_result(self, key: str, since: float) -> Optional[Dict[str, Any]]:
+        """读取 since 之后其他进程写入的结果"""
+        path = self._path(key, ".json")
+        try:
+            if os.path.getmtime(path) < since:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data if data.get("key") == key else None
+
+    def _write_result(self, key: str, value: Any):
+        os.makedirs(self.lock_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.lock_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "value": value, "pid": os.getpid()}, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key, ".json"))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def do(self, key: str, fn: Callable[[], Any], step: str = "") -> Any:
+        """执行fn或等待相同key的进行中调用，返回其结果；fn的返回值必须可以JSON序列化"""
+        step = step or key.rsplit(":", 1)[-1]
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            SINGLE_FLIGHT_REQUESTS.inc(step=step, result="joined")
+            logger.info(f"Joined in-flight {key}")
+            return future.result()
+
+        try:
+            wait_start = time.time()
+            with self._file_lock(key):
+                shared = self._read_result(key, wait_start)
+                if shared is not None:
+                    SINGLE_FLIGHT_REQUESTS.inc(step=step, result="shared")
+                    logger.info(f"Reused result of {key} from process {shared.get('pid')}")
+                    value = shared["value"]
+                else:
+                    SINGLE_FLIGHT_REQUESTS.inc(step=step, result="leader")
+                    value = fn()
+                    self._write_result(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+# 全局实例，同一进程内的所有会话共享
+single_flight = SingleFlight()
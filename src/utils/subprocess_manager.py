@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import shlex
+import signal
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+from config import config
+from .metrics import BACKEND_DURATION, BACKEND_IN_FLIGHT
+from .rate_limiter import AdaptiveLimiter, is_throttle_text, rate_limits
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CLIResult:
+    """命令行任务执行结果"""
+    argv: List[str]
+    returncode: Optional[int]
+    stdout: str
+    stderr: str
+    duration: float
+    queue_wait: float = 0.0
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+    def raise_for_status(self):
+        """执行失败或超时时抛出异常"""
+        if self.timed_out:
+            raise Exception(f"命令执行超时({self.duration:.0f}s): {self.argv[0]}")
+        if self.returncode != 0:
+            detail = (self.stderr or self.stdout).strip()[-500:]
+            raise Exception(f"命令执行失败(exit {self.returncode}): {detail}")
+
+
+class SubprocessManager:
+    """Claude CLI等命令行任务的统一调度: 参数列表执行、超时、全局并发上限、流式读取输出、取消时终止进程
+
+    并发由后端限流器(见 rate_limiter)控制，命令因限流失败时自动降低并发上限。
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, timeout: Optional[float] = None, name: str = "claude"):
+        self.name = name  # 指标中的队列名与后端名
+        self.timeout = timeout or config.CLAUDE_TIMEOUT
+        # 未指定并发上限时使用全局限流器(RATE_LIMITS中的claude)，与其他实例共享
+        self.limiter = AdaptiveLimiter(name, max_concurrency=max_concurrency) if max_concurrency else rate_limits.get(name)
+
+    def claude_argv(self, prompt: str, accept_edits: bool = True) -> List[str]:
+        """构建Claude CLI的参数列表，prompt作为单独参数传入，无需shell转义"""
+        argv = shlex.split(config.CLAUDE_CODE_COMMAND)
+        if accept_edits:
+            argv += ["--permission-mode", "acceptEdits"]
+        argv.append(prompt)
+        return argv
+
+    @staticmethod
+    def _kill(process: asyncio.subprocess.Process):
+        """终止进程及其子进程"""
+        if process.returncode is not None:
+            return
+        try:
+            if os.name == "posix":
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    async def run(self,
+                  argv: Sequence[str],
+                  cwd: Optional[str] = None,
+                  timeout: Optional[float] = None,
+                  on_line: Optional[Callable[[str], None]] = None) -> CLIResult:
+        """异步执行命令，逐行读取stdout；超时或任务被取消时终止整个进程组"""
+        async with self.limiter.aslot() as permit:
+            result = await self._execute(list(argv), cwd, timeout or self.timeout, on_line, permit.queue_wait)
+            if not result.ok and is_throttle_text(result.stderr + result.stdout[-2000:]):
+                permit.throttled()
+            return result
+
+    async def _execute(self, argv: List[str], cwd: Optional[str], timeout: float,
+                       on_line: Optional[Callable[[str], None]], queue_wait: float) -> CLIResult:
+        start = time.monotonic()
+        status = "error"
+        BACKEND_IN_FLIGHT.inc(backend=self.name)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *argv,
+                cwd=cwd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=os.name == "posix",
+                limit=16 * 1024 * 1024,
+            )
+            stdout_lines: List[str] = []
+            stderr_chunks: List[bytes] = []
+
+            async def read_stdout():
+                async for raw in process.stdout:
+                    line = raw.decode("utf-8", errors="replace")
+                    stdout_lines.append(line)
+                    if on_line:
+                        on_line(line.rstrip("\n"))
+
+            async def read_stderr():
+                stderr_chunks.append(await process.stderr.read())
+
+            timed_out = False
+            jobs = asyncio.gather(read_stdout(), read_stderr(), process.wait())
+            jobs.add_done_callback(lambda f: f.cancelled() or f.exception())
+            try:
+                await asyncio.wait_for(jobs, timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                logger.warning(f"CLI job timed out after {timeout}s: {argv[0]}")
+                self._kill(process)
+                await process.wait()
+            except asyncio.CancelledError:
+                logger.warning(f"CLI job cancelled, killing pid {process.pid}")
+                self._kill(process)
+                # 回收子进程，避免留下僵尸进程；shield使等待不被再次取消打断
+                await asyncio.shield(process.wait())
+                raise
+
+            result = CLIResult(
+                argv=argv,
+                returncode=process.returncode,
+                stdout="".join(stdout_lines),
+                stderr=b"".join(stderr_chunks).decode("utf-8", errors="replace"),
+                duration=time.monotonic() - start,
+                queue_wait=queue_wait,
+                timed_out=timed_out,
+            )
+            status = "ok" if result.ok else "error"
+            return result
+        finally:
+            BACKEND_IN_FLIGHT.dec(backend=self.name)
+            BACKEND_DURATION.observe(time.monotonic() - start, backend=self.name, status=status)
+
+    def run_sync(self, argv: Sequence[str], **kwargs) -> CLIResult:
+        """在同步代码(如Gradio回调)中执行命令
+
+        取消时终止进程只对异步调用方(run())有效: 同步回调在Gradio的工作线程中执行，
+        关闭页面或事件被取消都不会中断该线程，命令会一直执行到结束或超时。
+        只有 asyncio.run 自身被中断(如Ctrl+C)时才会取消任务并终止进程组；需要随事件取消时请改用 run()。
+        """
+        return asyncio.run(self.run(argv, **kwargs))
+
+
+# 全局实例，所有CLI调用共享并发上限
+subprocess_manager = SubprocessManager()
@@ -0,0 +1,259 @@
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config import config
+from .metrics import WORKSPACE_BYTES, WORKSPACE_EVICTIONS
+
+logger = logging.getLogger(__name__)
+
+# 记录最近使用时间的标记文件，多个进程共享同一个工作目录时也能看到
+_MARKER = ".last_used"
+_SAFE_ID = re.compile(r"[^\w\-]")
+
+
+@dataclass
+class WorkspaceEntry:
+    """一个项目工作目录的占用情况"""
+    project_id: str
+    path: str
+    size: int
+    last_used: float
+    in_use: bool
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _usage(path: str) -> Tuple[int, float]:
+    """文件或目录的总大小和最近使用时间(其中所有文件访问/修改时间的最大值)"""
+    stat = os.lstat(path)
+    size, last_used = (0, stat.st_mtime) if os.path.isdir(path) else (stat.st_size, max(stat.st_atime, stat.st_mtime))
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                stat = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            size += stat.st_size
+            last_used = max(last_used, stat.st_atime, stat.st_mtime)
+    return size, last_used
+
+
+class WorkspaceManager:
+    """项目工作目录管理: 每个项目一个子目录，记录引用和最近使用时间，按时长与磁盘配额淘汰
+
+    步骤执行期间通过 use() 持有引用，持有引用的目录不会被清理；其他进程(如batch_app)
+    正在使用的目录由标记文件的修改时间判断，最近 grace 秒内用过的目录同样跳过。
+
+    缓存(CACHE_DIR)、论文索引(PAPER_INDEX_DIR)和单飞结果(SINGLE_FLIGHT_DIR)与项目目录共用配额:
+    shared_roots 中每项为(目录, 可单独删除的条目所在层级)，条目为缓存文件、索引记录目录或单飞结果文件，
+    超过 shared_max_age 未使用时删除，超出配额时与项目目录一起按最近使用时间淘汰。
+    """
+
+    def __init__(self, root: Optional[str] = None, quota_mb: Optional[int] = None,
+                 max_age_hours: Optional[float] = None, grace: Optional[float] = None,
+                 shared_roots: Optional[Sequence[Tuple[str, int]]] = None,
+                 shared_max_age_hours: Optional[float] = None):
+        self.root = root or config.WORKSPACE_DIR
+        self.quota = (config.WORKSPACE_QUOTA_MB if quota_mb is None else quota_mb) * 1024 * 1024
+        self.max_age = (config.WORKSPACE_MAX_AGE_HOURS if max_age_hours is None else max_age_hours) * 3600
+        self.shared_roots = list(shared_roots) if shared_roots is not None else [
+            (config.CACHE_DIR, 2), (config.PAPER_INDEX_DIR, 1), (config.SINGLE_FLIGHT_DIR, 1)]
+        self.shared_max_age = (config.CACHE_MAX_AGE_HOURS if shared_max_age_hours is None
+                               else shared_max_age_hours) * 3600
+        # 单个步骤最长可能持续一次Claude调用的超时时间
+        self.grace = config.CLAUDE_TIMEOUT if grace is None else grace
+        self._refs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop: Optional[threading.Event] = None
+
+    @staticmethod
+    def _name(project_id: str) -> str:
+        return _SAFE_ID.sub("_", project_id)
+
+    def path(self, project_id: str) -> str:
+        """项目工作目录，不存在时创建"""
+        path = os.path.join(self.root, self._name(project_id))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def touch(self, project_id: str):
+        """更新项目的最近使用时间"""
+        marker = os.path.join(self.path(project_id), _MARKER)
+        with open(marker, "a"):
+            pass
+        os.utime(marker)
+
+    def adopt(self, project_id: str, path: str) -> str:
+        """把其他项目目录中的文件或目录复制到本项目目录下，返回新路径；已在本项目目录中时原样返回"""
+        workdir = self.path(project_id)
+        if os.path.commonpath([os.path.abspath(path), os.path.abspath(workdir)]) == os.path.abspath(workdir):
+            return path
+        target = os.path.join(workdir, os.path.basename(path.rstrip(os.sep)))
+        if os.path.isdir(path):
+            shutil.copytree(path, target, symlinks=True, dirs_exist_ok=True)
+        else:
+            shutil.copy2(path, target)
+        return target
+
+    @contextmanager
+    def use(self, project_id: str) -> Iterator[str]:
+        """在with块内持有项目目录的引用，返回目录路径"""
+        path, name = self.path(project_id), self._name(project_id)
+        with self._lock:
+            self._refs[name] = self._refs.get(name, 0) + 1
+        self.touch(project_id)
+        try:
+            yield path
+        finally:
+            self.touch(project_id)
+            with self._lock:
+                self._refs[name] -= 1
+                if not self._refs[name]:
+                    del self._refs[name]
+
+    def entries(self) -> List[WorkspaceEntry]:
+        """所有项目目录，按最近使用时间从旧到新排列"""
+        if not os.path.isdir(self.root):
+            return []
+        with self._lock:
+            in_use = set(self._refs)
+        result = []
+        for item in os.scandir(self.root):
+            if not item.is_dir(follow_symlinks=False):
+                continue
+            marker = os.path.join(item.path, _MARKER)
+            try:
+                last_used = os.path.getmtime(marker)
+            except OSError:
+                last_used = item.stat().st_mtime
+            result.append(WorkspaceEntry(item.name, item.path, _dir_size(item.path), last_used, item.name in in_use))
+        return sorted(result, key=lambda e: e.last_used)
+
+    def shared_entries(self) -> List[WorkspaceEntry]:
+        """shared_roots 中可单独删除的条目，project_id 为条目路径，按最近使用时间从旧到新排列"""
+        roots = {os.path.abspath(root): depth for root, depth in self.shared_roots if root}
+        workspace_root = os.path.abspath(self.root)
+        found: Dict[str, WorkspaceEntry] = {}
+
+        def scan(path: str, depth: int):
+            for item in os.scandir(path):
+                item_path = os.path.abspath(item.path)
+                # 嵌套在其中的项目目录和其他共享目录按各自的层级统计
+                if item_path in roots or item_path == workspace_root:
+                    continue
+                if depth > 1 and item.is_dir(follow_symlinks=False):
+                    scan(item.path, depth - 1)
+                    continue
+                try:
+                    size, last_used = _usage(item.path)
+                except OSError:
+                    continue
+                found[item_path] = WorkspaceEntry(item_path, item_path, size, last_used, False)
+
+        for root, depth in roots.items():
+            if os.path.isdir(root):
+                scan(root, depth)
+        return sorted(found.values(), key=lambda e: e.last_used)
+
+    @staticmethod
+    def _remove_shared(entry: WorkspaceEntry) -> bool:
+        try:
+            if os.path.isdir(entry.path) and not os.path.islink(entry.path):
+                shutil.rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+        except OSError:
+            return False
+        return True
+
+    def remove(self, project_id: str) -> bool:
+        """删除项目目录，正在使用时不删除"""
+        name = self._name(project_id)
+        with self._lock:
+            if name in self._refs:
+                return False
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(path):
+            return False
+        shutil.rmtree(path, ignore_errors=True)
+        return True
+
+    def sweep(self) -> List[str]:
+        """删除超过保留时长的项目目录和共享条目，再按最近使用时间淘汰直到低于配额，返回被删除的项目ID或条目路径
+
+        共享条目中的空文件(单飞的锁文件)只按保留时长删除，淘汰它们不能降低占用。
+        """
+        now = time.time()
+        projects = self.entries()
+        shared = self.shared_entries()
+        entries = sorted([(e, False) for e in projects] + [(e, True) for e in shared], key=lambda item: item[0].last_used)
+        total = sum(e.size for e, _ in entries)
+        removed = []
+        for entry, is_shared in entries:
+            if entry.in_use or now - entry.last_used < self.grace:
+                continue
+            max_age = self.shared_max_age if is_shared else self.max_age
+            if max_age and now - entry.last_used > max_age:
+                reason = "age"
+            elif self.quota and total > self.quota and entry.size:
+                reason = "quota"
+            else:
+                continue
+            if self._remove_shared(entry) if is_shared else self.remove(entry.project_id):
+                total -= entry.size
+                removed.append(entry.project_id)
+                WORKSPACE_EVICTIONS.inc(reason=reason)
+                logger.info(f"Evicted {'cache entry' if is_shared else 'workspace'} {entry.project_id} "
+                            f"({reason}, {entry.size / 1024 / 1024:.1f}MB)")
+        WORKSPACE_BYTES.set(total)
+        if self.quota and total > self.quota:
+            logger.warning(f"Workspace usage {total / 1024 / 1024:.0f}MB still exceeds quota, remaining projects are in use")
+        return removed
+
+    def start_sweeper(self, interval: Optional[float] = None) -> Optional[threading.Thread]:
+        """启动后台清理线程，重复调用只启动一次"""
+        interval = interval or config.WORKSPACE_SWEEP_INTERVAL
+        with self._lock:
+            if self._stop is not None:
+                return None
+            self._stop = threading.Event()
+        stop = self._stop
+
+        def loop():
+            while True:
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"Workspace sweep failed: {e}")
+                if stop.wait(interval):
+                    return
+
+        thread = threading.Thread(target=loop, name="workspace-sweeper", daemon=True)
+        thread.start()
+        return thread
+
+    def stop_sweeper(self):
+        with self._lock:
+            stop, self._stop = self._stop, None
+        if stop:
+            stop.set()
+
+
+# 全局实例，同一进程内的步骤共享引用计数
+workspace = WorkspaceManager()
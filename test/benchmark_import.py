@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+启动耗时基准测试
+
+每次在新的解释器中导入入口模块(python -X importtime)，统计导入耗时的中位数和最慢的依赖，
+并测量 PipelineProcessor 各处理器首次使用时的构造耗时。可设置上限，超出时返回非0:
+    python test/benchmark_import.py --runs 5
+    python test/benchmark_import.py --max-seconds src.core.pipeline=0.5
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MODULES = ["src.core.pipeline", "batch_app", "gradio_app"]
+_IMPORTTIME_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_import(module: str) -> Tuple[float, Dict[str, float]]:
+    """在新解释器中导入模块，返回 (总耗时, {顶层依赖: 累计耗时})"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{result.stderr[-2000:]}")
+    packages: Dict[str, float] = {}
+    for match in _IMPORTTIME_PATTERN.finditer(result.stderr):
+        cumulative, name = int(match.group(2)), match.group(4)
+        top = name.split(".")[0]
+        # 同一个包只记录最外层(累计耗时最大)的一次导入
+        packages[top] = max(packages.get(top, 0.0), cumulative / 1e6)
+    return elapsed, packages
+
+
+def measure_first_use() -> Dict[str, float]:
+    """PipelineProcessor 构造以及各处理器首次使用的耗时"""
+    code = (
+        "import json, time\n"
+        "t = time.perf_counter()\n"
+        "from src.core.pipeline import PipelineProcessor\n"
+        "p = PipelineProcessor()\n"
+        "out = {'PipelineProcessor()': time.perf_counter() - t}\n"
+        "for name in ('pdf_processor', 'git_processor', 'billing', 'blog_generator'):\n"
+        "    t = time.perf_counter()\n"
+        "    try:\n"
+        "        getattr(p, name)\n"
+        "    except Exception:\n"
+        "        pass\n"
+        "    out[name] = time.perf_counter() - t\n"
+        "print(json.dumps(out))\n"
+    )
+    env = dict(os.environ, PDFDEAL_API_KEY=os.getenv("PDFDEAL_API_KEY", "benchmark"))
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="入口模块导入耗时基准测试")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="显示最慢的依赖数")
+    parser.add_argument("--max-seconds", action="append", default=[], metavar="MODULE=SECONDS",
+                        help="导入耗时中位数上限，可多次指定")
+    parser.add_argument("--json", help="把结果写入JSON文件")
+    args = parser.parse_args()
+
+    limits = {k: float(v) for k, v in (item.split("=", 1) for item in args.max_seconds)}
+    report = {}
+    failed: List[str] = []
+    for module in args.modules:
+        samples, packages = [], {}
+        for _ in range(args.runs):
+            elapsed, packages = measure_import(module)
+            samples.append(elapsed)
+        median = statistics.median(samples)
+        heaviest = sorted(packages.items(), key=lambda item: -item[1])[:args.top]
+        report[module] = {"median": median, "min": min(samples), "heaviest": dict(heaviest)}
+
+        print(f"📦 {module}: 中位数 {median:.3f}s (最快 {min(samples):.3f}s，共{args.runs}次)")
+        for name, seconds in heaviest:
+            print(f"   {name:<28}{seconds:>8.3f}s")
+        if module in limits and median > limits[module]:
+            failed.append(f"{module} {median:.3f}s > {limits[module]}s")
+
+    first_use = measure_first_use()
+    report["first_use"] = first_use
+    print("\n⏱ 首次使用耗时")
+    for name, seconds in first_use.items():
+        print(f"   {name:<28}{seconds:>8.3f}s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if failed:
+        print(f"\n❌ 超出上限: {'; '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+PipelineProcessor 分步骤基准测试
+
+所有外部服务都替换为本地替身，可离线运行:
+- Doc2X: test/stubs/fake_doc2x.py
+- 5个MCP工作流服务: test/stubs/mcp_stub_server.py (fastmcp，延迟可配置)
+- Claude CLI: test/stubs/fake_claude.py (通过 CLAUDE_CODE_COMMAND 注入)
+- PDF下载与计费接口: 本进程内的HTTP服务
+
+输出每个步骤的耗时、CPU时间(含子进程)和内存峰值，可与基线结果比较以发现性能回退:
+    python test/benchmark_pipeline.py --iterations 3 --json bench.json
+    python test/benchmark_pipeline.py --baseline bench.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = Path(__file__).resolve().parent.parent
+STUBS = Path(__file__).resolve().parent / "stubs"
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(STUBS))
+
+MCP_ROLES = {
+    "keyword": "SERVER_GET_KEYWORD",
+    "link": "SERVER_SEARCH_LINK",
+    "summary": "SERVER_SUMMARY",
+    "knowledge": "SERVER_KNOWLEDGE",
+    "blog": "SERVER_GEN_BLOG",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"替身服务未在{timeout}s内启动: {port}")
+
+
+class StubHTTPHandler(BaseHTTPRequestHandler):
+    """PDF下载(GET)与计费接口(POST)的替身"""
+    pdf_bytes = b"%PDF-1.4\n" + b"0" * 1_000_000
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(self.pdf_bytes)))
+        self.end_headers()
+        self.wfile.write(self.pdf_bytes)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"code": 0, "data": {"id": int(time.time() * 1000)}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_backends(workdir: str, mcp_latency: float, claude_latency: float):
+    """启动所有替身服务，并通过环境变量注入配置(必须在导入src之前调用)"""
+    processes = []
+    for role, env_name in MCP_ROLES.items():
+        port = free_port()
+        processes.append(subprocess.Popen(
+            [sys.executable, str(STUBS / "mcp_stub_server.py"), "--role", role, "--port", str(port), "--latency", str(mcp_latency)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+        wait_for_port(port)
+        os.environ[env_name] = f"http://127.0.0.1:{port}/mcp"
+
+    http_port = free_port()
+    server = ThreadingHTTPServer(("127.0.0.1", http_port), StubHTTPHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    repo_dir = os.path.join(workdir, "stub_repo")
+    os.makedirs(repo_dir)
+    with open(os.path.join(repo_dir, "model.py"), "w") as f:
+        f.write("class MultiHeadAttention:\n    def __init__(self, d_model=512, dropout=0.1):\n        self.alpha = 1.0\n")
+    git_env = dict(os.environ, GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@localhost",
+                   GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@localhost")
+    for cmd in (["git", "init", "-q"], ["git", "add", "."], ["git", "commit", "-qm", "init"]):
+        subprocess.run(cmd, cwd=repo_dir, env=git_env, check=True)
+
+    os.environ.update({
+        "PDFDEAL_API_KEY": "benchmark",
+        "TEMP_DIR": os.path.join(workdir, "temp"),
+        "CACHE_DIR": os.path.join(workdir, "temp", "cache"),
+        "OUTPUT_DIR": os.path.join(workdir, "output"),
+        "BILL_LEDGER_PATH": os.path.join(workdir, "output", "bill_ledger.db"),
+        "BILLING_URL": f"http://127.0.0.1:{http_port}/consume",
+        "CLAUDE_CODE_COMMAND": f'"{sys.executable}" "{STUBS / "fake_claude.py"}"',
+        "FAKE_CLAUDE_LATENCY": str(claude_latency),
+    })
+    return processes, server, f"http://127.0.0.1:{http_port}/paper.pdf", f"file://{repo_dir}"
+
+
+def _cpu_seconds() -> float:
+    """本进程与已结束子进程的CPU时间"""
+    total = time.process_time()
+    if resource:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        total += children.ru_utime + children.ru_stime
+    return total
+
+
+def run_iteration(pipeline, pdf_url: str, git_url: str):
+    """按顺序执行全部步骤，返回 {步骤名: 指标}"""
+    from src.core.project_state import ProjectState
+
+    steps = [
+        ("create_project", lambda s: pipeline.create_project(pdf_url, "bench", "bench", git_url)),
+        ("download_pdf", pipeline.download_pdf_step),
+        ("clone_git", pipeline.clone_git_step),
+        ("pdf_to_tex", pipeline.pdf_to_tex_step),
+        ("search_knowledge", pipeline.search_knowledge_step),
+        ("analyze_code", pipeline.analyze_code_step),
+        ("understand_paper", pipeline.understand_paper_step),
+        ("generate_blog", pipeline.generate_blog_step),
+        ("render_blog", pipeline.render_blog_step),
+    ]
+    state = ProjectState()
+    metrics = {}
+    for name, step in steps:
+        tracemalloc.reset_peak()
+        wall_start, cpu_start = time.perf_counter(), _cpu_seconds()
+        state, message = step(state)
+        metrics[name] = {
+            "wall": time.perf_counter() - wall_start,
+            "cpu": _cpu_seconds() - cpu_start,
+            "peak_mb": tracemalloc.get_traced_memory()[1] / 1024 / 1024,
+            "ok": not message.startswith("❌"),
+        }
+        if message.startswith("❌"):
+            print(f"   ❌ {name}: {message}")
+    return metrics
+
+
+def summarize(runs):
+    summary = {}
+    for name in runs[0]:
+        samples = [run[name] for run in runs]
+        summary[name] = {
+            "wall_median": statistics.median(s["wall"] for s in samples),
+            "wall_max": max(s["wall"] for s in samples),
+            "cpu_median": statistics.median(s["cpu"] for s in samples),
+            "peak_mb": max(s["peak_mb"] for s in samples),
+            "errors": sum(1 for s in samples if not s["ok"]),
+        }
+    return summary
+
+
+def print_table(summary, baseline=None):
+    header = f"{'步骤':<18}{'耗时中位(s)':>12}{'耗时最大(s)':>12}{'CPU(s)':>10}{'内存峰值(MB)':>14}{'失败':>6}"
+    if baseline:
+        header += f"{'对比基线':>10}"
+    print(header)
+    print("─" * 96)
+    for name, row in summary.items():
+        line = f"{name:<20}{row['wall_median']:>12.3f}{row['wall_max']:>12.3f}{row['cpu_median']:>10.3f}{row['peak_mb']:>14.2f}{row['errors']:>6}"
+        if baseline and name in baseline:
+            base = baseline[name]["wall_median"]
+            line += f"{(row['wall_median'] - base) / base * 100 if base else 0:>+9.1f}%"
+        print(line)
+    if resource:
+        print(f"\n进程最大RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PipelineProcessor 分步骤基准测试(离线)")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--warm", action="store_true", help="迭代之间保留临时目录与缓存")
+    parser.add_argument("--mcp-latency", type=float, default=0.05, help="MCP替身每次调用的延迟(秒)")
+    parser.add_argument("--doc2x-latency", type=float, default=0.05, help="Doc2X替身的转换延迟(秒)")
+    parser.add_argument("--claude-latency", type=float, default=0.05, help="Claude CLI替身的延迟(秒)")
+    parser.add_argument("--json", help="把结果写入JSON文件，可作为之后的基线")
+    parser.add_argument("--baseline", help="基线JSON文件")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="耗时中位数超过基线该比例时视为回退")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fpr_bench_")
+    processes, server, pdf_url, git_url = start_backends(workdir, args.mcp_latency, args.claude_latency)
+    try:
+        from fake_doc2x import FakeDoc2X
+        from src.core.pipeline import pipeline
+
+        pipeline.pdf_processor.client = FakeDoc2X(latency=args.doc2x_latency)
+        temp_dir = os.environ["TEMP_DIR"]
+        tracemalloc.start()
+
+        runs = []
+        for i in range(args.iterations):
+            if not args.warm:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                os.makedirs(temp_dir, exist_ok=True)
+            print(f"🔄 第 {i + 1}/{args.iterations} 轮")
+            runs.append(run_iteration(pipeline, pdf_url, git_url))
+
+        summary = summarize(runs)
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)["steps"]
+        print()
+        print_table(summary, baseline)
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"iterations": args.iterations, "warm": args.warm, "steps": summary}, f, ensure_ascii=False, indent=2)
+
+        if baseline:
+            regressions = [
+                name for name, row in summary.items()
+                if name in baseline and row["wall_median"] > baseline[name]["wall_median"] * (1 + args.tolerance)
+            ]
+            if regressions:
+                print(f"\n❌ 性能回退: {', '.join(regressions)}")
+                sys.exit(1)
+            print("\n✅ 未发现性能回退")
+    finally:
+        server.shutdown()
+        for process in processes:
+            process.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Gradio应用并发会话压测
+
+在子进程中启动 gradio_app (后端全部替换为 test/benchmark_pipeline.py 中的本地替身)，
+再用 gradio_client 模拟N个用户会话，每个会话依次执行全部处理步骤。
+输出每个步骤的 p50/p95/p99 延迟、队列等待时间和错误率，用于评估单实例能承载的并发用户数:
+    python test/loadtest_gradio.py --sessions 20 --ramp 10 --concurrency-limit 4
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from benchmark_pipeline import free_port, start_backends, wait_for_port
+
+# (步骤名, gradio事件的api_name)，按界面上的顺序执行
+SESSION_STEPS = [
+    ("create_project", "/on_create_project"),
+    ("download_pdf", "/on_download_pdf"),
+    ("clone_git", "/on_clone_git"),
+    ("pdf_to_tex", "/on_pdf_to_tex"),
+    ("search_knowledge", "/on_search_knowledge"),
+    ("analyze_code", "/on_analyze_code"),
+    ("understand_paper", "/on_understand_paper"),
+    ("generate_blog", "/on_generate_blog"),
+    ("render_blog", "/on_render_blog"),
+]
+
+
+def serve(port: int, doc2x_latency: float):
+    """子进程: 注入Doc2X替身后按 gradio_app 的方式启动应用"""
+    from fake_doc2x import FakeDoc2X
+    import gradio_app
+
+    gradio_app.pipeline.pdf_processor.client = FakeDoc2X(latency=doc2x_latency, unique=True)
+    gradio_app.app.queue(default_concurrency_limit=gradio_app.config.GRADIO_CONCURRENCY_LIMIT).launch(
+        server_name="127.0.0.1", server_port=port, quiet=True, show_error=True
+    )
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def run_step(client, api_name: str, args: tuple, poll_interval: float) -> Dict:
+    """提交一个事件，轮询状态得到排队时间，返回 {latency, queue_wait, ok, error}"""
+    from gradio_client.utils import Status
+
+    start = time.perf_counter()
+    started = None
+    job = client.submit(*args, api_name=api_name)
+    while not job.done():
+        if started is None and job.status().code not in (Status.STARTING, Status.JOINING_QUEUE, Status.IN_QUEUE):
+            started = time.perf_counter()
+        time.sleep(poll_interval)
+    end = time.perf_counter()
+    record = {"latency": end - start, "queue_wait": (started or end) - start, "ok": True, "error": None}
+    try:
+        outputs = job.result()
+        message = outputs[0] if isinstance(outputs, (list, tuple)) else str(outputs)
+        if isinstance(message, str) and message.startswith("❌"):
+            record["ok"], record["error"] = False, message
+    except Exception as e:
+        record["ok"], record["error"] = False, str(e)
+    return record
+
+
+def run_session(index: int, url: str, pdf_base: str, git_url: str, results: Dict[str, List[Dict]],
+                lock: threading.Lock, poll_interval: float):
+    """一个模拟用户: 独立的gradio会话(独立的ProjectState)走完全部步骤，失败即停止"""
+    from gradio_client import Client
+
+    client = Client(url, headers={"Cookie": "appAccessKey=loadtest; clientName=loadtest"}, verbose=False)
+    for name, api_name in SESSION_STEPS:
+        args = (f"{pdf_base}/paper-{index}.pdf", git_url, "确认") if name == "create_project" else ()
+        record = run_step(client, api_name, args, poll_interval)
+        with lock:
+            results[name].append(record)
+        if not record["ok"]:
+            print(f"   ❌ session {index} {name}: {str(record['error'])[:120]}")
+            break
+    client.close()
+
+
+def summarize(results: Dict[str, List[Dict]], sessions: int) -> Dict:
+    summary = {}
+    for name, _ in SESSION_STEPS:
+        records = results.get(name, [])
+        latencies = [r["latency"] for r in records]
+        waits = [r["queue_wait"] for r in records]
+        errors = sum(1 for r in records if not r["ok"])
+        summary[name] = {
+            "count": len(records),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "queue_wait_mean": statistics.mean(waits) if waits else 0.0,
+            "queue_wait_p95": percentile(waits, 95),
+            # 未执行到该步骤的会话也计为失败
+            "error_rate": (errors + sessions - len(records)) / sessions,
+        }
+    return summary
+
+
+def print_table(summary: Dict, sessions: int, elapsed: float, completed: int):
+    header = f"{'步骤':<18}{'次数':>6}{'p50(s)':>10}{'p95(s)':>10}{'p99(s)':>10}{'排队均值(s)':>14}{'排队p95(s)':>12}{'错误率':>8}"
+    print(header)
+    print("─" * 96)
+    for name, row in summary.items():
+        print(f"{name:<20}{row['count']:>6}{row['p50']:>10.3f}{row['p95']:>10.3f}{row['p99']:>10.3f}"
+              f"{row['queue_wait_mean']:>14.3f}{row['queue_wait_p95']:>12.3f}{row['error_rate']:>9.1%}")
+    print(f"\n会话: {completed}/{sessions} 完成，总耗时 {elapsed:.1f}s，吞吐 {completed / elapsed * 60:.1f} 会话/分钟")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gradio应用并发会话压测(离线)")
+    parser.add_argument("--sessions", type=int, default=10, help="模拟的用户会话数")
+    parser.add_argument("--ramp", type=float, default=0.0, help="在该时间(秒)内均匀启动全部会话")
+    parser.add_argument("--concurrency-limit", type=int, default=None,
+                        help="每个事件的并发数(GRADIO_CONCURRENCY_LIMIT)，默认使用当前配置")
+    parser.add_argument("--mcp-latency", type=float, default=0.2, help="MCP替身每次调用的延迟(秒)")
+    parser.add_argument("--doc2x-latency", type=float, default=0.5, help="Doc2X替身的转换延迟(秒)")
+    parser.add_argument("--claude-latency", type=float, default=1.0, help="Claude CLI替身的延迟(秒)")
+    parser.add_argument("--poll-interval", type=float, default=0.02, help="任务状态轮询间隔(秒)")
+    parser.add_argument("--json", help="把结果写入JSON文件")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.doc2x_latency)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="fpr_load_")
+    processes, server, pdf_url, git_url = start_backends(workdir, args.mcp_latency, args.claude_latency)
+    app_process: Optional[subprocess.Popen] = None
+    try:
+        if args.concurrency_limit:
+            os.environ["GRADIO_CONCURRENCY_LIMIT"] = str(args.concurrency_limit)
+        port = free_port()
+        app_process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", str(port), "--doc2x-latency", str(args.doc2x_latency)],
+            cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        wait_for_port(port, timeout=60)
+        url = f"http://127.0.0.1:{port}/"
+        pdf_base = pdf_url.rsplit("/", 1)[0]
+        print(f"🚀 {args.sessions} 个会话 → {url} (GRADIO_CONCURRENCY_LIMIT={os.getenv('GRADIO_CONCURRENCY_LIMIT', '1')})")
+
+        results: Dict[str, List[Dict]] = defaultdict(list)
+        lock = threading.Lock()
+        threads = []
+        start = time.perf_counter()
+        for i in range(args.sessions):
+            thread = threading.Thread(target=run_session, args=(i, url, pdf_base, git_url, results, lock, args.poll_interval))
+            thread.start()
+            threads.append(thread)
+            if args.ramp and i + 1 < args.sessions:
+                time.sleep(args.ramp / (args.sessions - 1))
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        summary = summarize(results, args.sessions)
+        completed = sum(1 for r in results.get(SESSION_STEPS[-1][0], []) if r["ok"])
+        print()
+        print_table(summary, args.sessions, elapsed, completed)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"sessions": args.sessions, "ramp": args.ramp, "elapsed": elapsed,
+                           "completed": completed, "steps": summary}, f, ensure_ascii=False, indent=2)
+    finally:
+        if app_process:
+            app_process.terminate()
+            app_process.wait(timeout=10)
+        server.shutdown()
+        for process in processes:
+            process.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+pdfdeal.Doc2X的替身，用于离线基准测试
+
+pdf2file 在PDF同级目录生成与Doc2X相同结构的zip(主TEX + images/)，延迟可配置。
+unique=True 时在TEX末尾加入PDF文件名，使不同论文的内容不同，避免全部命中分析缓存。
+"""
+
+import os
+import time
+import zipfile
+from typing import List, Tuple
+
+FAKE_TEX = r"""\documentclass{article}
+\title{Attention Is All You Need}
+\begin{document}
+\maketitle
+\begin{abstract}
+We propose the Transformer (TF), based solely on attention. Code is available at https://github.com/tensorflow/tensor2tensor.
+\end{abstract}
+\section{Introduction}
+Recurrent models are slow. MultiHeadAttention is used. The learning rate and dropout are tuned.
+\section{Model Architecture}
+$\mathrm{Attention}(Q, K, V) = \mathrm{softmax}(QK^T / \sqrt{d_{k}}) V$ with $d_{model} = 512$ and $\alpha$.
+\includegraphics{images/fig1.jpg}
+\section{Experiments}
+We train MultiHeadAttention with batch size 4096 and warmup steps.
+\section{Conclusion}
+Attention is all you need.
+\end{document}
+"""
+
+
+class FakeDoc2X:
+    def __init__(self, latency: float = 0.0, figures: int = 3, figure_bytes: int = 200_000, unique: bool = False):
+        self.latency = latency
+        self.unique = unique
+        self.figures = figures
+        self.figure_bytes = figure_bytes
+
+    def pdf2file(self, pdf_file: str, output_path: str, output_format: str = "tex") -> Tuple[List[str], List[dict], bool]:
+        time.sleep(self.latency)
+        stem = os.path.splitext(os.path.basename(pdf_file))[0]
+        zip_path = os.path.join(output_path, f"{stem}_tex.zip")
+        with zipfile.ZipFile(zip_path, "w") as zf:
+            zf.writestr("output.tex", FAKE_TEX + (f"% source: {stem}\n" if self.unique else ""))
+            for i in range(self.figures):
+                zf.writestr(f"images/fig{i + 1}.jpg", os.urandom(self.figure_bytes))
+        return [zip_path], [], False
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+MCP工作流服务的本地替身，用于离线基准测试
+
+每个进程模拟一个工作流服务(与mcp_processor中的参数一致)，返回固定内容，延迟可配置:
+    python test/stubs/mcp_stub_server.py --role summary --port 8103 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import json
+from typing import List
+
+from fastmcp import FastMCP
+
+BLOG_MODULES = ["动机", "背景", "同类方法的缺陷", "解决的问题", "方法", "实验", "结论"]
+
+
+def build_server(role: str, latency: float) -> FastMCP:
+    mcp = FastMCP(f"stub-{role}")
+
+    if role == "keyword":
+        @mcp.tool
+        async def get_keyword(question: str) -> str:
+            await asyncio.sleep(latency)
+            return "Transformer、self-attention、machine translation"
+
+    elif role == "link":
+        @mcp.tool
+        async def search_link(question: str) -> str:
+            await asyncio.sleep(latency)
+            return "\n".join(json.dumps({"title": f"ref {i}", "link": f"https://example.com/ref{i}.html"}) for i in range(5))
+
+    elif role == "summary":
+        @mcp.tool
+        async def get_summary(question: str) -> str:
+            await asyncio.sleep(latency)
+            return f"# 论文摘要\n\n论文长度 {len(question)} 字符，提出了基于注意力机制的模型。"
+
+    elif role == "knowledge":
+        @mcp.tool
+        async def get_knowledge(question: str, mBlAVtk7: List[str] = []) -> str:
+            await asyncio.sleep(latency)
+            return "\n\n".join(f"Knowledge passage about attention from {url}" for url in mBlAVtk7) or "No knowledge"
+
+    elif role == "blog":
+        @mcp.tool
+        async def gen_blog(question: str, tKEUT9iQ: str = "", gKxpZiRI: str = "", ocN5KV4O: str = "",
+                           qS7mBx2L: str = "") -> str:
+            # 与工作流一致: 只有 blog_section 变量(qS7mBx2L)决定输出的模块，question 不被任何节点读取
+            await asyncio.sleep(latency)
+            modules = [qS7mBx2L] if qS7mBx2L in BLOG_MODULES else BLOG_MODULES
+            return "\n\n".join(
+                f"## {m}\n\n{m}模块内容，引用公式 $x_i$。\n\n```mermaid\ngraph TD\n  A[输入] --> B[输出]\n```" for m in modules
+            )
+
+    else:
+        raise ValueError(f"未知的服务类型: {role}")
+
+    return mcp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP工作流服务替身")
+    parser.add_argument("--role", required=True, choices=["keyword", "link", "summary", "knowledge", "blog"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--latency", type=float, default=0.0, help="每次调用的模拟延迟(秒)")
+    args = parser.parse_args()
+    build_server(args.role, args.latency).run(transport="http", host=args.host, port=args.port, show_banner=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""ArtifactCache 按大小和保留时长清理的单元测试: python -m pytest test/test_artifact_cache.py"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils.artifact_cache import ArtifactCache
+
+
+def _age(path: str, written: float, used: float):
+    os.utime(path, (used, written))
+
+
+def test_prune_evicts_least_recently_hit_files(tmp_path):
+    cache = ArtifactCache("pdf", root=str(tmp_path), suffix=".pdf", max_bytes=2500)
+    now = time.time()
+    for i, key in enumerate(("a", "b")):
+        _age(cache.put_text(key, "x" * 1000), now - 100 + i, now - 100 + i)
+    # 命中后a成为最近使用，超出上限时淘汰b
+    assert cache.get("a") is not None
+    cache.put_text("c", "x" * 1000)
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_prune_removes_files_older_than_max_age(tmp_path):
+    cache = ArtifactCache("doc2x", root=str(tmp_path), suffix=".zip", max_age=3600)
+    now = time.time()
+    _age(cache.put_text("old", "old"), now - 7200, now)
+    cache.put_text("new", "new")
+    assert cache.get("old") is None
+    assert cache.get("new") is not None
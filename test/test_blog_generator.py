@@ -0,0 +1,35 @@
+"""Blog HTML渲染的单元测试: python -m pytest test/test_blog_generator.py"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.blog_generator import BlogGenerator, _markdown_to_html, _prepare_mermaid
+
+
+def _prepare(diagram: str) -> str:
+    return _prepare_mermaid(diagram)
+
+
+def test_labels_with_parentheses_are_quoted():
+    assert _prepare("graph TD\n    A[输入 f(x)] --> B[输出]") == 'graph TD\n    A["输入 f(x)"] --> B[输出]'
+
+
+def test_node_shapes_are_kept():
+    diagram = ("flowchart LR\n"
+               "    A[(db)] --> B[[sub(x)]]\n"
+               "    B --> C[/in(x)/]\n"
+               "    C --> D[\\out(y)\\]\n"
+               '    D --> E["已加引号(x)"]')
+    assert _prepare(diagram) == diagram
+
+
+def test_markdown_sections_are_cached_across_generators():
+    _markdown_to_html.cache_clear()
+    markdown_text = "# 标题\n\n## 方法\n\n公式 $a_1 + b_1$ 不被改写"
+    first = BlogGenerator().render_markdown(markdown_text)
+    second = BlogGenerator().render_markdown(markdown_text)
+    assert first == second
+    assert "$a_1 + b_1$" in first
+    assert _markdown_to_html.cache_info().hits == 1
@@ -0,0 +1,138 @@
+"""Blog模块拆分与按模块复用的单元测试: python -m pytest test/test_blog_sections.py"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core import pipeline as pipeline_module
+from src.core.blog_sections import BLOG_SECTIONS, EXTRA_KEY, PREFACE_KEY, assemble_blog, split_blog_modules
+from src.core.project_state import ProjectState
+from src.utils.artifact_cache import ArtifactCache
+from src.utils.workspace import workspace
+
+TEX = r"""\title{Tiny Paper}
+\begin{abstract}We study tiny transformers.\end{abstract}
+\section{Introduction}
+Tiny transformers are useful.
+\section{Method}
+We prune attention heads.
+\section{Experiments}
+We report accuracy on the benchmark.
+\section{Conclusion}
+Tiny works.
+"""
+
+
+def test_unmatched_blog_text_is_kept():
+    blog = "# 标题\n\n导语段落\n\n## 动机\n\n动机正文\n\n## 附录: 术语表\n\n术语正文\n\n## 方法\n\n方法正文\n"
+    modules = split_blog_modules(blog)
+    assert modules[PREFACE_KEY] == "导语段落"
+    assert "## 附录: 术语表" in modules[EXTRA_KEY]
+    assembled = assemble_blog(modules, "标题")
+    for text in ("导语段落", "动机正文", "术语正文", "方法正文"):
+        assert text in assembled
+
+
+def test_blog_without_headings_is_kept():
+    assert "整篇没有标题的输出" in assemble_blog(split_blog_modules("整篇没有标题的输出"))
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.setattr(workspace, "root", str(tmp_path / "projects"))
+    proc = pipeline_module.PipelineProcessor()
+    proc.blog_section_cache = ArtifactCache("blog_sections", root=str(tmp_path / "cache"))
+    proc.knowledge_cache = ArtifactCache("knowledge", root=str(tmp_path / "cache"))
+    monkeypatch.setattr(proc.config, "BLOG_PARALLEL_SECTIONS", True)
+    return proc
+
+
+def _state(tmp_path) -> ProjectState:
+    state = ProjectState()
+    state.tex_path = str(tmp_path / "paper.tex")
+    Path(state.tex_path).write_text(TEX, encoding="utf-8")
+    state.update_step(3, "completed")
+    return state
+
+
+def test_adding_knowledge_link_only_regenerates_related_sections(tmp_path, monkeypatch, processor):
+    knowledge_calls, section_calls = [], []
+
+    async def fake_knowledge(tex_content, links):
+        knowledge_calls.append(list(links))
+        if links == ["https://example.org/ablation"]:
+            return "Ablation evaluation protocol for accuracy"
+        return "Transformers use attention heads"
+
+    async def fake_section(title, tex_content, code_content, knowledge):
+        section_calls.append(title)
+        return f"## {title}\n\n{title} ({len(section_calls)})"
+
+    monkeypatch.setattr(pipeline_module, "get_knowedge", fake_knowledge)
+    monkeypatch.setattr(pipeline_module, "get_blog_section", fake_section)
+
+    state = _state(tmp_path)
+    state.knowledge_base = ["https://example.org/attention"]
+    processor.understand_paper_step(state)
+    processor.generate_blog_step(state)
+    assert len(section_calls) == 7
+    first_blog = Path(state.blog_path).read_text(encoding="utf-8")
+
+    knowledge_calls.clear()
+    section_calls.clear()
+    state.knowledge_base.append("https://example.org/ablation")
+    processor.understand_paper_step(state)
+    _, message = processor.generate_blog_step(state)
+
+    # 已有链接的理解结果来自缓存，只理解新增的链接
+    assert knowledge_calls == [["https://example.org/ablation"]]
+    # 新段落只与实验模块相关，其余模块复用上次单独生成的内容
+    assert section_calls == ["实验"]
+    assert "复用6个" in message
+    blog = Path(state.blog_path).read_text(encoding="utf-8")
+    assert blog.split("## 实验")[0] == first_blog.split("## 实验")[0]
+
+
+def test_serial_mode_reuses_sections_of_full_blog(tmp_path, monkeypatch, processor):
+    monkeypatch.setattr(processor.config, "BLOG_PARALLEL_SECTIONS", False)
+    blog_calls, section_calls = [], []
+
+    async def fake_knowledge(tex_content, links):
+        if links == ["https://example.org/ablation"]:
+            return "Ablation evaluation protocol for accuracy"
+        return "Transformers use attention heads"
+
+    async def fake_blog(tex_content, code_content, knowledge):
+        blog_calls.append(knowledge)
+        body = "\n\n".join(f"## {spec.title}\n\n整篇{spec.title}" for spec in BLOG_SECTIONS)
+        return f"# 整篇标题\n\n导语段落\n\n{body}\n\n## 附录\n\n附录正文"
+
+    async def fake_section(title, tex_content, code_content, knowledge):
+        section_calls.append(title)
+        return f"## {title}\n\n单独{title}"
+
+    monkeypatch.setattr(pipeline_module, "get_knowedge", fake_knowledge)
+    monkeypatch.setattr(pipeline_module, "get_blog", fake_blog)
+    monkeypatch.setattr(pipeline_module, "get_blog_section", fake_section)
+
+    state = _state(tmp_path)
+    state.knowledge_base = ["https://example.org/attention"]
+    processor.understand_paper_step(state)
+    processor.generate_blog_step(state)
+    assert len(blog_calls) == 1 and section_calls == []
+
+    state.knowledge_base.append("https://example.org/ablation")
+    processor.understand_paper_step(state)
+    _, message = processor.generate_blog_step(state)
+
+    # 整篇生成的模块按模块缓存，新增链接后只单独生成实验模块，不再整篇调用
+    assert len(blog_calls) == 1
+    assert section_calls == ["实验"]
+    assert "复用6个" in message
+    blog = Path(state.blog_path).read_text(encoding="utf-8")
+    for text in ("导语段落", "整篇方法", "单独实验", "附录正文"):
+        assert text in blog
+    assert "整篇实验" not in blog
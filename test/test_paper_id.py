@@ -0,0 +1,37 @@
+"""canonical_paper_id 的单元测试: python -m pytest test/test_paper_id.py"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils.paper_id import canonical_paper_id
+
+
+def test_query_distinguishes_papers():
+    first = canonical_paper_id("https://example.org/download.php?id=1")
+    second = canonical_paper_id("https://example.org/download.php?id=2")
+    assert first != second
+
+
+def test_query_order_and_tracking_params_ignored():
+    assert canonical_paper_id("https://example.org/get?b=2&a=1&utm_source=x") == \
+        canonical_paper_id("http://www.example.org/get?a=1&b=2&fbclid=y")
+
+
+def test_arxiv_variants_share_id():
+    urls = [
+        "https://arxiv.org/abs/2401.12345",
+        "http://arxiv.org/pdf/2401.12345",
+        "https://arxiv.org/pdf/2401.12345.pdf",
+        "arxiv.org/abs/2401.12345?context=cs",
+    ]
+    assert {canonical_paper_id(url) for url in urls} == {"arxiv:2401.12345"}
+    assert canonical_paper_id("https://arxiv.org/abs/2401.12345v2") == "arxiv:2401.12345v2"
+
+
+def test_openreview_and_plain_url_variants():
+    assert canonical_paper_id("https://openreview.net/pdf?id=abc") == \
+        canonical_paper_id("https://openreview.net/forum?id=abc") == "openreview:abc"
+    assert canonical_paper_id("http://example.org/paper.pdf") == \
+        canonical_paper_id("https://www.example.org/paper.pdf/")
@@ -0,0 +1,68 @@
+"""PaperProcessor 的单元测试: 用替身AsyncOpenAI客户端运行 _complete，python -m pytest test/test_paper_processor.py"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.blog_sections import BLOG_SECTIONS
+from src.core.paper_processor import PaperProcessor
+
+
+def _chunk(content=None, finish_reason=None):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=finish_reason)])
+
+
+class StubCompletions:
+    """按顺序返回预设的流式结果；元素为异常时抛出"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+
+        async def stream():
+            for chunk in response:
+                yield chunk
+        return stream()
+
+
+def _processor(responses) -> PaperProcessor:
+    processor = PaperProcessor(max_retries=2)
+    processor._client = SimpleNamespace(chat=SimpleNamespace(completions=StubCompletions(responses)))
+    return processor
+
+
+def test_complete_streams_structured_output():
+    payload = json.dumps({spec.key: f"{spec.title}内容" for spec in BLOG_SECTIONS}, ensure_ascii=False)
+    processor = _processor([[_chunk(payload[:10]), _chunk(payload[10:]), _chunk(finish_reason="stop")]])
+    deltas = []
+
+    result = asyncio.run(processor._complete("prompt", deltas.append))
+
+    assert result == {spec.key: f"{spec.title}内容" for spec in BLOG_SECTIONS}
+    assert "".join(deltas) == payload
+    request = processor._client.chat.completions.requests[0]
+    assert request["stream"] is True and request["response_format"]["type"] == "json_schema"
+
+
+def test_complete_retries_truncated_output(monkeypatch):
+    async def no_sleep(_):
+        return None
+
+    monkeypatch.setattr("src.core.paper_processor.asyncio.sleep", no_sleep)
+    payload = json.dumps({spec.key: "x" for spec in BLOG_SECTIONS})
+    processor = _processor([[_chunk(payload[:5], finish_reason="length")], [_chunk(payload, finish_reason="stop")]])
+
+    result = asyncio.run(processor._complete("prompt"))
+
+    assert result["motivation"] == "x"
+    assert len(processor._client.chat.completions.requests) == 2
@@ -0,0 +1,51 @@
+"""工作目录清理的单元测试: python -m pytest test/test_workspace.py"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils.workspace import WorkspaceManager
+
+
+def _write(path: Path, size: int, age: float) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    when = time.time() - age
+    os.utime(path, (when, when))
+    return path
+
+
+def _manager(tmp_path: Path, quota_mb: float = 0, shared_max_age_hours: float = 0) -> WorkspaceManager:
+    cache = tmp_path / "cache"
+    roots = [(str(cache), 2), (str(cache / "papers"), 1), (str(tmp_path / "inflight"), 1)]
+    return WorkspaceManager(root=str(tmp_path / "projects"), quota_mb=quota_mb, max_age_hours=0, grace=60,
+                            shared_roots=roots, shared_max_age_hours=shared_max_age_hours)
+
+
+def test_quota_covers_caches_and_paper_index(tmp_path):
+    manager = _manager(tmp_path, quota_mb=1)
+    old_pdf = _write(tmp_path / "cache" / "pdf" / "old.pdf", 600 * 1024, age=7200)
+    old_entry = _write(tmp_path / "cache" / "papers" / "entry1" / "entry.json", 300 * 1024, age=3600)
+    project = _write(tmp_path / "projects" / "p1" / "paper.pdf", 300 * 1024, age=1800)
+    lock = _write(tmp_path / "inflight" / "k.lock", 0, age=9000)
+
+    entries = {Path(e.path).name for e in manager.shared_entries()}
+    # 论文索引嵌套在缓存目录中，按索引记录目录统计，不会把整个 papers 目录当作一个缓存条目
+    assert entries == {"old.pdf", "entry1", "k.lock"}
+
+    removed = manager.sweep()
+    # 总占用1.2MB超出1MB配额，只需淘汰最久未使用的PDF缓存；空的锁文件不参与配额淘汰
+    assert removed == [str(old_pdf)]
+    assert old_entry.exists() and project.exists() and lock.exists()
+
+
+def test_shared_entries_expire_after_max_age(tmp_path):
+    manager = _manager(tmp_path, shared_max_age_hours=1)
+    result = _write(tmp_path / "inflight" / "k.json", 10, age=7200)
+    fresh = _write(tmp_path / "cache" / "summary" / "a.md", 10, age=600)
+    manager.sweep()
+    assert not result.exists()
+    assert fresh.exists()